@@ -0,0 +1,156 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Run the benchmarks and compare them to the recorded baselines
+
+Each benchmark is timed ``--repeat`` times and the fastest run is compared
+to the baseline. A benchmark that is more than ``--tolerance`` slower than
+its baseline is reported as a regression and the run exits non-zero.
+``--save`` records the current results as the new baselines.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import importlib
+import inspect
+import json
+import os
+import platform
+import sys
+import timeit
+
+import click
+
+from . import corpus
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINES = os.path.join(BENCH_DIR, 'baselines.json')
+
+
+def discover(pattern=None):
+    """Find every ``time_*`` method in the ``bench_*`` modules
+
+    :returns: list of (name, class, method name) tuples
+    """
+    found = []
+    for filename in sorted(os.listdir(BENCH_DIR)):
+        if not (filename.startswith('bench_') and filename.endswith('.py')):
+            continue
+        module_name = filename[:-3]
+        module = importlib.import_module('.' + module_name, __package__)
+        for cls_name, cls in inspect.getmembers(module, inspect.isclass):
+            if cls.__module__ != module.__name__:
+                continue
+            for attr in sorted(dir(cls)):
+                if not attr.startswith('time_'):
+                    continue
+                name = '.'.join([module_name, cls_name, attr])
+                if pattern and pattern not in name:
+                    continue
+                found.append((name, cls, attr))
+    return found
+
+
+def run(benchmarks, repeat):
+    """Time each benchmark, calling setup and teardown once per class"""
+    results = {}
+    instances = {}
+    try:
+        for name, cls, attr in benchmarks:
+            if cls not in instances:
+                instances[cls] = cls()
+                if hasattr(instances[cls], 'setup'):
+                    instances[cls].setup()
+            func = getattr(instances[cls], attr)
+            times = timeit.repeat(func, number=1, repeat=repeat)
+            times.sort()
+            results[name] = dict(min=times[0], median=times[len(times) // 2],
+                                 repeat=repeat)
+            yield name, results[name]
+    finally:
+        for instance in instances.values():
+            if hasattr(instance, 'teardown'):
+                instance.teardown()
+
+
+def load_baselines(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path) as fh:
+        return json.load(fh).get('benchmarks', {})
+
+
+def save_baselines(path, results):
+    data = dict(
+        machine=dict(python=platform.python_version(),
+                     implementation=platform.python_implementation(),
+                     platform=platform.platform()),
+        corpus=dict(jobs=corpus.JOBS, job_size=corpus.JOB_SIZE),
+        benchmarks=results,
+    )
+    with open(path, 'w') as fh:
+        json.dump(data, fh, indent=2, sort_keys=True)
+        fh.write('\n')
+
+
+@click.command()
+@click.option('-k', 'pattern', help='Only run benchmarks matching PATTERN')
+@click.option('--repeat', type=click.IntRange(1), default=5,
+              help='Number of timed runs of each benchmark')
+@click.option('--baseline', type=click.Path(dir_okay=False),
+              default=BASELINES, help='Baseline results to compare against')
+@click.option('--tolerance', type=float, default=0.5,
+              help='Allowed slowdown relative to the baseline')
+@click.option('--save', is_flag=True,
+              help='Record the results as the new baseline')
+def main(pattern, repeat, baseline, tolerance, save):
+    benchmarks = discover(pattern)
+    baselines = load_baselines(baseline)
+    if save and pattern:
+        # only replace the benchmarks that were run
+        results = dict(baselines)
+    else:
+        results = {}
+
+    regressions = []
+    click.echo('%-52s %10s %10s %8s' % ('BENCHMARK', 'MIN S', 'BASE S',
+                                        'CHANGE'))
+    for name, result in run(benchmarks, repeat):
+        results[name] = result
+        base = baselines.get(name, {}).get('min')
+        if base:
+            change = result['min'] / base - 1
+            click.echo('%-52s %10.4f %10.4f %+7.1f%%' % (
+                name, result['min'], base, change * 100))
+            if change > tolerance:
+                regressions.append(name)
+        else:
+            click.echo('%-52s %10.4f %10s %8s' % (name, result['min'], '-',
+                                                  '-'))
+
+    if save:
+        save_baselines(baseline, results)
+        click.echo('Saved baselines to %s' % baseline)
+    elif regressions:
+        click.echo(u"%d benchmarks are more than %d%% slower than the "
+                   u"baseline: %s" % (len(regressions), tolerance * 100,
+                                      ', '.join(regressions)), err=True)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main(prog_name='python -m benchmarks')
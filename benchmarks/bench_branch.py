@@ -0,0 +1,70 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import os
+import shutil
+import tempfile
+import warnings
+
+from jbutler.lib import branch
+from jbutler.utils import lxml_utils
+
+from . import corpus
+
+
+class BranchJobs(object):
+    """Branch every job in the corpus to a new set of macros"""
+
+    def setup(self):
+        self.work_dir = tempfile.mkdtemp(prefix='jbutler-bench-')
+        self.job_dir = os.path.join(self.work_dir, 'jobs')
+        template_dir = os.path.join(self.work_dir, 'templates')
+        os.mkdir(self.job_dir)
+        os.mkdir(template_dir)
+        self.templates = corpus.write_jobs(self.job_dir, template_dir)
+        self.from_macros = corpus.macros('release-1')
+        self.to_macros = corpus.macros('release-2')
+
+    def teardown(self):
+        shutil.rmtree(self.work_dir)
+
+    def time_branch_jobs(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', DeprecationWarning)
+            branch.branch_jobs(self.templates, self.from_macros,
+                               self.to_macros, self.job_dir)
+
+
+class UpdateJobData(object):
+    """Apply a template to every parsed job in the corpus"""
+
+    def setup(self):
+        job_macros = corpus.macros('release-1')
+        self.docs = []
+        self.paths = []
+        for idx in range(corpus.JOBS):
+            doc = lxml_utils.fromstring(corpus.job_xml(idx, job_macros))
+            self.docs.append(doc)
+            self.paths.append(
+                corpus.job_template(idx, doc, job_macros)['templates'])
+        self.to_macros = corpus.macros('release-2')
+
+    def time_update_job_data(self):
+        for doc, paths in zip(self.docs, self.paths):
+            branch._update_job_data(doc, paths, self.to_macros)
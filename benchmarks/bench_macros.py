@@ -0,0 +1,49 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from jbutler import macros
+
+from . import corpus
+
+LOOKUPS = 1000
+
+
+class MacroLookups(object):
+    """Look up plain and chained macros"""
+
+    def setup(self):
+        values = corpus.macros('release-1')
+        # every other extra macro refers to the one before it
+        names = sorted(values)
+        for prev, name in zip(names, names[1:]):
+            if name.startswith('extra') and int(name[-2:]) % 2:
+                values[name] = '%%(%s)s' % prev
+        self.macros = macros.Macros(values)
+        self.names = names
+        self.template = ' '.join('%%(%s)s' % n for n in names)
+
+    def time_getitem(self):
+        for _ in range(LOOKUPS):
+            for name in self.names:
+                self.macros[name]
+
+    def time_format(self):
+        for _ in range(LOOKUPS):
+            self.template % self.macros
@@ -0,0 +1,44 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import io
+
+from jbutler.commands import merge
+from jbutler.utils import lxml_utils
+
+from . import corpus
+
+
+class MergeTemplate(object):
+    """Walk every job against a template that is already up to date"""
+
+    def setup(self):
+        self.macros = corpus.macros('release-1')
+        self.jobs = []
+        for idx in range(corpus.JOBS):
+            tree = lxml_utils.parse(
+                io.BytesIO(corpus.job_xml(idx, self.macros)))
+            template = corpus.merged_template(idx, tree.getroot(),
+                                              self.macros)
+            self.jobs.append((tree, template))
+
+    def time_merge_template_helper(self):
+        for tree, template in self.jobs:
+            merge._mergeTemplateHelper(tree.getroot(), template, tree,
+                                       self.macros)
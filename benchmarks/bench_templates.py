@@ -0,0 +1,61 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import os
+import shutil
+import tempfile
+
+from jbutler import utils
+
+from . import corpus
+
+
+class ReadWriteFiles(object):
+    """Read and write every job and template in the corpus"""
+
+    def setup(self):
+        self.work_dir = tempfile.mkdtemp(prefix='jbutler-bench-')
+        self.job_dir = os.path.join(self.work_dir, 'jobs')
+        self.template_dir = os.path.join(self.work_dir, 'templates')
+        os.mkdir(self.job_dir)
+        os.mkdir(self.template_dir)
+        self.templates = corpus.write_jobs(self.job_dir, self.template_dir)
+        self.jobs = sorted(os.path.join(self.job_dir, f)
+                           for f in os.listdir(self.job_dir))
+        self.template_data = [utils.readTemplate(t) for t in self.templates]
+        self.job_data = [utils.readJob(j) for j in self.jobs]
+
+    def teardown(self):
+        shutil.rmtree(self.work_dir)
+
+    def time_read_template(self):
+        for filename in self.templates:
+            utils.readTemplate(filename)
+
+    def time_write_template(self):
+        for filename, data in zip(self.templates, self.template_data):
+            utils.writeTemplate(filename, data)
+
+    def time_read_job(self):
+        for filename in self.jobs:
+            utils.readJob(filename)
+
+    def time_write_job(self):
+        for filename, data in zip(self.jobs, self.job_data):
+            utils.writeJob(filename, data)
@@ -0,0 +1,48 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import io
+
+from jbutler.jenkinsapi.views import Views
+
+from . import corpus
+
+
+class ViewSerialization(object):
+    """Serialize and deserialize views over every job in the corpus
+
+    Only the yaml conversion is timed, the requests made to the master by
+    :meth:`Views.serialize` and :meth:`Views.deserialize` are left to the
+    throughput tests in tests/perf.
+    """
+
+    def setup(self):
+        # the yaml conversions never touch the master
+        self.views = Views(None)
+        self.view_objs = corpus.view_dicts()
+        self.data = self.views._to_yaml(iter(self.view_objs))
+
+    def time_serialize(self):
+        self.views._to_yaml(iter(self.view_objs))
+
+    def time_serialize_stream(self):
+        self.views._to_yaml(iter(self.view_objs), io.StringIO())
+
+    def time_deserialize(self):
+        list(self.views._from_yaml(self.data))
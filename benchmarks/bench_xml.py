@@ -0,0 +1,46 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import io
+
+from jbutler.utils import lxml_utils
+
+from . import corpus
+
+
+class XmlRoundTrip(object):
+    """Parse and serialize every job in the corpus"""
+
+    def setup(self):
+        job_macros = corpus.macros('release-1')
+        self.data = [corpus.job_xml(idx, job_macros)
+                     for idx in range(corpus.JOBS)]
+        self.docs = [lxml_utils.fromstring(d) for d in self.data]
+
+    def time_fromstring(self):
+        for data in self.data:
+            lxml_utils.fromstring(data)
+
+    def time_parse(self):
+        for data in self.data:
+            lxml_utils.parse(io.BytesIO(data))
+
+    def time_tostring(self):
+        for doc in self.docs:
+            lxml_utils.tostring(doc)
@@ -0,0 +1,229 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Synthetic jobs, templates, macros and views for the benchmarks
+
+The corpus is sized like a large master: JBUTLER_BENCH_JOBS jobs (default
+1000) of roughly JBUTLER_BENCH_JOB_SIZE bytes of xml each (default 50 KB),
+branched with 20 macros. Everything is generated deterministically, so
+runs on the same machine can be compared.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import os
+
+import six
+
+from jbutler.constants import VIEW_SEP
+from jbutler.utils import lxml_utils
+from jbutler.utils import yaml_utils
+
+JOBS = int(os.environ.get('JBUTLER_BENCH_JOBS', '1000'))
+JOB_SIZE = int(os.environ.get('JBUTLER_BENCH_JOB_SIZE', '51200'))
+JOBS_PER_VIEW = 50
+
+# the xpaths every template rewrites
+TEMPLATE_PATHS = (
+    '/project/description',
+    '/project/scm/userRemoteConfigs/hudson.plugins.git.UserRemoteConfig/url',
+    '/project/scm/branches/hudson.plugins.git.BranchSpec/name',
+    '/project/assignedNode',
+    '/project/properties/hudson.model.ParametersDefinitionProperty/'
+    'parameterDefinitions/hudson.model.StringParameterDefinition[1]/'
+    'defaultValue',
+)
+
+JOB_HEAD = u"""\
+<?xml version='1.0' encoding='UTF-8'?>
+<project>
+  <actions/>
+  <description>Build %(project)s from %(branch)s</description>
+  <keepDependencies>false</keepDependencies>
+  <properties>
+    <hudson.model.ParametersDefinitionProperty>
+      <parameterDefinitions>
+        <hudson.model.StringParameterDefinition>
+          <name>VERSION</name>
+          <description>Version to build</description>
+          <defaultValue>%(version)s</defaultValue>
+        </hudson.model.StringParameterDefinition>
+        <hudson.model.StringParameterDefinition>
+          <name>LABEL</name>
+          <description>Label of the build</description>
+          <defaultValue>%(label)s</defaultValue>
+        </hudson.model.StringParameterDefinition>
+      </parameterDefinitions>
+    </hudson.model.ParametersDefinitionProperty>
+  </properties>
+  <scm class="hudson.plugins.git.GitSCM" plugin="git@2.4.0">
+    <configVersion>2</configVersion>
+    <userRemoteConfigs>
+      <hudson.plugins.git.UserRemoteConfig>
+        <url>%(repo)s</url>
+      </hudson.plugins.git.UserRemoteConfig>
+    </userRemoteConfigs>
+    <branches>
+      <hudson.plugins.git.BranchSpec>
+        <name>%(branch)s</name>
+      </hudson.plugins.git.BranchSpec>
+    </branches>
+  </scm>
+  <assignedNode>%(node)s</assignedNode>
+  <canRoam>false</canRoam>
+  <disabled>false</disabled>
+  <triggers/>
+  <builders>
+"""
+
+JOB_STEP = u"""\
+    <hudson.tasks.Shell>
+      <command>#!/bin/bash -e
+# step %(step)d of %(project)s on %(branch)s
+cd %(workspace)s/%(project)s
+export VERSION=%(version)s BUILD_LABEL=%(label)s
+./configure --prefix=%(prefix)s --with-python=%(python)s
+make -j%(jobs)s all check DESTDIR=%(stage)s
+rsync -a %(stage)s/ %(publish)s/%(project)s/%(branch)s/
+</command>
+    </hudson.tasks.Shell>
+"""
+
+JOB_TAIL = u"""\
+  </builders>
+  <publishers/>
+  <buildWrappers/>
+</project>
+"""
+
+
+def macros(branch='release-1'):
+    """The 20 macros used to branch every job
+
+    ``branch`` is part of most values, so branching touches many nodes.
+    """
+    base = dict(
+        branch=branch,
+        version=branch.replace('release-', '') + '.0',
+        label='%s-nightly' % branch,
+        repo='git@git.example.com:products/%s.git' % branch,
+        node='builders-%s' % branch,
+        workspace='/srv/work/%s' % branch,
+        prefix='/opt/%s' % branch,
+        stage='/srv/stage/%s' % branch,
+        publish='/srv/publish/%s' % branch,
+        python='/opt/%s/bin/python' % branch,
+    )
+    for idx in range(len(base), 20):
+        base['extra%02d' % idx] = '%s-extra-%02d' % (branch, idx)
+    return base
+
+
+def job_name(idx, branch):
+    return 'product-%04d-%s' % (idx, branch)
+
+
+def job_xml(idx, job_macros, size=JOB_SIZE):
+    """An xml job config of about ``size`` bytes, as bytes"""
+    values = dict(job_macros, project='product-%04d' % idx, jobs=8)
+    parts = [JOB_HEAD % values]
+    length = len(parts[0]) + len(JOB_TAIL)
+    step = 0
+    while length < size:
+        step += 1
+        parts.append(JOB_STEP % dict(values, step=step))
+        length += len(parts[-1])
+    parts.append(JOB_TAIL)
+    return u''.join(parts).encode('utf-8')
+
+
+def templatize(text, job_macros):
+    """Replace macro values in ``text`` the way the merge command does"""
+    for macro, value in six.iteritems(job_macros):
+        text = text.replace(value, '%%(%s)s' % macro)
+    return text
+
+
+def job_template(idx, doc, job_macros, paths=TEMPLATE_PATHS):
+    """A template mapping ``paths`` in ``doc`` to their templated text"""
+    templates = {}
+    for path in paths:
+        element = doc.xpath(path)[0]
+        templates[path] = templatize(element.text or '', job_macros)
+    return {
+        'name': 'product-%04d-%%(branch)s.xml' % idx,
+        'templates': templates,
+    }
+
+
+def merged_template(idx, doc, job_macros):
+    """A template of every templated node, which the merge has nothing
+    to ask about"""
+    tree = doc.getroottree()
+    templates = {}
+    for element in doc.iter():
+        text = templatize(element.text or '', job_macros)
+        if '%(' in text:
+            templates[tree.getpath(element)] = text
+    return {
+        'name': 'product-%04d-%%(branch)s.xml' % idx,
+        'templates': templates,
+    }
+
+
+def view_dicts(jobs=JOBS, branch='release-1'):
+    """A nested view holding list views of ``JOBS_PER_VIEW`` jobs each"""
+    root = VIEW_SEP + branch
+    views = []
+    for start in range(0, jobs, JOBS_PER_VIEW):
+        name = 'group-%04d' % (start // JOBS_PER_VIEW)
+        views.append(dict(
+            name=name,
+            path=VIEW_SEP.join([root, name]),
+            description='Jobs %d to %d' % (start, start + JOBS_PER_VIEW),
+            filterQueue=False,
+            filterExecutors=False,
+            statusFilter=None,
+            recurse=False,
+            includeRegex=None,
+            jobs=[job_name(i, branch) for i in range(
+                start, min(jobs, start + JOBS_PER_VIEW))],
+        ))
+    return [dict(name=branch, path=root, description='', filterQueue=False,
+                 filterExecutors=False, defaultView=views[0]['name'],
+                 views=views)]
+
+
+def write_jobs(job_dir, template_dir, jobs=JOBS, branch='release-1'):
+    """Write ``jobs`` job configs and their templates to disk
+
+    :returns: list of the template file names
+    """
+    job_macros = macros(branch)
+    templates = []
+    for idx in range(jobs):
+        data = job_xml(idx, job_macros)
+        with open(os.path.join(job_dir, job_name(idx, branch) + '.xml'),
+                  'wb') as fh:
+            fh.write(data)
+
+        doc = lxml_utils.fromstring(data)
+        filename = os.path.join(template_dir, 'product-%04d.yml' % idx)
+        with open(filename, 'w') as fh:
+            yaml_utils.dump(job_template(idx, doc, job_macros), fh)
+        templates.append(filename)
+    return templates
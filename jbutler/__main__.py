@@ -18,14 +18,11 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-import requests
 import sys
 
 from .commands.base import jbutler
 from .lib.cfg import MissingRequiredOptionError
 
-requests.packages.urllib3.disable_warnings()
-
 
 def main():
     try:
@@ -18,25 +18,113 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 import os
+import sys
 
 import click
 
 from ..lib import cfg
-from .branch import branch
-from .config import config
-from .jobs import jobs
-from .merge import merge
 
+# the commands --fleet can run against every master
+FLEET_COMMANDS = ('jobs', 'views')
+# their sub-commands that write local files, which every master would share
+FLEET_LOCAL_COMMANDS = {
+    'jobs': ('logs', 'pack', 'retrieve', 'unpack'),
+    'views': ('retrieve',),
+}
 
-@click.group()
+
+class LazyGroup(click.Group):
+    """A click group that only imports a sub-command when it is used
+
+    Sub-commands are registered by name in ``lazy_commands`` as the module
+    that defines them. The command object must have the same name as the
+    command.
+    """
+
+    def __init__(self, name=None, lazy_commands=None, **attrs):
+        click.Group.__init__(self, name, **attrs)
+        self.lazy_commands = dict(lazy_commands or {})
+
+    def list_commands(self, ctx):
+        return sorted(set(self.commands) | set(self.lazy_commands))
+
+    def get_command(self, ctx, cmd_name):
+        if cmd_name not in self.commands and cmd_name in self.lazy_commands:
+            module = __import__(self.lazy_commands[cmd_name],
+                                fromlist=[cmd_name])
+            self.add_command(getattr(module, cmd_name), cmd_name)
+        return self.commands.get(cmd_name)
+
+
+class FleetGroup(LazyGroup):
+    """A lazy group that runs its sub-command once for every master of a
+    fleet
+
+    When the group callback leaves a :class:`jbutler.lib.fleet.Fleet` as
+    the context object, the sub-command runs against every master at once,
+    each with that master's config as its context object, and the output is
+    reported once all of them are done. Sub-commands that write local files
+    are refused, since the masters would overwrite each other's files.
+    """
+
+    def invoke(self, ctx):
+        if not ctx.args:
+            return LazyGroup.invoke(self, ctx)
+
+        with ctx:
+            cmd_name, cmd, args = self.resolve_command(ctx, ctx.args)
+            ctx.invoked_subcommand = cmd_name
+            click.Command.invoke(self, ctx)
+            # the callback imports the fleet module if it made a fleet
+            fleet = sys.modules.get('jbutler.lib.fleet')
+            if fleet is None or not isinstance(ctx.obj, fleet.Fleet):
+                sub_ctx = cmd.make_context(cmd_name, args, parent=ctx)
+                with sub_ctx:
+                    return sub_ctx.command.invoke(sub_ctx)
+
+            sub_name = args[0] if args else None
+            if sub_name in FLEET_LOCAL_COMMANDS.get(cmd_name, ()):
+                raise click.UsageError(
+                    u'--fleet cannot run "%s %s", every master would write '
+                    u'the same local files' % (cmd_name, sub_name), ctx)
+
+            def _invoke(config):
+                sub_ctx = cmd.make_context(cmd_name, list(args), parent=ctx,
+                                           obj=config)
+                with sub_ctx:
+                    return sub_ctx.command.invoke(sub_ctx)
+            fleet.report(ctx.obj.run(_invoke))
+
+
+@click.group(cls=FleetGroup, lazy_commands={
+    'branch': 'jbutler.commands.branch',
+    'config': 'jbutler.commands.config',
+    'jobs': 'jbutler.commands.jobs',
+    'merge': 'jbutler.commands.merge',
+    'views': 'jbutler.commands.views',
+})
 @click.option('--config', multiple=True, type=(str, str))
 @click.option('--config-file', multiple=True,
               type=click.Path(exists=True, dir_okay=False))
 @click.option('--skip-default-config/--no-skip-defualt-config', default=False)
 @click.option('--quiet/--no-quiet', default=False)
 @click.option('-v', '--verbose', count=True)
+@click.option('--profile/--no-profile', default=False,
+              help='Print time spent per server endpoint and local step')
+@click.option('--profile-trace', type=click.Path(dir_okay=False),
+              help='Write a chrome trace of the run to this file, '
+                   'implies --profile')
+@click.option('--refresh/--no-refresh', default=False,
+              help='Fetch server state again instead of using the cache')
+@click.option('--fleet/--no-fleet', default=False,
+              help='Run the jobs or views command against every '
+                   '[server:NAME] master of the config at once')
 @click.pass_context
-def jbutler(ctx, config, config_file, skip_default_config, quiet, verbose):
+def jbutler(ctx, config, config_file, skip_default_config, quiet, verbose,
+            profile, profile_trace, refresh, fleet):
+    if profile or profile_trace:
+        _start_profile(ctx, profile_trace)
+
     if not skip_default_config:
         config_files = ['/etc/jbutlerrc',
                         os.path.expanduser('~/.jbutlerrc'),
@@ -48,10 +136,50 @@ def jbutler(ctx, config, config_file, skip_default_config, quiet, verbose):
     if config_file:
         config_files.extend(config_file)
 
-    ctx.obj = cfg.get_config(config_files, **dict(config))
+    overrides = dict(config)
+    if refresh:
+        overrides['cache_refresh'] = 'true'
+    if fleet:
+        if ctx.invoked_subcommand not in FLEET_COMMANDS:
+            raise click.UsageError(u'--fleet only applies to the %s commands'
+                                   % ' and '.join(FLEET_COMMANDS))
+        from ..lib import fleet as libfleet
+        ctx.obj = libfleet.Fleet(cfg.load_fleet(config_files, **overrides))
+    else:
+        ctx.obj = cfg.load_config(config_files, **overrides)
+        fleet_command = ctx.invoked_subcommand in FLEET_COMMANDS
+        if ctx.obj.server is None and fleet_command:
+            raise click.UsageError(u'No server is set in the [jbutler] '
+                                   u'section, pass --fleet to use the '
+                                   u'[server:NAME] masters')
+    if verbose:
+        ctx.call_on_close(_report_throttle)
+
+
+def _start_profile(ctx, trace_file):
+    from ..utils import instrument
+    instrument.reset()
+    instrument.enable()
+    start = instrument.timer()
+
+    def report():
+        instrument.record_span('total', start, instrument.timer() - start)
+        instrument.disable()
+        event_list = instrument.events()
+        click.echo(instrument.format_summary(
+            instrument.summary(event_list)), err=True)
+        if trace_file:
+            with open(trace_file, 'w') as fh:
+                instrument.write_trace(fh, event_list)
+
+    ctx.call_on_close(report)
 
 
-jbutler.add_command(branch)
-jbutler.add_command(config)
-jbutler.add_command(jobs)
-jbutler.add_command(merge)
+def _report_throttle():
+    throttle = sys.modules.get('jbutler.utils.throttle')
+    if throttle is None:
+        return
+    for stat in throttle.stats():
+        click.echo(u'throttle: %d %s requests to %s waited %.2fs' % (
+                   stat.requests, stat.kind, stat.host, stat.waited),
+                   err=True)
@@ -21,6 +21,7 @@ import os
 
 import click
 
+from .. import utils
 from ..lib import branch as libbranch
 
 
@@ -41,4 +42,10 @@ def branch(cfg, from_macros, to_macros, templates):
                      for f in os.listdir(cfg.templatedir)
                      if f.endswith('.yaml') or f.endswith('.yml')]
 
-    libbranch.branch_jobs(templates, from_macros, to_macros, cfg.jobdir)
+    store = utils.openJobStore(cfg.jobdir, cfg.job_store)
+    try:
+        libbranch.branch_jobs(templates, from_macros, to_macros, cfg.jobdir,
+                              cfg.preserve_formatting, cfg.xml_mmap, store)
+    finally:
+        if store is not None:
+            store.close()
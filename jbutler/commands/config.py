@@ -17,7 +17,6 @@
 from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
-import copy
 
 import click
 
@@ -26,7 +25,7 @@ import click
 @click.option('--show-password/--no-show-password', default=False)
 @click.pass_obj
 def config(cfg, show_password):
-    config = copy.copy(cfg)
+    config = cfg
     if not show_password and config.password:
-        config.set('password', '<obscured>')
+        config = config.replace(password='<obscured>')
     config.write(click.get_text_stream('stdout'))
@@ -21,13 +21,18 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import json
 import os
 
 import click
 
+from .. import errors
+from .. import utils
+from ..lib import builds as libbuilds
 from ..lib import jobs as libjobs
 from ..utils import jenkins_utils
-from ..utils import lxml_utils
+from ..utils.output import echo
+from .options import get_workers, jobs_option
 
 
 @click.group(help='Manage jenkins jobs')
@@ -36,37 +41,154 @@ def jobs():
 
 
 @jobs.command()
-@click.argument('jobs', nargs=-1, type=click.File(), required=True)
+@click.argument('jobs', nargs=-1, required=True,
+                type=click.Path(exists=True, dir_okay=False))
 @click.option('--watch/--no-watch', default=True,
               help='Whether to monitor the job console output')
+@click.option('--params-file', type=click.File(),
+              help='CSV or YAML file of parameter sets to build each job '
+                   'with')
+@click.option('--max-in-flight', type=click.IntRange(0), default=None,
+              help='Most builds waiting in the queue at once, defaults to '
+                   'the max_in_flight config option')
+@click.option('--interval', type=float, default=5.0, show_default=True,
+              help='Seconds between polls of the queue and the builds')
+@jobs_option
 @click.pass_obj
-def build(cfg, jobs, watch):
-    """Start a build of a jenkins job"""
-    libjobs.buildJobs(cfg, jobs, watch)
+def build(cfg, jobs, watch, params_file, max_in_flight, interval, workers):
+    """Start a build of a jenkins job
+
+    With --params-file, every job is built once for each parameter set in
+    the file.
+    """
+    paramSets = None
+    if params_file is not None:
+        paramSets = libbuilds.readParamSets(params_file)
+        if not paramSets:
+            raise errors.CommandError(
+                u"No parameter sets in '%s'" % params_file.name)
+    if max_in_flight is None:
+        max_in_flight = cfg.max_in_flight
+    server = jenkins_utils.server_factory(cfg)
+    libjobs.buildJobs(server, jobs, watch, paramSets=paramSets,
+                      maxInFlight=max_in_flight, delay=interval,
+                      workers=get_workers(cfg, workers), jobDir=cfg.jobdir)
 
 
 @jobs.command()
 @click.argument('jobs', nargs=-1, type=click.File(), required=True)
+@jobs_option
 @click.pass_obj
-def create(cfg, jobs):
+def create(cfg, jobs, workers):
     """Create a jenkins job"""
+    workers = get_workers(cfg, workers)
     server = jenkins_utils.server_factory(cfg)
-    libjobs.createJobs(server, jobs)
+    libjobs.createJobs(server, jobs, workers, jobDir=cfg.jobdir)
 
 
 @jobs.command()
 @click.argument('jobs', nargs=-1)
 @click.option('--filter', metavar='PATTERN',
               help='Only retrieve jobs that match the regex PATTERN')
+@jobs_option
 @click.pass_obj
-def retrieve(cfg, jobs, filter):
+def retrieve(cfg, jobs, filter, workers):
     """Retrieve a jenkins job"""
+    workers = get_workers(cfg, workers)
+    server = jenkins_utils.server_factory(cfg)
+    retrieved = libjobs.retrieveJobs(server, jobs, filter, workers=workers,
+                                     folder_depth=cfg.folder_depth,
+                                     page_size=cfg.page_size)
+    configs = libjobs.retrieveConfigs(server, retrieved, workers)
+    store = utils.openJobStore(cfg.jobdir, cfg.job_store)
+    try:
+        for job_name, config in configs:
+            if store is not None:
+                store.put(job_name, config.encode('utf-8'))
+                continue
+            job_file = libjobs.jobFilePath(cfg.jobdir, job_name)
+            job_dir = os.path.dirname(job_file)
+            if not os.path.isdir(job_dir):
+                os.makedirs(job_dir)
+            with open(job_file, 'w') as fh:
+                fh.write(config)
+    finally:
+        if store is not None:
+            store.close()
+
+
+@jobs.command()
+@click.argument('jobs', nargs=-1)
+@click.option('--filter', metavar='PATTERN',
+              help='Only archive logs of jobs that match the regex PATTERN')
+@click.option('--builds', metavar='RANGES',
+              help='Only archive these builds, e.g. 1-5,9,20-')
+@click.option('-o', '--output', default='logs', show_default=True,
+              type=click.Path(file_okay=False),
+              help='Directory to archive logs in')
+@click.option('--gzip/--no-gzip', 'compress', default=False,
+              help='Compress the archived logs')
+@jobs_option
+@click.pass_obj
+def logs(cfg, jobs, filter, builds, output, compress, workers):
+    """Archive the console logs of jenkins builds
+
+    Logs that were archived already are skipped, and logs of builds that
+    are still running are completed by the next run.
+    """
+    from ..lib import logs as liblogs
+    ranges = liblogs.parseBuildRanges(builds) if builds else None
+    workers = get_workers(cfg, workers)
     server = jenkins_utils.server_factory(cfg)
-    retrieved = libjobs.retrieveJobs(server, jobs, filter)
-    for job in retrieved:
-        job_file = os.path.join(cfg.jobdir, job.name + '.xml')
-        with open(job_file, 'w') as fh:
-            fh.write(job.get_config())
+    found = libjobs.retrieveJobs(server, jobs, filter, workers=workers,
+                                 folder_depth=cfg.folder_depth,
+                                 page_size=cfg.page_size)
+    archived = liblogs.archiveLogs(found, output, ranges, compress, workers)
+    echo(u"Archived %d logs" % len(archived))
+
+
+@jobs.command()
+@click.argument('jobs', nargs=-1)
+@click.option('--filter', metavar='PATTERN',
+              help='Only show jobs that match the regex PATTERN')
+@click.option('--result', 'results', multiple=True, metavar='RESULT',
+              help='Only show jobs whose last build is RESULT, e.g. '
+                   'FAILURE, BUILDING or NOT_BUILT, may be repeated')
+@click.option('--format', 'output_format', default='table',
+              type=click.Choice(['table', 'json']),
+              help='Print a table, or a json list')
+@jobs_option
+@click.pass_obj
+def status(cfg, jobs, filter, results, output_format, workers):
+    """Show the last build of jenkins jobs
+
+    All jobs are listed with their last build in one request, or one per
+    folder that is more than folder_depth levels deep.
+    """
+    workers = get_workers(cfg, workers)
+    server = jenkins_utils.server_factory(cfg, lazy=True)
+    rows = libjobs.jobStatus(server, jobs, filter, results,
+                             cfg.folder_depth, workers, cfg.page_size)
+    if output_format == 'json':
+        echo(json.dumps(rows, indent=2, sort_keys=True))
+    else:
+        echo(libjobs.formatStatus(rows))
+
+
+def _toggle(cfg, jobs, force, workers, enabled):
+    """Toggle jobs on the server and, if ``force`` is set, the local config
+    files of the jobs that were toggled"""
+    workers = get_workers(cfg, workers)
+    server = jenkins_utils.server_factory(cfg)
+    if enabled:
+        toggled = libjobs.enableJobs(server, jobs, workers,
+                                     jobDir=cfg.jobdir)
+    else:
+        toggled = libjobs.disableJobs(server, jobs, workers,
+                                      jobDir=cfg.jobdir)
+    if force:
+        libjobs.setLocalDisabled(toggled, not enabled, workers,
+                                 cfg.preserve_formatting, cfg.xml_mmap)
 
 
 @jobs.command()
@@ -74,25 +196,11 @@ def retrieve(cfg, jobs, filter):
                 type=click.Path(exists=True, writable=True, dir_okay=False))
 @click.option('--force/--no-force', default=False,
               help='Update local config file')
+@jobs_option
 @click.pass_obj
-def disable(cfg, jobs, force):
+def disable(cfg, jobs, force, workers):
     """Disable jenkins job"""
-    server = jenkins_utils.server_factory(cfg)
-    disabled = libjobs.disableJobs(server, jobs)
-    if force:
-        for job_file in disabled:
-            with open(job_file) as fh:
-                job_xml = lxml_utils.parse(fh)
-            d = job_xml.xpath('/project/disabled')
-            if not d:
-                click.echo(u"Warning: job config does not have a 'disabled' "
-                           u"property: '%s'" % job_file, err=True)
-            else:
-                d = d[0]
-                if d.text == 'false':
-                    d.text = 'true'
-                    with open(job_file, 'wb') as fh:
-                        fh.write(lxml_utils.tostring(job_xml))
+    _toggle(cfg, jobs, force, workers, enabled=False)
 
 
 @jobs.command()
@@ -100,25 +208,11 @@ def disable(cfg, jobs, force):
                 type=click.Path(exists=True, writable=True, dir_okay=False))
 @click.option('--force/--no-force', default=False,
               help='Update local config file')
+@jobs_option
 @click.pass_obj
-def enable(cfg, jobs, force):
+def enable(cfg, jobs, force, workers):
     """Enable jenkins job"""
-    server = jenkins_utils.server_factory(cfg)
-    enabled = libjobs.enableJobs(server, jobs)
-    if force:
-        for job_file in enabled:
-            with open(job_file) as fh:
-                job_xml = lxml_utils.parse(fh)
-            d = job_xml.xpath('/project/disabled')
-            if not d:
-                click.echo(u"Warning: job config does not have a 'disabled' "
-                           u"property: '%s'" % job_file, err=True)
-            else:
-                d = d[0]
-                if d.text == 'true':
-                    d.text = 'false'
-                    with open(job_file, 'wb') as fh:
-                        fh.write(lxml_utils.tostring(job_xml))
+    _toggle(cfg, jobs, force, workers, enabled=True)
 
 
 @jobs.command()
@@ -130,17 +224,86 @@ def enable(cfg, jobs, force):
 def delete(cfg, jobs, force):
     """Delete jenkins job"""
     server = jenkins_utils.server_factory(cfg)
-    deleted = libjobs.deleteJobs(server, jobs)
+    deleted = libjobs.deleteJobs(server, jobs, jobDir=cfg.jobdir)
     if force:
         for job_name in deleted:
-            job_file = os.path.join(cfg.jobdir, job_name + '.xml')
+            job_file = libjobs.jobFilePath(cfg.jobdir, job_name)
             os.remove(job_file)
 
 
 @jobs.command()
 @click.argument('jobs', nargs=-1, type=click.File(), required=True)
+@jobs_option
 @click.pass_obj
-def update(cfg, jobs):
+def update(cfg, jobs, workers):
     """Update a jenkins job"""
+    workers = get_workers(cfg, workers)
+    server = jenkins_utils.server_factory(cfg)
+    libjobs.updateJobs(server, jobs, workers=workers, jobDir=cfg.jobdir)
+
+
+@jobs.command()
+@click.option('--debounce', type=float, default=0.5, show_default=True,
+              help='Seconds without changes before pushing a batch')
+@click.option('--poll/--no-poll', default=False,
+              help='Poll the jobdir instead of using inotify')
+@click.option('--interval', type=float, default=1.0, show_default=True,
+              help='Seconds between scans when polling')
+@jobs_option
+@click.pass_obj
+def watch(cfg, debounce, poll, interval, workers):
+    """Update jenkins jobs as their config files change
+
+    Watches the jobdir until interrupted. Bursts of changes are collected
+    until the files have been quiet for a moment, then every job whose
+    config differs from the last one pushed is updated.
+    """
+    from ..utils import watch as libwatch
+    workers = get_workers(cfg, workers)
     server = jenkins_utils.server_factory(cfg)
-    libjobs.updateJobs(server, jobs)
+    job_dir = os.path.abspath(cfg.jobdir)
+    watcher = libwatch.watcher(job_dir, poll, interval)
+    digests = libjobs.jobDigests(libwatch.walk(job_dir))
+    echo(u"Watching '%s'" % cfg.jobdir, err=True)
+    try:
+        for changed in libwatch.batches(watcher, debounce):
+            for job_name in libjobs.pushChangedJobs(
+                    server, job_dir, changed, digests, workers):
+                echo(u"Updated job: %s" % job_name)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+
+@jobs.command()
+@click.argument('directory', required=False,
+                type=click.Path(exists=True, file_okay=False))
+@click.pass_obj
+def pack(cfg, directory):
+    """Pack job config files into the job store
+
+    Reads every *.xml file under DIRECTORY, or under the jobdir, into the
+    jobdir's pack. Set the job_store option to 'pack' to use it.
+    """
+    from ..utils import pack as libpack
+    with libpack.PackStore(cfg.jobdir) as store:
+        changed = store.import_files(directory)
+    echo(u"Packed %d jobs, %d changed" % (len(store), changed))
+
+
+@jobs.command()
+@click.argument('directory', required=False,
+                type=click.Path(file_okay=False))
+@click.pass_obj
+def unpack(cfg, directory):
+    """Write the jobs in the job store to plain config files
+
+    Files are written to DIRECTORY, or to the jobdir.
+    """
+    from ..utils import pack as libpack
+    if not libpack.exists(cfg.jobdir):
+        raise errors.CommandError(u"No job pack in '%s'" % cfg.jobdir)
+    with libpack.PackStore(cfg.jobdir) as store:
+        count = store.export_files(directory)
+    echo(u"Unpacked %d jobs" % count)
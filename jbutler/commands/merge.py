@@ -96,14 +96,15 @@ def _mergeTemplateHelper(node, jobTemplate, jobConfig, macros):
     return template_pairs
 
 
-def _mergeJobs(templateList, jobDir, fromMacros):
+def _mergeJobs(templateList, jobDir, fromMacros, use_mmap=False,
+               store=None):
     for templateFile in templateList:
         template = utils.readTemplate(templateFile)
 
         jobFile = os.path.join(
             jobDir, template.get('name') % fromMacros)
 
-        jobData = utils.readJob(jobFile)
+        jobData = utils.readJob(jobFile, use_mmap, store)
 
         try:
             mergedTemplate = _mergeTemplate(template, jobData, fromMacros)
@@ -129,4 +130,9 @@ def merge(cfg, from_macros, templates):
                      for f in os.listdir(template_dir)
                      if f.endswith('.yaml') or f.endswith('.yml')]
 
-    _mergeJobs(templates, cfg.jobdir, from_macros)
+    store = utils.openJobStore(cfg.jobdir, cfg.job_store)
+    try:
+        _mergeJobs(templates, cfg.jobdir, from_macros, cfg.xml_mmap, store)
+    finally:
+        if store is not None:
+            store.close()
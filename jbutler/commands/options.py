@@ -0,0 +1,37 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+options shared by several commands
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import click
+
+jobs_option = click.option(
+    '-j', '--jobs', 'workers', type=click.IntRange(1), default=None,
+    help='Number of concurrent requests, defaults to the max_workers '
+         'config option')
+dry_run_option = click.option(
+    '--dry-run/--no-dry-run', default=False,
+    help='Print the changes that would be made without making them')
+
+
+def get_workers(cfg, workers):
+    """The worker count from the command line, or else from the config"""
+    return workers or cfg.max_workers
@@ -0,0 +1,148 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+views command and sub-commands
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import os
+
+import click
+
+from .. import errors
+from ..jenkinsapi.views import load_view_dicts
+from ..lib import views as libviews
+from ..utils import jenkins_utils
+from ..utils import yaml_utils
+from ..utils.output import echo
+from .options import dry_run_option, get_workers, jobs_option
+
+VIEWS_FILE = 'views.yml'  # name of the views config in a project directory
+
+project_option = click.option(
+    '--project', default='.', type=click.Path(file_okay=False),
+    help='Path to project directory, defaults to current working directory')
+verify_option = click.option(
+    '--verify/--no-verify', default=False,
+    help='Re-poll the server after every view change')
+
+
+def _views_file(project, must_exist=True):
+    views_file = os.path.join(os.path.abspath(project), VIEWS_FILE)
+    if must_exist and not os.path.isfile(views_file):
+        raise errors.CommandError(
+            'no views configuration found at %s' % (project,))
+    return views_file
+
+
+def _echo_plan(plan, dry_run):
+    if dry_run:
+        for change in plan:
+            echo(libviews.format_change(change))
+
+
+@click.group(help='Manage jenkins views')
+def views():
+    pass
+
+
+@views.command()
+@click.argument('views', nargs=-1)
+@project_option
+@jobs_option
+@dry_run_option
+@verify_option
+@click.pass_obj
+def create(cfg, views, project, workers, dry_run, verify):
+    """Create jenkins views from the views config"""
+    workers = get_workers(cfg, workers)
+    server = jenkins_utils.server_factory(cfg)
+    with open(_views_file(project)) as fh:
+        plan = libviews.syncViews(server, fh, views, dry_run=dry_run,
+                                  verify=verify, create_only=True,
+                                  workers=workers)
+    _echo_plan(plan, dry_run)
+
+
+@views.command()
+@click.argument('views', nargs=-1)
+@project_option
+@jobs_option
+@click.option('--stream/--no-stream', default=False,
+              help='Write one yaml document per view as it is retrieved')
+@click.pass_obj
+def retrieve(cfg, views, project, workers, stream):
+    """Retrieve jenkins views and all sub-views"""
+    workers = get_workers(cfg, workers)
+    server = jenkins_utils.server_factory(cfg)
+    views_file = _views_file(project, must_exist=False)
+    if stream:
+        with open(views_file, 'w') as fh:
+            server.views.serialize(views, stream=fh, workers=workers)
+    else:
+        retrieved_views = server.views.serialize(views, workers=workers)
+        with open(views_file, 'w') as fh:
+            fh.write(retrieved_views)
+
+
+@views.command()
+@click.argument('views', nargs=-1)
+@project_option
+@jobs_option
+@dry_run_option
+@verify_option
+@click.option('--prune/--no-prune', default=False,
+              help='Delete views that are not in the views config')
+@click.pass_obj
+def update(cfg, views, project, workers, dry_run, verify, prune):
+    """Update jenkins views to match the views config"""
+    workers = get_workers(cfg, workers)
+    server = jenkins_utils.server_factory(cfg)
+    with open(_views_file(project)) as fh:
+        plan = libviews.syncViews(server, fh, views, prune=prune,
+                                  dry_run=dry_run, verify=verify,
+                                  workers=workers)
+    _echo_plan(plan, dry_run)
+
+
+@views.command()
+@click.argument('views', nargs=-1, required=True)
+@project_option
+@jobs_option
+@dry_run_option
+@verify_option
+@click.option('--force/--no-force', default=False,
+              help='Also delete views from the views config')
+@click.pass_obj
+def delete(cfg, views, project, workers, dry_run, verify, force):
+    """Delete jenkins views and all sub-views"""
+    workers = get_workers(cfg, workers)
+    views_file = _views_file(project)
+    server = jenkins_utils.server_factory(cfg)
+    plan = libviews.deleteViews(server, views, dry_run=dry_run, verify=verify,
+                                workers=workers)
+    _echo_plan(plan, dry_run)
+
+    if force and plan and not dry_run:
+        with open(views_file) as fh:
+            view_objs = list(load_view_dicts(fh))
+        view_objs = libviews.removeViews(view_objs,
+                                         [c.path for c in plan])
+        with open(views_file, 'w') as fh:
+            yaml_utils.dump(view_objs, fh)
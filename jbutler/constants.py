@@ -17,6 +17,8 @@
 
 VIEW_SEP = '/'  # character used to separate view path elements
 
+FOLDER_SEP = '/'  # character used to separate folders in job names
+
 YAML_KWARGS = {  # default args to yaml
     'default_flow_style': False,
 }
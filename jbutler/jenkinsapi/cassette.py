@@ -0,0 +1,180 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Record and replay http traffic
+
+A cassette is a gzipped file with one json interaction per line. Recording
+passes requests through to a real adapter and saves every response, replay
+answers requests from the cassette without touching the network.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import base64
+import gzip
+import hashlib
+import io
+import json
+import threading
+import time
+
+from requests.adapters import BaseAdapter
+from requests.exceptions import ConnectionError
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+import six
+
+RECORD = 'record'
+REPLAY = 'replay'
+MODES = (RECORD, REPLAY)
+
+# response headers that are never written to a cassette
+SKIP_HEADERS = ('set-cookie', 'date')
+
+
+def _body_hash(body):
+    if body is None:
+        return None
+    if isinstance(body, six.text_type):
+        body = body.encode('utf-8')
+    return hashlib.sha1(body).hexdigest()
+
+
+def _key(method, url, body):
+    return (method.upper(), url, _body_hash(body))
+
+
+def _encode_content(content):
+    try:
+        return content.decode('utf-8'), 'utf-8'
+    except UnicodeDecodeError:
+        return base64.b64encode(content).decode('ascii'), 'base64'
+
+
+def _decode_content(text, encoding):
+    if encoding == 'base64':
+        return base64.b64decode(text)
+    return text.encode('utf-8')
+
+
+def load(path):
+    """Read the interactions in a cassette
+
+    :returns: dict mapping (method, url, body hash) to a list of recorded
+              responses, in the order they were recorded
+    """
+    interactions = {}
+    with gzip.open(path, 'rb') as fh:
+        for line in fh:
+            if not line.strip():
+                continue
+            item = json.loads(line.decode('utf-8'))
+            key = (item['method'].upper(), item['url'], item['body'])
+            interactions.setdefault(key, []).append(item)
+    return interactions
+
+
+class CassetteAdapter(BaseAdapter):
+    """A transport adapter that records to or replays from a cassette
+
+    :param str path: cassette file
+    :param str mode: :data:`RECORD` or :data:`REPLAY`
+    :param adapter: adapter that sends requests when recording
+    :type adapter: :class:`requests.adapters.BaseAdapter`
+    :param float latency: seconds added to every replayed request
+    """
+
+    def __init__(self, path, mode=REPLAY, adapter=None, latency=0,
+                 sleep=time.sleep):
+        super(CassetteAdapter, self).__init__()
+        if mode not in MODES:
+            raise ValueError(u"Unknown cassette mode %r" % mode)
+        self.path = path
+        self.mode = mode
+        self.adapter = adapter
+        self.latency = latency
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._recorded = []
+        self._played = {}
+        self._interactions = load(path) if mode == REPLAY else None
+
+    def send(self, request, **kwargs):
+        if self.mode == RECORD:
+            response = self.adapter.send(request, **kwargs)
+            self._record(request, response)
+            return response
+        return self._replay(request)
+
+    def _record(self, request, response):
+        content, encoding = _encode_content(response.content)
+        headers = dict((k, v) for k, v in response.headers.items()
+                       if k.lower() not in SKIP_HEADERS)
+        item = dict(method=request.method, url=request.url,
+                    body=_body_hash(request.body), status=response.status_code,
+                    reason=response.reason, headers=headers, content=content,
+                    encoding=encoding)
+        with self._lock:
+            self._recorded.append(item)
+
+    def _replay(self, request):
+        key = _key(request.method, request.url, request.body)
+        with self._lock:
+            items = self._interactions.get(key)
+            if not items:
+                raise ConnectionError(
+                    u"No recorded response for %s %s" % key[:2],
+                    request=request)
+            # replay responses in order, then keep repeating the last one
+            idx = self._played.get(key, 0)
+            self._played[key] = idx + 1
+            item = items[min(idx, len(items) - 1)]
+
+        if self.latency:
+            self._sleep(self.latency)
+
+        response = Response()
+        response.status_code = item['status']
+        response.reason = item['reason']
+        response.headers = CaseInsensitiveDict(item['headers'])
+        response.encoding = get_encoding_from_headers(response.headers)
+        response._content = _decode_content(item['content'],
+                                            item['encoding'])
+        # the whole body is already in memory, so streaming consumers read
+        # it from _content (iter_content) or from a file-like raw
+        response._content_consumed = True
+        response.raw = io.BytesIO(response._content)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        return response
+
+    def save(self):
+        """Write everything recorded so far to the cassette"""
+        with self._lock:
+            recorded = list(self._recorded)
+        with gzip.open(self.path, 'wb') as fh:
+            for item in recorded:
+                fh.write(json.dumps(item, sort_keys=True).encode('utf-8'))
+                fh.write(b'\n')
+
+    def close(self):
+        if self.mode == RECORD:
+            self.save()
+        if self.adapter is not None:
+            self.adapter.close()
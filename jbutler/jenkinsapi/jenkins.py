@@ -20,22 +20,57 @@ from __future__ import print_function
 
 from jenkinsapi.jenkins import Jenkins as _Jenkins
 from jenkinsapi.custom_exceptions import UnknownJob, JenkinsAPIException
+from requests import HTTPError
+from six.moves.urllib.parse import quote
 
+from ..constants import FOLDER_SEP
+from ..utils import concurrency
+from ..utils.cache import JOBS, POLL
+from .jenkinsbase import JsonDataMixin
+from .job import Job
 from .view import View
 from .views import Views
 
+# fields listed for every job, jobs have a color while folders do not
+JOB_FIELDS = 'name,url,color'
+# fields listed for every job by get_jobs_status
+STATUS_FIELDS = ','.join([
+    JOB_FIELDS, 'lastBuild[number,result,building,duration,timestamp]'])
+
+
+class Jenkins(JsonDataMixin, _Jenkins):
+    """Wrapper around jenkinsapi Jenkins object
+
+    When ``cache`` is set, full polls and job listings are answered from
+    it while they are fresh, see :mod:`jbutler.utils.cache`.
+    """
+
+    def __init__(self, baseurl, username=None, password=None, requester=None,
+                 lazy=False, cache=None):
+        self.cache = cache
+        _Jenkins.__init__(self, baseurl, username, password, requester, lazy)
 
-class Jenkins(_Jenkins):
     def _clone(self):
         return Jenkins(
             self.baseurl,
             username=self.username,
             password=self.password,
             requester=self.requester,
+            cache=self.cache,
         )
 
-    def delete_view(self, view_name):
-        return self.views.delete(view_name)
+    def poll(self, tree=None):
+        if tree or self.cache is None:
+            return _Jenkins.poll(self, tree)
+        data = self.cache.get(POLL, self.baseurl)
+        if data is None:
+            _Jenkins.poll(self)
+            self.cache.set(POLL, self.baseurl, self._data)
+        else:
+            self._data = data
+
+    def delete_view(self, view_name, verify=False):
+        return self.views.delete(view_name, verify)
 
     def get_jenkins_obj_from_url(self, url):
         return Jenkins(url, self.username, self.password, self.requester)
@@ -48,6 +83,27 @@ class Jenkins(_Jenkins):
     def has_view(self, view_path):
         return (view_path in self.views)
 
+    def create_job(self, jobname, config):
+        """Create a job, in its folder if the name has one
+
+        :param jobname: full name of the new job
+        :param config: configuration of the new job, xml
+        :return: new Job obj
+        """
+        if FOLDER_SEP not in jobname:
+            return super(Jenkins, self).create_job(jobname, config)
+        folder, name = jobname.rsplit(FOLDER_SEP, 1)
+        self.requester.post_xml_and_confirm_status(
+            '%s/createItem' % self.job_url(folder), data=config,
+            params={'name': name})
+        return self.get_job(jobname)
+
+    def delete_job(self, jobname):
+        if FOLDER_SEP not in jobname:
+            return super(Jenkins, self).delete_job(jobname)
+        self.requester.post_and_confirm_status(
+            '%s/doDelete' % self.job_url(jobname), data='')
+
     def update_job(self, jobname, config):
         """Update a job
 
@@ -57,24 +113,146 @@ class Jenkins(_Jenkins):
         """
         if self.has_job(jobname):
             self.requester.post_xml_and_confirm_status(
-                '%s/job/%s/config.xml' % (self.baseurl, jobname), data=config)
+                '%s/config.xml' % self.job_url(jobname), data=config)
             self.poll()
             if (not self.has_job(jobname) and
-                    self.jobs[jobname].get_config() != config):
+                    self.get_job(jobname).get_config() != config):
                 raise JenkinsAPIException('Cannot update job %s' % jobname)
         else:
             raise UnknownJob(jobname)
-        return self[jobname]
+        return self.get_job(jobname)
 
     @property
     def views(self):
         return Views(self)
 
-    def get_jobs_info(self):
-        jobs = self.poll(tree='jobs[name,url,color]')['jobs']
+    def get_jobs_info(self, folder_depth=0, workers=1, page_size=0):
+        """Generate the url and full name of every job, including jobs in
+        folders and multibranch projects
+
+        Each request lists ``folder_depth`` levels of folders below the
+        one requested. Folders deeper than that are listed by further
+        requests, up to ``workers`` at a time. If ``page_size`` is set,
+        each folder is listed ``page_size`` jobs at a time, so the size of
+        a response does not grow with the number of jobs. Jobs are
+        generated as soon as the listing that contains them arrives.
+
+        :param int folder_depth: folder levels listed by each request
+        :param int workers: number of folders to list concurrently
+        :param int page_size: number of jobs listed by each request, 0 to
+                              list each folder in one request
+        :returns: generator of (url, name) tuples, where the name of a job
+                  in a folder is its full path, e.g. ``folder/job``
+        """
+        jobs = ((info['url'], name) for name, info in
+                self._list_jobs(JOB_FIELDS, folder_depth, workers, page_size))
+        if self.cache is None:
+            return jobs
+        cached = self.cache.get(JOBS)
+        if cached is not None:
+            return iter([tuple(info) for info in cached])
+        return self._cache_jobs(jobs)
+
+    def _cache_jobs(self, jobs):
+        """Pass ``jobs`` through, caching them once all were listed"""
+        listed = []
         for info in jobs:
-            yield info['url'], info['name']
+            listed.append(info)
+            yield info
+        self.cache.set(JOBS, '', listed)
+
+    def get_jobs_status(self, folder_depth=0, workers=1, page_size=0):
+        """Generate the full name, color and last build of every job
+
+        Jobs are listed the way :meth:`get_jobs_info` lists them, so all
+        jobs that are at most ``folder_depth`` folders deep come from a
+        single request. The listing is never cached.
+
+        :returns: generator of (name, info) tuples, where info is a dict
+                  holding the job's ``url`` and ``color``, and its
+                  ``lastBuild``, a dict of ``number``, ``result``,
+                  ``building``, ``duration`` and ``timestamp`` or None if
+                  the job never ran
+        """
+        return self._list_jobs(STATUS_FIELDS, folder_depth, workers,
+                               page_size)
+
+    def _list_jobs(self, fields, folder_depth, workers, page_size):
+        """Generate (name, info) for every job, listing ``fields``"""
+        tree = _jobs_tree(folder_depth, fields)
+
+        def list_page(page):
+            url, prefix, start = page
+            page_tree = tree
+            if page_size:
+                page_tree = '%s{%d,%d}' % (tree, start, start + page_size)
+            # not poll(), which replaces every folder in the listing by
+            # its jobs, with one more request per folder
+            return (self.get_data(self.python_api_url(url), tree=page_tree)
+                    .get('jobs', []), page)
+
+        pending = [(self.baseurl, '', 0)]
+        while pending:
+            folders = []
+            for jobs, page in concurrency.imap(list_page, pending, workers):
+                url, prefix, start = page
+                if page_size and len(jobs) == page_size:
+                    folders.append((url, prefix, start + page_size))
+                for info in _walk_jobs(jobs, prefix, folders):
+                    yield info
+            pending = folders
+
+    def job_url(self, jobname):
+        """The url of a job, given its full name"""
+        return '%s/job/%s' % (self.baseurl.rstrip('/'), '/job/'.join(
+            quote(part, safe='') for part in jobname.split(FOLDER_SEP)))
+
+    def get_job(self, jobname):
+        if FOLDER_SEP not in jobname:
+            # jenkinsapi would return its own Job, which parses api/python
+            self.poll()
+            for info in self._data.get('jobs', []):
+                if info['name'] == jobname:
+                    return Job(info['url'], jobname, self)
+            raise UnknownJob(jobname)
+        return Job(self.job_url(jobname), jobname, self)
+
+    def has_job(self, jobname):
+        if FOLDER_SEP not in jobname:
+            return super(Jenkins, self).has_job(jobname)
+        try:
+            self.get_data(self.python_api_url(self.job_url(jobname)),
+                          tree='name')
+        except HTTPError as err:
+            if err.response is not None and err.response.status_code == 404:
+                return False
+            raise
+        return True
 
     def get_job_config(self, url):
         response = self.requester.get_and_confirm_status(url + '/config.xml')
         return response.text
+
+
+def _jobs_tree(depth, fields=JOB_FIELDS):
+    """A tree parameter listing ``fields`` of jobs ``depth`` folders deep"""
+    tree = 'jobs[%s]' % fields
+    for _ in range(depth):
+        tree = 'jobs[%s,%s]' % (fields, tree)
+    return tree
+
+
+def _walk_jobs(jobs, prefix, folders):
+    """Generate (name, info) for the jobs in a listing, adding the folders
+    whose contents were not listed to ``folders`` as (url, prefix, start)
+    pages"""
+    for info in jobs:
+        name = prefix + info['name']
+        if 'jobs' in info:
+            for item in _walk_jobs(info['jobs'], name + FOLDER_SEP, folders):
+                yield item
+        elif 'color' in info:
+            yield name, info
+        else:
+            # folders have no color, their jobs need another request
+            folders.append((info['url'], name + FOLDER_SEP, 0))
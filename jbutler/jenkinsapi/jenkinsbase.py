@@ -0,0 +1,51 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import logging
+
+from jenkinsapi import config
+from jenkinsapi.custom_exceptions import JenkinsAPIException
+from jenkinsapi.jenkinsbase import JenkinsBase
+
+JSON_API = 'api/json'
+
+
+class JsonDataMixin(object):
+    """Fetch api urls as json rather than as python literals
+
+    jenkinsapi parses api/python with :func:`ast.literal_eval`, which is
+    slower than the json parser and is not safe to call from several
+    threads at once on some python releases.
+    """
+
+    def get_data(self, url, params=None, tree=None):
+        if config.JENKINS_API not in url:
+            return JenkinsBase.get_data(self, url, params, tree)
+        url = url.replace(config.JENKINS_API, JSON_API)
+        if tree:
+            params = dict(params or {}, tree=tree)
+
+        response = self.get_jenkins_obj().requester.get_url(url, params)
+        if response.status_code != 200:
+            logging.error('Failed request at %s with params: %s', url, params)
+            response.raise_for_status()
+        try:
+            return response.json()
+        except ValueError:
+            raise JenkinsAPIException('Cannot parse %s' % response.content)
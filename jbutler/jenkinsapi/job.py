@@ -20,6 +20,8 @@ from __future__ import print_function
 
 from jenkinsapi.job import Job as _Job
 
+from .jenkinsbase import JsonDataMixin
 
-class Job(_Job):
+
+class Job(JsonDataMixin, _Job):
     pass
@@ -17,9 +17,139 @@
 from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
+import atexit
 
 from jenkinsapi.utils.requester import Requester as _Requester
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+from six.moves.urllib.parse import urlparse
+import requests
+import six
+
+from ..utils import instrument
+from ..utils import throttle
+
+RETRIES = 3  # attempts made for idempotent requests when retrying
+RETRY_STATUSES = (502, 503, 504)  # statuses that are worth retrying
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')  # methods throttled as reads
 
 
 class Requester(_Requester):
-    pass
+    """
+    Wrapper around jenkinsapi Requester that sends every request through
+    one pooled session, with timeouts and optional retries
+
+    When ``requests_per_second`` is set, reads and writes are throttled by
+    one token bucket that is shared with every other requester in the
+    process talking to the same host.
+
+    When ``cassette`` is set, traffic is recorded to or replayed from that
+    file, see :mod:`jbutler.jenkinsapi.cassette`.
+
+    When ``cache`` is set, every request that changes the server drops the
+    cached entries it may have invalidated, see :mod:`jbutler.utils.cache`.
+    """
+    def __init__(self, username=None, password=None, ssl_verify=True,
+                 baseurl=None, timeout=None, retry_backoff=0, pool_size=10,
+                 requests_per_second=0, cassette=None,
+                 cassette_mode='replay', cassette_latency=0, cache=None):
+        _Requester.__init__(self, username, password, ssl_verify, baseurl)
+        self.timeout = timeout
+        self.requests_per_second = requests_per_second
+        self.cache = cache
+
+        if retry_backoff:
+            retries = Retry(total=RETRIES, backoff_factor=retry_backoff,
+                            status_forcelist=RETRY_STATUSES,
+                            raise_on_status=False)
+        else:
+            retries = 0
+        adapter = HTTPAdapter(pool_maxsize=pool_size, max_retries=retries)
+        if cassette:
+            from .cassette import CassetteAdapter, RECORD
+            adapter = CassetteAdapter(cassette, cassette_mode, adapter,
+                                      latency=cassette_latency)
+            if cassette_mode == RECORD:
+                atexit.register(adapter.close)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def get_request_dict(self, *args, **kwargs):
+        requestKwargs = _Requester.get_request_dict(self, *args, **kwargs)
+        if self.timeout is not None:
+            requestKwargs.setdefault('timeout', self.timeout)
+        return requestKwargs
+
+    def get_url(self, url, params=None, headers=None, allow_redirects=True):
+        requestKwargs = self.get_request_dict(
+            params=params,
+            headers=headers,
+            allow_redirects=allow_redirects)
+        return self._request('GET', url, **requestKwargs)
+
+    def get_stream(self, url, params=None, headers=None):
+        """GET ``url`` without reading the response body
+
+        Read the body with ``iter_content`` and close the response when
+        done, so its connection goes back to the pool.
+        """
+        requestKwargs = self.get_request_dict(params=params, headers=headers)
+        return self._request('GET', url, stream=True, **requestKwargs)
+
+    def post_url(self, url, params=None, data=None, files=None,
+                 headers=None, allow_redirects=True):
+        requestKwargs = self.get_request_dict(
+            params=params,
+            data=data,
+            files=files,
+            headers=headers,
+            allow_redirects=allow_redirects)
+        return self._request('POST', url, **requestKwargs)
+
+    def post_and_confirm_status(self, url, params=None, data=None,
+                                files=None, headers=None, valid=None,
+                                allow_redirects=True):
+        # jenkinsapi only accepts dict or bytes, but creates and deletes
+        # jobs with text bodies on python 3
+        if isinstance(data, six.text_type):
+            data = data.encode('utf-8')
+        return _Requester.post_and_confirm_status(
+            self, url, params=params, data=data, files=files,
+            headers=headers, valid=valid, allow_redirects=allow_redirects)
+
+    def _request(self, method, url, **kwargs):
+        url = self._update_url_scheme(url)
+        read = method in READ_METHODS
+        if self.requests_per_second:
+            kind = throttle.READ if read else throttle.WRITE
+            throttle.acquire(urlparse(url).netloc, kind,
+                             self.requests_per_second)
+        if read or self.cache is None:
+            return self._send(method, url, **kwargs)
+        try:
+            return self._send(method, url, **kwargs)
+        finally:
+            # even a failed write may have changed something
+            self.cache.written(url)
+
+    def _send(self, method, url, **kwargs):
+        if not instrument.enabled():
+            return self.session.request(method, url, **kwargs)
+
+        start = instrument.timer()
+        response = None
+        try:
+            response = self.session.request(method, url, **kwargs)
+            return response
+        finally:
+            status = nbytes = None
+            if response is not None:
+                status = response.status_code
+                if kwargs.get('stream'):
+                    # reading the content would defeat streaming
+                    nbytes = int(response.headers.get('Content-Length', 0))
+                else:
+                    nbytes = len(response.content)
+            instrument.record_request(method, url, status, nbytes, start,
+                                      instrument.timer() - start)
@@ -22,9 +22,10 @@ from jenkinsapi.view import View as _View
 
 from ..constants import VIEW_SEP
 from ..utils import lxml_utils
+from .jenkinsbase import JsonDataMixin
 
 
-class View(_View):
+class View(JsonDataMixin, _View):
     """
     Wrapper around jenkinsapi View object
     """
@@ -96,4 +97,8 @@ class View(_View):
                 recurse=self.recurse,
                 includeRegex=self.includeRegex,
             )
+            # the jobs listed by the server include those matched by the
+            # regex, which must not be written back as explicit members
+            if not self.includeRegex:
+                data['jobs'] = sorted(self.get_job_dict())
         return data
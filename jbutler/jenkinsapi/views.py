@@ -17,13 +17,17 @@
 from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
+import json
 import logging
-import urllib
+import threading
 
 from jenkinsapi.views import Views as _Views
-import yaml
+from six.moves.urllib.parse import quote, urlencode
 
-from ..constants import VIEW_SEP, YAML_KWARGS
+from ..constants import VIEW_SEP
+from ..utils import concurrency
+from ..utils.cache import VIEW
+from ..utils import yaml_utils
 from .view import View
 
 
@@ -32,9 +36,37 @@ FIELDS = ('name', 'description', 'filterQueue', 'filterExecutors',)
 LIST_FIELDS = FIELDS + ('statusFilter', 'recurse',)
 NESTED_FIELDS = FIELDS + ('defaultView',)
 
+# approximate size of the request line and headers sent with every POST
+REQUEST_OVERHEAD = 512
+
+# marks a view that is not in the cache, as opposed to a cached None
+_MISSING = object()
+
 
 log = logging.getLogger(__name__)
 
+# guards the local view indexes, which may be updated from worker threads
+_index_lock = threading.Lock()
+
+
+def _request_size(url, body):
+    """Approximate number of bytes sent for a POST of ``body`` to ``url``"""
+    return REQUEST_OVERHEAD + len(url) + len(body)
+
+
+def load_view_dicts(data):
+    """Lazily load serialized views from a yaml string or file
+
+    Both a single document holding a list of views and a multi-document
+    stream with one top-level view per document are accepted.
+    """
+    for doc in yaml_utils.load_all(data):
+        if isinstance(doc, list):
+            for view_obj in doc:
+                yield view_obj
+        elif doc is not None:
+            yield doc
+
 
 class Views(_Views):
     """Wrapper around jenkinsapi Views object"""
@@ -50,12 +82,36 @@ class Views(_Views):
             return None
 
     def _from_yaml(self, data):
-        return yaml.safe_load(data)
-
-    def _to_yaml(self, view_objs):
-        return yaml.safe_dump(view_objs, **YAML_KWARGS)
-
-    def _createView(self, view_obj, parent_view, view_list=None, force=False):
+        return load_view_dicts(data)
+
+    def _to_yaml(self, view_objs, stream=None):
+        if stream is not None:
+            return yaml_utils.dump_all(view_objs, stream)
+        return yaml_utils.dump(list(view_objs))
+
+    def _index(self):
+        """The list of view rows in the jenkins object's cached data"""
+        if self.jenkins._data is None:
+            self.jenkins.poll()
+        return self.jenkins._data.setdefault('views', [])
+
+    def _add_to_index(self, view_name):
+        """Record a newly created view in the local view index"""
+        url = '%s/view/%s/' % (self.jenkins.baseurl, quote(view_name))
+        rows = self._index()
+        with _index_lock:
+            rows[:] = [r for r in rows if r['name'] != view_name]
+            rows.append({'name': view_name, 'url': url})
+
+    def _remove_from_index(self, view_url):
+        """Drop a deleted view from the local view index"""
+        view_url = view_url.rstrip('/')
+        rows = self._index()
+        with _index_lock:
+            rows[:] = [r for r in rows if r['url'].rstrip('/') != view_url]
+
+    def _createView(self, view_obj, parent_view, view_list=None, force=False,
+                    verify=False):
         """Create a view and all sub-views from a viewObj"""
         if parent_view is None:
             raise Exception(
@@ -63,7 +119,8 @@ class Views(_Views):
                 view_obj['path'])
 
         if not view_list or view_obj['path'] in view_list:
-            view = self._create_view_helper(view_obj, parent_view, force)
+            view = self._create_view_helper(view_obj, parent_view, force,
+                                            verify)
             created_views = [view]
         else:
             view = self.get_view_by_path(view_obj['path'])
@@ -71,26 +128,58 @@ class Views(_Views):
 
         for subview in view_obj.get('views', []):
             created_views.extend(
-                self._createView(subview, view.views, view_list))
+                self._createView(subview, view.views, view_list,
+                                 verify=verify))
         return created_views
 
-    def _create_view_helper(self, view_obj, parent_view, force=False):
+    def _create_view_helper(self, view_obj, parent_view, force=False,
+                            verify=False):
         view_name = view_obj['name']
         view_type = NESTED_VIEW if 'views' in view_obj else LIST_VIEW
 
         if view_name not in parent_view or force:
-            view = parent_view.create(view_name, view_type)
+            view = parent_view.create(view_name, view_type, verify)
 
             if view_type == LIST_VIEW:
-                view = self._configureListView(view, view_obj)
+                view = parent_view._configureListView(view, view_obj, verify)
         else:
             view = parent_view[view_name]
         return view
 
-    def _configureListView(self, view, viewConfig):
-        log.info('Configuring "%s" view' % (view.name,))
+    def create(self, view_name, view_type=LIST_VIEW, verify=False):
+        """Create a view
 
-        url = '%s/configSubmit' % view.baseurl
+        Unless ``verify`` is set the new view is added to the local view
+        index instead of re-polling the whole master.
+
+        :param str view_name: name of the new view
+        :param str view_type: jenkins class of the new view
+        :param bool verify: poll the server after creating the view
+        :returns: the new :class:`View`
+        """
+        if verify:
+            return _Views.create(self, view_name, view_type)
+
+        log.info('Creating "%s" view "%s"' % (view_type, view_name))
+        if view_name in self:
+            log.warning('View "%s" already exists' % view_name)
+            return self[view_name]
+
+        url = '%s/createView' % self.jenkins.baseurl
+        data = {
+            'name': view_name,
+            'mode': view_type,
+            'Submit': 'OK',
+            'json': json.dumps({'name': view_name, 'mode': view_type}),
+        }
+        self.jenkins.requester.post_and_confirm_status(
+            url, data=data,
+            headers={'Content-Type': 'application/x-www-form-urlencoded'})
+        self._add_to_index(view_name)
+        return self[view_name]
+
+    def _list_view_form(self, viewConfig):
+        """Build the url-encoded configSubmit form for a list view"""
         json_data = dict((k, v) for k, v in viewConfig.items()
                          if k in LIST_FIELDS)
 
@@ -134,30 +223,88 @@ class Views(_Views):
 
         data['json'] = json_data
         data['Submit'] = 'OK'
+        return urlencode(data).encode('utf-8')
 
+    def _configureListView(self, view, viewConfig, verify=False):
+        log.info('Configuring "%s" view' % (view.name,))
+
+        url = '%s/configSubmit' % view.baseurl
         self.jenkins.requester.post_and_confirm_status(
-            url, data=urllib.urlencode(data))
-        self.jenkins.poll()
+            url, data=self._list_view_form(viewConfig))
+        if verify:
+            self.jenkins.poll()
+        return self[view.name]
+
+    def update_job_membership(self, view, viewConfig, current_jobs,
+                              verify=False):
+        """Make the jobs in list ``view`` match ``viewConfig['jobs']``
+
+        Small changes are sent as one addJobToView or removeJobFromView
+        call per job. If those requests would be larger in total than a
+        full configSubmit of the view, the whole config is rewritten
+        instead.
+
+        :param view: the list view to update
+        :param dict viewConfig: serialized view, as from :meth:`View.toDict`
+        :param current_jobs: names of the jobs currently in the view
+        :param bool verify: poll the server after the update
+        :returns: the updated :class:`View`
+        """
+        desired = set(viewConfig.get('jobs', []))
+        current = set(current_jobs)
+        to_add = sorted(desired - current)
+        to_remove = sorted(current - desired)
+        if not (to_add or to_remove):
+            return view
+
+        calls = [('%s/addJobToView' % view.baseurl, name)
+                 for name in to_add]
+        calls.extend(('%s/removeJobFromView' % view.baseurl, name)
+                     for name in to_remove)
+        full_size = _request_size('%s/configSubmit' % view.baseurl,
+                                  self._list_view_form(viewConfig))
+        delta_size = sum(_request_size(url, urlencode({'name': name}))
+                         for url, name in calls)
+        if delta_size >= full_size:
+            return self._configureListView(view, viewConfig, verify)
+
+        log.info('Updating %d jobs in "%s" view' % (len(calls), view.name))
+        for url, name in calls:
+            self.jenkins.requester.post_and_confirm_status(
+                url, params={'name': name}, data=b'')
+        if verify:
+            self.jenkins.poll()
         return self[view.name]
 
     def deserialize(self, data, view_list=None, serialization='yaml',
-                    update=False):
+                    update=False, verify=False):
+        """Create the views described by ``data``
+
+        The local view index is updated as views are created and the
+        master is polled once after the whole batch, unless ``verify`` is
+        set, in which case it is polled after every change.
+        """
         deserializer = getattr(self, '_from_%s' % serialization)
 
         created_views = []
         for view_obj in deserializer(data):
             created_views.extend(
-                self._createView(view_obj, self, view_list, update))
+                self._createView(view_obj, self, view_list, update, verify))
+        if created_views and not verify:
+            self.jenkins.poll()
         return created_views
 
-    def delete(self, view_path):
+    def delete(self, view_path, verify=False):
         view = self.get_view_by_path(view_path)
-        self.delete_view_by_url(view.baseurl)
+        return self.delete_view_by_url(view.baseurl, verify)
 
-    def delete_view_by_url(self, str_url):
+    def delete_view_by_url(self, str_url, verify=False):
         url = '%s/doDelete' % str_url
-        self.jenkins.requester.post_and_confirm_status(url, data='')
-        self.jenkins.poll()
+        self.jenkins.requester.post_and_confirm_status(url, data=b'')
+        if verify:
+            self.jenkins.poll()
+        else:
+            self._remove_from_index(str_url)
         return self
 
     def get_view_by_path(self, view_path):
@@ -170,20 +317,48 @@ class Views(_Views):
         except (AttributeError, KeyError):
             return None
 
-    def serialize(self, viewList=None, serialization='yaml', root_path=None):
-        viewObjs = []
-        for viewName, view in self.iteritems():
-            if 'nodeDescription' in view._data:
-                continue
+    def iter_view_dicts(self, viewList=None, root_path=None, workers=1):
+        """Generate the serializable dict of each top-level view
 
-            if viewList and viewName not in viewList:
-                continue
-
-            viewObj = view.toDict(root_path)
-            viewObjs.append(viewObj)
+        Up to ``workers`` views are retrieved concurrently, but they are
+        always generated in server order. Views found in the server's
+        cache are not retrieved again.
+        """
+        cache = getattr(self.jenkins, 'cache', None)
+        if root_path is not None:
+            cache = None
+
+        def to_dict(row):
+            if cache is not None:
+                cached = cache.get(VIEW, row['name'], _MISSING)
+                if cached is not _MISSING:
+                    return cached
+            view = View(row['url'], row['name'], self.jenkins)
+            view_obj = None
+            if 'nodeDescription' not in view._data:
+                view_obj = view.toDict(root_path)
+            if cache is not None:
+                cache.set(VIEW, row['name'], view_obj)
+            return view_obj
 
+        self.jenkins.poll()
+        rows = [row for row in self.jenkins._data.get('views', [])
+                if not viewList or row['name'] in viewList]
+        for view_obj in concurrency.imap(to_dict, rows, workers):
+            if view_obj is not None:
+                yield view_obj
+
+    def serialize(self, viewList=None, serialization='yaml', root_path=None,
+                  stream=None, workers=1):
+        """Serialize views
+
+        If ``stream`` is given, views are written to it one document per
+        top-level view as soon as each one is retrieved, and nothing is
+        returned. Otherwise the serialized views are returned as a string.
+        """
+        viewObjs = self.iter_view_dicts(viewList, root_path, workers)
         serializer = getattr(self, '_to_%s' % serialization)
-        return serializer(viewObjs)
+        return serializer(viewObjs, stream)
 
     def iteritems(self):
         """
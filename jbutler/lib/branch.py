@@ -27,7 +27,16 @@ from .. import errors
 from .. import utils
 
 
-def branch_jobs(templates, from_macros, to_macros, job_dir):
+def branch_jobs(templates, from_macros, to_macros, job_dir,
+                preserve_formatting=False, use_mmap=False, store=None):
+    """Write a copy of each templated job with ``to_macros`` applied
+
+    :param bool preserve_formatting: keep the whitespace of the original
+        job instead of re-indenting it
+    :param bool use_mmap: memory map job files when reading them
+    :param store: pack holding the jobs of ``job_dir``, if any
+    :type store: :class:`jbutler.utils.pack.PackStore`
+    """
     for template in templates:
         template = utils.readTemplate(template)
 
@@ -46,7 +55,7 @@ def branch_jobs(templates, from_macros, to_macros, job_dir):
         new_file = os.path.join(job_dir, template.get('name') % to_macros)
 
         # read job data from oldFile
-        job_data = utils.readJob(old_file)
+        job_data = utils.readJob(old_file, use_mmap, store)
 
         # update jobData with toMacros
         try:
@@ -57,7 +66,7 @@ def branch_jobs(templates, from_macros, to_macros, job_dir):
                 u"%s parsing job '%s'" % (err, old_file))
 
         # write new job data to new file
-        utils.writeJob(new_file, new_job_data)
+        utils.writeJob(new_file, new_job_data, preserve_formatting, store)
 
         if 'macros' in template:
             # backwards compat for storing macros in templates
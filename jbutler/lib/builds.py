@@ -0,0 +1,234 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Library for triggering builds and following them to completion
+
+Each build request is posted to the server, which answers with a queue
+item. One supervisor loop then polls every queue item until its build
+starts and, when watching, every running build's console until it
+finishes, so a sweep over many parameter sets needs no thread per build.
+At most ``maxInFlight`` requests are left waiting in the queue at a time;
+the rest are only submitted as queued builds start.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import collections
+import csv
+import itertools
+import logging
+import os
+import time
+
+from jenkinsapi.custom_exceptions import NotBuiltYet
+import six
+
+from .. import errors
+from ..utils import concurrency
+from ..utils import yaml_utils
+from ..utils.output import echo
+from .logs import PROGRESSIVE_TEXT
+
+log = logging.getLogger(__name__)
+
+# states of a build request
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+
+CANCELLED = 'CANCELLED'
+
+
+def readParamSets(stream):
+    """Read a matrix of build parameter sets
+
+    A ``.csv`` file names the parameters in its first row, and every
+    further row is one parameter set. Any other file is read as yaml,
+    either a list of mappings, each one parameter set, or a mapping of
+    parameter names to lists of values, which is expanded to every
+    combination of the values.
+
+    :param stream: file-like object with a ``name``
+    :returns: list of dicts mapping parameter names to string values
+    :raises errors.CommandError: if the file does not hold parameter sets
+    """
+    name = getattr(stream, 'name', '')
+    if os.path.splitext(name)[1].lower() == '.csv':
+        reader = csv.DictReader(stream)
+        paramSets = []
+        for row in reader:
+            if None in row:
+                raise errors.CommandError(
+                    u"Too many values on line %d of '%s'" % (
+                        reader.line_num, name))
+            if any(value for value in row.values()):
+                paramSets.append(dict((key, value or '')
+                                      for key, value in row.items()))
+        return paramSets
+
+    data = yaml_utils.load(stream)
+    if isinstance(data, dict):
+        names = sorted(data)
+        values = [v if isinstance(v, list) else [v]
+                  for v in (data[n] for n in names)]
+        data = [dict(zip(names, combination))
+                for combination in itertools.product(*values)]
+    if not isinstance(data, list) or not all(
+            isinstance(params, dict) for params in data):
+        raise errors.CommandError(
+            u"'%s' must hold a list of parameter sets or a mapping of "
+            u"parameters to values" % name)
+    return [dict((six.text_type(key), _paramValue(value))
+                 for key, value in params.items()) for params in data]
+
+
+def _paramValue(value):
+    if isinstance(value, bool):
+        return u'true' if value else u'false'
+    if value is None:
+        return u''
+    return six.text_type(value)
+
+
+class BuildRequest(object):
+    """A build of one job with one parameter set, from the queue to its
+    result"""
+
+    def __init__(self, job, params=None):
+        self.job = job
+        self.params = params or {}
+        self.state = QUEUED
+        self.queue = None
+        self.url = None
+        self.number = None
+        self.result = None
+        self.offset = 0
+        self.partial = u''
+
+    @property
+    def label(self):
+        if self.number is None:
+            return self.job.name
+        return u'%s #%d' % (self.job.name, self.number)
+
+    def echo(self, message):
+        echo(u'[%s] %s' % (self.label, message))
+
+
+class BuildSupervisor(object):
+    """Submit build requests and follow them in a single polling loop
+
+    :param server: A jenkins server
+    :type server: :class:`jenkinsapi.jenkins.Jenkins`
+    :param int maxInFlight: most requests waiting in the queue at once,
+                            0 for no limit
+    :param bool watch: follow the console output of the builds until they
+                       finish, rather than only until they start
+    :param float delay: seconds between polls
+    :param int workers: number of concurrent requests
+    """
+
+    def __init__(self, server, maxInFlight=0, watch=True, delay=5,
+                 workers=1):
+        self.server = server
+        self.maxInFlight = maxInFlight
+        self.watch = watch
+        self.delay = delay
+        self.workers = workers
+
+    def run(self, requests):
+        """Submit every request and poll them until they are done
+
+        :param list requests: :class:`BuildRequest` objects
+        :returns: ``requests``
+        """
+        pending = collections.deque(requests)
+        active = []
+        while pending or active:
+            active = [request for request in concurrency.imap(
+                self._poll, active, self.workers) if request.state != DONE]
+
+            if self.maxInFlight:
+                queued = sum(1 for r in active if r.state == QUEUED)
+                free = min(len(pending), max(self.maxInFlight - queued, 0))
+            else:
+                free = len(pending)
+            batch = [pending.popleft() for _ in range(free)]
+            active.extend(request for request in concurrency.imap(
+                self._submit, batch, self.workers) if request.state != DONE)
+            if active:
+                time.sleep(self.delay)
+        return requests
+
+    def _submit(self, request):
+        # the queue item is read as it is created, so check it right away
+        request.queue = request.job.invoke(build_params=request.params)
+        log.info('Queued %s at %s', request.job.name, request.queue.baseurl)
+        self._checkQueue(request)
+        return request
+
+    def _poll(self, request):
+        if request.state == QUEUED:
+            request.queue.poll()
+            self._checkQueue(request)
+        elif request.state == RUNNING:
+            self._pollConsole(request)
+        return request
+
+    def _checkQueue(self, request):
+        queue = request.queue
+        if queue._data.get('cancelled'):
+            request.state = DONE
+            request.result = CANCELLED
+            request.echo(u'Cancelled while queued')
+            return
+        try:
+            request.number = queue.get_build_number()
+        except NotBuiltYet:
+            return
+        request.url = queue._data['executable']['url']
+        request.state = RUNNING if self.watch else DONE
+        request.echo(u'Started %s' % _describe(request.params))
+
+    def _pollConsole(self, request):
+        response = self.server.requester.get_url(
+            request.url.rstrip('/') + '/' + PROGRESSIVE_TEXT,
+            params={'start': request.offset})
+        response.raise_for_status()
+        request.offset = int(response.headers.get('X-Text-Size',
+                                                  request.offset))
+        lines = (request.partial + response.text).split(u'\n')
+        request.partial = lines.pop()
+        for line in lines:
+            if line:
+                request.echo(line)
+        if response.headers.get('X-More-Data') == 'true':
+            return
+        if request.partial:
+            request.echo(request.partial)
+            request.partial = u''
+        data = self.server.get_data(
+            self.server.python_api_url(request.url), tree='result')
+        request.result = data.get('result')
+        request.state = DONE
+
+
+def _describe(params):
+    if not params:
+        return u'without parameters'
+    return u'with ' + u', '.join(u'%s=%s' % (key, params[key])
+                                 for key in sorted(params))
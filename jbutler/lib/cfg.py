@@ -17,9 +17,16 @@
 from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
+import os
+import threading
+
+import six
 from six.moves import configparser
 from six.moves.configparser import Error
 
+# prefix of the sections naming the masters of a fleet, as in [server:NAME]
+FLEET_PREFIX = 'server:'
+
 
 class InvalidSectionError(Error):
     """Raised when an invalid section name is found"""
@@ -35,7 +42,7 @@ class InvalidSectionError(Error):
             msg = message
         else:
             msg.insert(0, 'Invalid sections: ')
-        Error.__init__(''.join(msg))
+        Error.__init__(self, ''.join(msg))
         self.sections = sections
         self.source = source
         self.lineno = lineno
@@ -61,6 +68,27 @@ class JbutlerConfigParser(object):
                    ssl_verify=dict(type=bool, default='true'),
                    jobdir=dict(default='jobs'),
                    templatedir=dict(default='templates'),
+                   max_workers=dict(type=int, default='1', min=1),
+                   max_in_flight=dict(type=int, default='0', min=0),
+                   requests_per_second=dict(type=float, default='0',
+                                            min=0),
+                   connect_timeout=dict(type=float, default='10', min=0),
+                   read_timeout=dict(type=float, default='120', min=0),
+                   retry_backoff=dict(type=float, default='0', min=0),
+                   pool_size=dict(type=int, default='10', min=1),
+                   cassette=dict(default=''),
+                   cassette_mode=dict(default='replay',
+                                      choices=('record', 'replay')),
+                   cassette_latency=dict(type=float, default='0', min=0),
+                   preserve_formatting=dict(type=bool, default='false'),
+                   xml_mmap=dict(type=bool, default='false'),
+                   folder_depth=dict(type=int, default='2', min=0),
+                   page_size=dict(type=int, default='0', min=0),
+                   job_store=dict(default='files',
+                                  choices=('files', 'pack')),
+                   cache=dict(default=''),
+                   cache_ttl=dict(type=float, default='300', min=0),
+                   cache_refresh=dict(type=bool, default='false'),
                    )
 
     def __init__(self):
@@ -89,61 +117,245 @@ class JbutlerConfigParser(object):
 
     def _validate_value(self, option, value, raise_exception=True):
         try:
-            self._get_option_config(option)
+            option_config = self._get_option_config(option)
         except TypeError:
             if raise_exception:
                 raise
-        else:
-            cfg_type = self.options[option].get('type', str)
-            if isinstance(value, cfg_type):
-                return True
-        if raise_exception:
-            raise TypeError(u"Option '%s' must be of type %s" %
-                            (option, cfg_type))
-        return False
+            return False
+
+        cfg_type = option_config.get('type', str)
+        try:
+            value = _coerce(cfg_type, value)
+        except (AttributeError, TypeError, ValueError):
+            if raise_exception:
+                raise TypeError(u"Option '%s' must be of type %s" %
+                                (option, cfg_type.__name__))
+            return False
+
+        choices = option_config.get('choices')
+        if choices is not None and value not in choices:
+            if raise_exception:
+                raise ValueError(u"Option '%s' must be one of %s" %
+                                 (option, ', '.join(choices)))
+            return False
+
+        minimum = option_config.get('min')
+        if minimum is not None and value < minimum:
+            if raise_exception:
+                raise ValueError(u"Option '%s' must be at least %s" %
+                                 (option, minimum))
+            return False
+        return True
+
+    def masters(self):
+        """Names of the masters of the fleet, in the order they were read"""
+        return [s[len(FLEET_PREFIX):] for s in self._cfg.sections()
+                if s.startswith(FLEET_PREFIX)]
 
     def items(self, raw=False, vars=None):
         return self._cfg.items('jbutler', raw=raw, vars=vars)
 
     def get(self, option, *args, **kwargs):
+        """Get the value of ``option``
+
+        Pass ``master`` to get the value from that master's section, if it
+        sets the option.
+        """
+        master = kwargs.pop('master', None)
         option_config = self._get_option_config(option)
         type = option_config.get('type', str)
-        if not self._cfg.has_option(self.section, option):
-            if not option_config.get('required'):
-                return option_config.get('default')
+        section = self.section
+        if master is not None and self._cfg.has_option(
+                FLEET_PREFIX + master, option):
+            section = FLEET_PREFIX + master
+        if not self._cfg.has_option(section, option):
+            # the masters of a fleet may each set the required options
+            if not option_config.get('required') or self.masters():
+                return _coerce(type, option_config.get('default'))
             raise configparser.NoOptionError(option, self.section)
         if type == str:
-            return self._cfg.get(self.section, option, *args, **kwargs)
+            return self._cfg.get(section, option, *args, **kwargs)
         elif type == int:
-            return self._cfg.getint(self.section, option, *args, **kwargs)
+            return self._cfg.getint(section, option, *args, **kwargs)
         elif type == float:
-            return self._cfg.getfloat(self.section, option, *args, **kwargs)
+            return self._cfg.getfloat(section, option, *args, **kwargs)
         elif type == bool:
-            return self._cfg.getboolean(self.section, option, *args, **kwargs)
+            return self._cfg.getboolean(section, option, *args, **kwargs)
 
     def read(self, filenames):
         self._cfg.read(filenames)
-        invalid = [s for s in self._cfg.sections() if s != self.section]
+        invalid = [s for s in self._cfg.sections()
+                   if s != self.section and not s.startswith(FLEET_PREFIX)]
         if invalid:
             raise InvalidSectionError(invalid)
 
-        options = self._cfg.options(self.section)
+        masters = [FLEET_PREFIX + m for m in self.masters()]
+        sections = [self.section] + masters
         for name, config in self.options.items():
-            if config.get('required') and name not in options:
+            found = [s for s in sections if self._cfg.has_option(s, name)]
+            # a required option may be left to the masters, if all set it
+            missing = config.get('required') and self.section not in found
+            if missing and not (masters and set(masters) <= set(found)):
                 raise MissingRequiredOptionError(name)
+            for section in found:
+                self._validate_value(
+                    name, self._cfg.get(section, name, raw=True))
 
-    def set(self, option, value):
+    def set(self, option, value, master=None):
+        """Set ``option``, in the section of ``master`` if it is given"""
         self._validate_value(option, value)
-        self._cfg.set(self.section, option, value)
+        section = self.section
+        if master is not None:
+            section = FLEET_PREFIX + master
+            if not self._cfg.has_section(section):
+                self._cfg.add_section(section)
+        self._cfg.set(section, option, _format(value))
+
+    def snapshot(self, master=None):
+        """Resolve every option into an immutable :class:`JbutlerConfig`
+
+        :param str master: resolve the options of this master of the
+                           fleet, whose section overrides the jbutler one
+        """
+        values = {}
+        for option, option_config in self.options.items():
+            values[option] = _coerce(option_config.get('type', str),
+                                     self.get(option, master=master))
+        return JbutlerConfig(**values)
 
     def write(self, fp):
         """Write an .ini-format representation of the configuration state."""
         fp.write('[{0}]\n'.format(self.section))
         for option in sorted(self.options.keys()):
-            value = str(self.get(option, raw=True)).replace('\n', '\n\t')
+            value = _format(self.get(option, raw=True)).replace('\n', '\n\t')
             fp.write('{0} = {1}\n'.format(option, value))
 
 
+def _coerce(cfg_type, value):
+    """Convert a raw option value, such as a default, to ``cfg_type``"""
+    if value is None or isinstance(value, cfg_type):
+        return value
+    if not isinstance(value, six.string_types):
+        raise TypeError(u"Cannot convert %r to %s" % (value, cfg_type))
+    if cfg_type == bool:
+        try:
+            return configparser.RawConfigParser.BOOLEAN_STATES[value.lower()]
+        except KeyError:
+            raise ValueError(u"Not a boolean: %s" % value)
+    return cfg_type(value)
+
+
+def _format(value):
+    """Format an option value the way it is written in a config file"""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, six.string_types):
+        return value
+    return str(value)
+
+
+class JbutlerConfig(object):
+    """A frozen, fully resolved jbutler configuration
+
+    Options are plain, already typed attributes, so reading them is cheap.
+    Use :meth:`replace` to get a copy with some options changed.
+    """
+    __slots__ = tuple(sorted(JbutlerConfigParser.options))
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            object.__setattr__(self, name, values.get(name))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(u"'%s' object is read-only" %
+                             self.__class__.__name__)
+
+    def __delattr__(self, name):
+        raise AttributeError(u"'%s' object is read-only" %
+                             self.__class__.__name__)
+
+    def __eq__(self, other):
+        if not isinstance(other, self.__class__):
+            return False
+        return self.asdict() == other.asdict()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '%s(%s)' % (self.__class__.__name__, ', '.join(
+            '%s=%r' % (k, getattr(self, k)) for k in self.__slots__))
+
+    def asdict(self):
+        return dict((k, getattr(self, k)) for k in self.__slots__)
+
+    def replace(self, **changes):
+        """Return a new config with the options in ``changes`` replaced"""
+        values = self.asdict()
+        values.update(changes)
+        return self.__class__(**values)
+
+    def write(self, fp):
+        """Write an .ini-format representation of the configuration."""
+        fp.write('[{0}]\n'.format(JbutlerConfigParser.section))
+        for option in self.__slots__:
+            value = _format(getattr(self, option)).replace('\n', '\n\t')
+            fp.write('{0} = {1}\n'.format(option, value))
+
+
+_config_cache = {}
+_config_cache_lock = threading.Lock()
+
+
+def _stat_key(filename):
+    try:
+        st = os.stat(filename)
+    except OSError:
+        return None
+    return (getattr(st, 'st_mtime_ns', st.st_mtime), st.st_size, st.st_ino)
+
+
+def load_config(config_files, **kwargs):
+    """Get a frozen config snapshot
+
+    Takes the same arguments as :func:`get_config`. The merged result is
+    cached and only re-read when one of ``config_files`` is created,
+    removed or modified, so repeated calls are cheap.
+
+    :rtype: :class:`JbutlerConfig`
+    """
+    key = (tuple(config_files), tuple(sorted(kwargs.items())))
+    stats = tuple(_stat_key(f) for f in config_files)
+    with _config_cache_lock:
+        cached = _config_cache.get(key)
+    if cached is not None and cached[0] == stats:
+        return cached[1]
+
+    config = get_config(config_files, **kwargs).snapshot()
+    with _config_cache_lock:
+        _config_cache[key] = (stats, config)
+    return config
+
+
+def load_fleet(config_files, **kwargs):
+    """Get a frozen config snapshot for every master of the fleet
+
+    Takes the same arguments as :func:`get_config`. The ``[server:NAME]``
+    section of each master overrides the ``[jbutler]`` section, and the
+    options passed as keyword arguments override both.
+
+    :returns: list of (name, :class:`JbutlerConfig`) tuples, in the order
+              the masters were read
+    """
+    config = get_config(config_files, **kwargs)
+    fleet = []
+    for master in config.masters():
+        for k, v in kwargs.items():
+            config.set(k, v, master=master)
+        fleet.append((master, config.snapshot(master)))
+    return fleet
+
+
 def get_config(config_files, **kwargs):
     """Get a config object
 
@@ -160,6 +372,43 @@ def get_config(config_files, **kwargs):
     :param str templatedir: name of directory to store template files in,
                             relative to the project directory
                             (default: templates)
+    :param int max_workers: default number of concurrent requests used by
+                            bulk operations (default: 1)
+    :param int max_in_flight: most triggered builds waiting in the queue at
+                              once, 0 for no limit (default: 0)
+    :param float requests_per_second: maximum rate of requests to the
+                                      server, reads and writes together, 0
+                                      for no limit (default: 0)
+    :param float connect_timeout: seconds to wait for a connection
+                                  (default: 10)
+    :param float read_timeout: seconds to wait for a response (default: 120)
+    :param float retry_backoff: backoff factor for retrying failed reads,
+                                0 to disable retries (default: 0)
+    :param int pool_size: number of connections kept open to the server
+                          (default: 10)
+    :param str cassette: file to record http traffic to, or replay it from
+    :param str cassette_mode: ``record`` or ``replay`` (default: replay)
+    :param float cassette_latency: seconds added to every replayed request
+                                   (default: 0)
+    :param bool preserve_formatting: write job configs with the whitespace
+                                     they were read with, instead of
+                                     re-indenting them (default: false)
+    :param bool xml_mmap: memory map job configs when reading them
+                          (default: false)
+    :param int folder_depth: levels of folders listed by each request when
+                             retrieving jobs, deeper folders take further
+                             requests (default: 2)
+    :param int page_size: number of jobs listed by each request, 0 to list
+                          every job at once (default: 0)
+    :param str job_store: ``files`` to keep one file per job in ``jobdir``,
+                          or ``pack`` to keep them in a pack file
+                          (default: files)
+    :param str cache: sqlite file to cache server state in between runs,
+                      empty to disable the cache
+    :param float cache_ttl: seconds a cached entry stays fresh
+                            (default: 300)
+    :param bool cache_refresh: ignore the entries cached by earlier runs
+                               (default: false)
     """
     cfg = JbutlerConfigParser()
     cfg.read(config_files)
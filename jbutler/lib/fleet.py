@@ -0,0 +1,126 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Library for running commands against a fleet of jenkins masters
+
+The masters of a fleet are the ``[server:NAME]`` sections of the config
+files. A command run with ``--fleet`` runs against every master at once,
+each with a config of its own, so each master gets its own connection
+pool, request throttle and cache entries. The output of every run is
+captured and, once all of them are done, printed as one report.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import getpass
+import io
+import logging
+
+import click
+
+from .. import errors
+from ..utils import concurrency
+from ..utils import output
+
+log = logging.getLogger(__name__)
+
+
+class MasterRun(object):
+    """The run of a command against one master
+
+    :ivar error: the exception the run failed with, or None
+    """
+
+    def __init__(self, name, cfg):
+        self.name = name
+        self.cfg = cfg
+        self.out = io.StringIO()
+        self.err = io.StringIO()
+        self.error = None
+
+
+class Fleet(object):
+    """The masters a command runs against
+
+    :param list masters: (name, :class:`jbutler.lib.cfg.JbutlerConfig`)
+                         tuples, as from :func:`jbutler.lib.cfg.load_fleet`
+    :raises errors.CommandError: if there are no masters
+    """
+
+    def __init__(self, masters):
+        self.masters = list(masters)
+        if not self.masters:
+            raise errors.CommandError(
+                u"No masters to run against, add [server:NAME] sections to "
+                u"the config")
+
+    def run(self, func):
+        """Call ``func(cfg)`` with the config of every master at once
+
+        Anything ``func`` prints with :func:`jbutler.utils.output.echo`,
+        from its own thread or from the pool threads of
+        :mod:`jbutler.utils.concurrency`, is kept apart for each master.
+
+        :returns: list of :class:`MasterRun`, in the order of the masters
+        """
+        # ask for passwords now, the runs cannot prompt for them
+        runs = [MasterRun(name, _withPassword(name, cfg))
+                for name, cfg in self.masters]
+
+        def _run(run):
+            with output.capture(run.out, run.err):
+                try:
+                    func(run.cfg)
+                except Exception as e:
+                    log.debug('Run against %s failed', run.name,
+                              exc_info=True)
+                    run.error = e
+            return run
+
+        return list(concurrency.imap(_run, runs, len(runs)))
+
+
+def report(runs):
+    """Print the output of every run under the name of its master
+
+    :param list runs: :class:`MasterRun` objects
+    :raises errors.CommandError: if any run failed
+    """
+    for run in runs:
+        click.echo(u'== %s (%s) ==' % (run.name, run.cfg.server))
+        out = run.out.getvalue()
+        if out:
+            click.echo(out, nl=False)
+        err = run.err.getvalue()
+        if err:
+            click.echo(err, nl=False, err=True)
+        if run.error is not None:
+            click.echo(u'error: %s' % run.error, err=True)
+
+    failed = [run.name for run in runs if run.error is not None]
+    click.echo(u'%d of %d masters succeeded' % (len(runs) - len(failed),
+                                                len(runs)))
+    if failed:
+        raise errors.CommandError(u"Failed on %d masters: %s" % (
+            len(failed), ', '.join(failed)))
+
+
+def _withPassword(name, cfg):
+    if cfg.username and not cfg.password:
+        return cfg.replace(password=getpass.getpass(
+            u'Password for %s: ' % name))
+    return cfg
@@ -20,168 +20,514 @@ Library for working with jenkins jobs
 from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
+import errno
+import hashlib
 import logging
 import os
 import re
 import time
-import threading
 
-from jenkinsapi.custom_exceptions import NotBuiltYet
-from jenkinsapi.queue import QueueItem
-from requests import HTTPError
-import click
+import six
+
+from .. import utils
+from ..constants import FOLDER_SEP
+from ..utils import concurrency
+from ..utils import lxml_utils
+from ..utils.cache import CONFIG
+from ..utils.output import echo
+from . import builds
 
 log = logging.getLogger(__name__)
 
 
-def createJobs(server, jobList):
+# elements naming other jobs, which must exist before the referring job
+DEPENDENCY_XPATHS = (
+    # downstream projects of the build other projects post-build step
+    '//hudson.tasks.BuildTrigger/childProjects',
+    # upstream projects of the build after other projects trigger
+    '//jenkins.triggers.ReverseBuildTrigger/upstreamProjects',
+    # projects triggered by the parameterized trigger plugin
+    '//hudson.plugins.parameterizedtrigger.BuildTriggerConfig/projects',
+    # sources of the copy artifact plugin
+    '//hudson.plugins.copyartifact.CopyArtifact/project',
+    '//hudson.plugins.copyartifact.CopyArtifact/projectName',
+)
+
+
+def createJobs(server, jobList, workers=1, jobDir=None):
     """Create jenkins jobs using the files listed in jobList
 
+    Jobs are created in waves, so that every job referred to by another
+    job in ``jobList`` is created first. The jobs of each wave are created
+    concurrently.
+
     :param server: A jenkins server
     :type server: :class:`jenkinsapi.jenkins.Jenkins`
     :param jobList: list of file-like objects
     :type jobList: list
+    :param int workers: number of jobs to create concurrently
+    :param str jobDir: directory holding the job configs, files in its
+                       sub-directories create jobs in folders
     """
-    created_jobs = []
+    configs = {}
+    dependencies = []
     for jobFile in jobList:
-        jobName, _ = os.path.splitext(os.path.basename(jobFile.name))
+        jobName = jobNameFromPath(jobDir, jobFile.name)
+        configs[jobName] = jobFile.read()
+        dependencies.append((jobName, jobDependencies(configs[jobName])))
 
-        if not server.has_job(jobName):
-            j = server.create_job(jobName, jobFile.read())
-            created_jobs.append(j)
-        else:
-            click.echo(u"warning: job already exists on server: '%s'" %
-                       jobName, err=True)
+    def _create(jobName):
+        if server.has_job(jobName):
+            echo(u"warning: job already exists on server: '%s'" %
+                 jobName, err=True)
+            return None
+        return server.create_job(jobName, configs[jobName])
+
+    created_jobs = []
+    for wave in dependencyWaves(dependencies):
+        created_jobs.extend(job for job in concurrency.imap(
+            _create, wave, workers) if job is not None)
     return created_jobs
 
 
-def retrieveJobs(server, jobList, jobFilter=None):
+def jobDependencies(config):
+    """Names of the jobs referred to by a job config
+
+    :param config: job config xml
+    :returns: set of job names
+    """
+    doc = lxml_utils.fromstring(config)
+    if doc is None:
+        return set()
+    names = set()
+    for xpath in DEPENDENCY_XPATHS:
+        for element in doc.xpath(xpath):
+            names.update(name.strip() for name in (element.text or '')
+                         .split(',') if name.strip())
+    return names
+
+
+def dependencyWaves(dependencies):
+    """Group jobs into waves that only depend on jobs in earlier waves
+
+    Dependencies on jobs that are not in ``dependencies`` are ignored. Jobs
+    in a dependency cycle are put in a last wave together.
+
+    :param list dependencies: (job name, names it depends on) tuples, jobs
+                              keep this order within their wave
+    :returns: list of lists of job names
+    """
+    names = [name for name, _ in dependencies]
+    remaining = dict((name, set(deps) & set(names) - set([name]))
+                     for name, deps in dependencies)
+    waves = []
+    while remaining:
+        wave = [name for name in names
+                if name in remaining and not remaining[name]]
+        if not wave:
+            echo(u"warning: dependency cycle between jobs: %s" %
+                 ', '.join(sorted(remaining)), err=True)
+            waves.append([name for name in names if name in remaining])
+            break
+        waves.append(wave)
+        for name in wave:
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(wave)
+    return waves
+
+
+def retrieveJobs(server, jobList, jobFilter=None, workers=1,
+                 folder_depth=0, page_size=0):
     """Retrieve jenkins config
 
+    Jobs in folders are named by their full path, e.g. ``folder/job``.
+
     :param server: configuration object
     :type cfg: :class:`jenkinsapi.Jenkins`
     :param list jobList: list of job names to retrieve
     :param str jobFilter: regex to filter jobs with or None
+    :param int workers: number of jobs to fetch concurrently
+    :param int folder_depth: folder levels listed by each request
+    :param int page_size: jobs listed by each request, 0 for no limit
     :returns: list of :class:`jenkinsapi.Job`s
     """
     if jobFilter is None:
         jobFilter = '.*'
     jobFilter = re.compile(jobFilter)
 
-    retrieved_jobs = []
-    for jobUrl, jobName in _get_job_generator(server, jobList):
-        if jobFilter.match(jobName):
-            retrieved_jobs.append(server.get_job(jobName))
-    return retrieved_jobs
+    # jobs are fetched while the folders are still being listed
+    jobNames = (jobName for _, jobName in _get_job_generator(
+                server, jobList, folder_depth, workers, page_size)
+                if jobFilter.match(jobName))
+    return list(concurrency.imap(server.get_job, jobNames, workers))
+
+
+def jobStatus(server, jobList=None, jobFilter=None, results=None,
+              folder_depth=0, workers=1, page_size=0):
+    """The last build of every job, from a single listing of the server
+
+    :param server: A jenkins server
+    :type server: :class:`jbutler.jenkinsapi.jenkins.Jenkins`
+    :param list jobList: names of the jobs to report, or all jobs
+    :param str jobFilter: regex to filter jobs with or None
+    :param list results: only report jobs whose last build has one of
+                         these results, ``BUILDING`` for builds that are
+                         still running and ``NOT_BUILT`` for jobs that
+                         never ran
+    :param int folder_depth: folder levels listed by each request
+    :param int workers: number of folders to list concurrently
+    :param int page_size: jobs listed by each request, 0 for no limit
+    :returns: list of dicts of the ``name``, ``color``, ``number``,
+              ``result``, ``duration`` (ms) and ``timestamp`` (ms since
+              the epoch) of each job, sorted by name
+    """
+    jobFilter = re.compile(jobFilter or '.*')
+    wanted = set(jobList or [])
+    if results:
+        results = set(r.upper() for r in results)
+
+    rows = []
+    for jobName, info in server.get_jobs_status(folder_depth, workers,
+                                                page_size):
+        if wanted and jobName not in wanted:
+            continue
+        wanted.discard(jobName)
+        if not jobFilter.match(jobName):
+            continue
+        build = info.get('lastBuild') or {}
+        result = build.get('result')
+        if build.get('building'):
+            result = 'BUILDING'
+        elif not build:
+            result = 'NOT_BUILT'
+        if results and result not in results:
+            continue
+        rows.append(dict(name=jobName, color=info.get('color'),
+                         number=build.get('number'), result=result,
+                         duration=build.get('duration'),
+                         timestamp=build.get('timestamp')))
+
+    for jobName in sorted(wanted):
+        echo(u"warning: no such job: '%s'" % jobName, err=True)
+    return sorted(rows, key=lambda row: row['name'])
+
+
+def formatStatus(rows):
+    """Format job status rows, as from :func:`jobStatus`, as a table"""
+    table = [('NAME', 'BUILD', 'RESULT', 'DURATION', 'STARTED')]
+    for row in rows:
+        started = duration = number = '-'
+        if row['number'] is not None:
+            number = '#%d' % row['number']
+        if row['timestamp']:
+            started = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(
+                row['timestamp'] / 1000))
+        if row['duration'] and row['result'] != 'BUILDING':
+            duration = '%.1fs' % (row['duration'] / 1000)
+        table.append((row['name'], number, row['result'], duration, started))
+
+    widths = [max(len(line[idx]) for line in table)
+              for idx in range(len(table[0]))]
+    return u'\n'.join(
+        u'  '.join(cell.ljust(width) for cell, width in zip(line, widths))
+        .rstrip() for line in table)
+
+
+def retrieveConfigs(server, jobs, workers=1):
+    """Generate the name and config of each job in ``jobs``
+
+    The sha1 of each config is kept in the server's cache, if it has one,
+    so that updating the job to the same config can be skipped.
+
+    :param server: A jenkins server
+    :type server: :class:`jenkinsapi.jenkins.Jenkins`
+    :param jobs: jobs, as from :func:`retrieveJobs`
+    :param int workers: number of configs to retrieve concurrently
+    :returns: generator of (name, config) tuples
+    """
+    cache = getattr(server, 'cache', None)
+
+    def _retrieve(job):
+        config = job.get_config()
+        if cache is not None:
+            cache.set(CONFIG, job.name, configDigest(config))
+        return job.name, config
+
+    return concurrency.imap(_retrieve, jobs, workers)
+
+
+def configDigest(config):
+    """The sha1 of a job config, given as text or bytes"""
+    if isinstance(config, six.text_type):
+        config = config.encode('utf-8')
+    return hashlib.sha1(config).hexdigest()
+
 
+def jobFilePath(jobDir, jobName):
+    """The local config file of a job
 
-def disableJobs(server, jobList):
+    Jobs in folders are stored in matching sub-directories of ``jobDir``.
+    """
+    return os.path.join(jobDir, *jobName.split(FOLDER_SEP)) + '.xml'
+
+
+def jobNameFromPath(jobDir, jobFile):
+    """The name of the job configured by ``jobFile``, the inverse of
+    :func:`jobFilePath`
+
+    Files that are not in ``jobDir``, or any file if ``jobDir`` is None,
+    configure the top-level job named after the file.
+    """
+    name, _ = os.path.splitext(os.path.basename(jobFile))
+    if jobDir is None:
+        return name
+    path, _ = os.path.splitext(os.path.relpath(jobFile, jobDir))
+    parts = path.split(os.sep)
+    if parts[0] == os.pardir:
+        return name
+    return FOLDER_SEP.join(parts)
+
+
+def _readDigest(jobFile):
+    """The contents of ``jobFile`` and their sha1, or None if it is gone"""
+    try:
+        with open(jobFile, 'rb') as fh:
+            data = fh.read()
+    except (IOError, OSError) as e:
+        if e.errno != errno.ENOENT:
+            raise
+        return None, None
+    return data, configDigest(data)
+
+
+def jobDigests(jobList):
+    """Map each job config file to the sha1 of its contents
+
+    :param list jobList: job configuration files
+    """
+    digests = {}
+    for jobFile in jobList:
+        _, digest = _readDigest(jobFile)
+        if digest is not None:
+            digests[jobFile] = digest
+    return digests
+
+
+def pushChangedJobs(server, jobDir, jobList, digests, workers=1):
+    """Update the jobs whose config files differ from ``digests``
+
+    Files whose contents are unchanged, for instance after saving a file
+    without editing it, are skipped. ``digests`` is updated with the
+    files that were pushed, so that the next call only sends new changes.
+
+    :param server: A jenkins server
+    :type server: :class:`jenkinsapi.jenkins.Jenkins`
+    :param str jobDir: directory holding the job configs
+    :param list jobList: job configuration files that may have changed
+    :param dict digests: sha1 of each file, as of its last push
+    :param int workers: number of jobs to update concurrently
+    :returns: list of names of the updated jobs
+    """
+    cache = getattr(server, 'cache', None)
+
+    def _push(jobFile):
+        data, digest = _readDigest(jobFile)
+        if digest is None or digests.get(jobFile) == digest:
+            return None
+        jobName = jobNameFromPath(jobDir, jobFile)
+        if not server.has_job(jobName):
+            echo(u"warning: no such job: '%s'" % jobName, err=True)
+            return None
+        server.get_job(jobName).update_config(data.decode('utf-8'))
+        digests[jobFile] = digest
+        if cache is not None:
+            cache.set(CONFIG, jobName, digest)
+        return jobName
+
+    return [jobName for jobName in
+            concurrency.imap(_push, sorted(jobList), workers)
+            if jobName is not None]
+
+
+def disableJobs(server, jobList, workers=1, jobDir=None):
     """Disable josb in `jobList`
 
     :param server: Jenkins server
     :type server: :class:`jenkinsapi.Jenkins`
     :param list jobList: job configuration files
+    :param int workers: number of jobs to disable concurrently
+    :param str jobDir: directory holding the job configs
     :returns: list of job files that were disabled
     """
-    disabled_jobs = []
-    for jobFile in jobList:
-        jobName, _ = os.path.splitext(os.path.basename(jobFile))
-        if server.has_job(jobName):
-            jobObj = server.get_job(jobName)
-            if jobObj.is_enabled():
-                jobObj.disable()
-                disabled_jobs.append(jobFile)
-        else:
-            click.echo(u"warning: no such job: '%s'" % jobName,
-                       err=True)
-    return disabled_jobs
+    return _toggleJobs(server, jobList, False, workers, jobDir)
 
 
-def enableJobs(server, jobList):
+def enableJobs(server, jobList, workers=1, jobDir=None):
     """Enable josb in `jobList`
 
     :param server: Jenkins server
     :type server: :class:`jenkinsapi.Jenkins`
     :param list jobList: job configuration files
+    :param int workers: number of jobs to enable concurrently
+    :param str jobDir: directory holding the job configs
     :returns: list of job files that were enabled
     """
-    enabled_jobs = []
-    for jobFile in jobList:
-        jobName, _ = os.path.splitext(os.path.basename(jobFile))
-        if server.has_job(jobName):
-            jobObj = server.get_job(jobName)
-            if not jobObj.is_enabled():
-                jobObj.enable()
-                enabled_jobs.append(jobFile)
+    return _toggleJobs(server, jobList, True, workers, jobDir)
+
+
+def _toggleJobs(server, jobList, enabled, workers=1, jobDir=None):
+    def _toggle(jobFile):
+        jobName = jobNameFromPath(jobDir, jobFile)
+        if not server.has_job(jobName):
+            echo(u"warning: no such job: '%s'" % jobName, err=True)
+            return None
+
+        jobObj = server.get_job(jobName)
+        if jobObj.is_enabled() == enabled:
+            return None
+        if enabled:
+            jobObj.enable()
         else:
-            click.echo(u"warning: no such job: '%s'" % jobName,
-                       err=True)
-    return enabled_jobs
+            jobObj.disable()
+        return jobFile
+
+    return [jobFile for jobFile in concurrency.imap(_toggle, jobList, workers)
+            if jobFile is not None]
+
 
+def setLocalDisabled(jobList, disabled, workers=1, preserve_formatting=False,
+                     use_mmap=False):
+    """Set the disabled property of local job configs
 
-def deleteJobs(server, jobList):
+    Any kind of job is supported, whatever its root element. Files that
+    are already in the requested state are not rewritten.
+
+    :param list jobList: job configuration files
+    :param bool disabled: the new value of the property
+    :param int workers: number of files to update concurrently
+    :param bool preserve_formatting: keep the whitespace of the files
+    :param bool use_mmap: memory map the files when reading them
+    :returns: list of job files that were changed
+    """
+    text = 'true' if disabled else 'false'
+
+    def _set(jobFile):
+        doc = utils.readJob(jobFile, use_mmap)
+        elements = doc.xpath('/*/disabled')
+        if not elements:
+            echo(u"Warning: job config does not have a 'disabled' "
+                 u"property: '%s'" % jobFile, err=True)
+            return None
+        if elements[0].text == text:
+            return None
+        elements[0].text = text
+        utils.writeJob(jobFile, doc, preserve_formatting)
+        return jobFile
+
+    return [jobFile for jobFile in concurrency.imap(_set, jobList, workers)
+            if jobFile is not None]
+
+
+def deleteJobs(server, jobList, jobDir=None):
     """Delete the jobs in `jobList`.
 
     :param server: jenkins server
     :type server: :class:`jenkinsapi.jenkins.Jenkins`
     :param list jobList: list of job config file names
+    :param str jobDir: directory holding the job configs
     """
     deleted_jobs = []
     for job_file in jobList:
-        job_name, _ = os.path.splitext(os.path.basename(job_file))
+        job_name = jobNameFromPath(jobDir, job_file)
         if server.has_job(job_name):
             server.delete_job(job_name)
             deleted_jobs.append(job_name)
         else:
-            click.echo(u"warning: no such job: '%s'" % job_name,
-                       err=True)
+            echo(u"warning: no such job: '%s'" % job_name, err=True)
     return deleted_jobs
 
 
-def updateJobs(server, jobList):
+def updateJobs(server, jobList, workers=1, jobDir=None):
     """Update an existing jenkins job to match the local config
 
+    Every config is pushed, even if the cache says the server has it
+    already, since the job may have been changed on the server since.
+
     :param server: A jenkins server
     :type server: :class:`jenkinsapi.jenkins.Jenkins`
     :param list jobList: list of job config files
+    :param int workers: number of jobs to update concurrently
+    :param str jobDir: directory holding the job configs
     """
-    updated_jobs = []
+    cache = getattr(server, 'cache', None)
+    configs = []
     for jobFile in jobList:
-        jobName, _ = os.path.splitext(os.path.basename(jobFile.name))
+        jobName = jobNameFromPath(jobDir, jobFile.name)
 
         if server.has_job(jobName):
-            job = server.get_job(jobName)
-            job.update_config(jobFile.read())
-            updated_jobs.append(job)
+            configs.append((jobName, jobFile.read()))
         else:
-            click.echo(u"warning: no such job: '%s'" % jobName,
-                       err=True)
-    return updated_jobs
+            echo(u"warning: no such job: '%s'" % jobName, err=True)
 
+    def _update(item):
+        jobName, config = item
+        job = server.get_job(jobName)
+        job.update_config(config)
+        if cache is not None:
+            cache.set(CONFIG, jobName, configDigest(config))
+        return job
 
-def buildJobs(server, jobList, watch=True, params=None):
-    """Trigger a job to build
+    return list(concurrency.imap(_update, configs, workers))
 
-    :param jbutler.ButlerConfig cfg: configuration
-    :param list jobList: list of jenkins job names
-    """
-    for jobFile in jobList:
-        jobName, _ = os.path.splitext(os.path.basename(jobFile))
 
-        if server.has_job(jobName):
-            qi = server[jobName].invoke(build_params=params or {})
-            if watch:
-                t = threading.Thread(target=_watch_job, args=(qi,))
-                t.daemon = True
-                t.start()
+def buildJobs(server, jobList, watch=True, params=None, paramSets=None,
+              maxInFlight=0, workers=1, delay=5, jobDir=None):
+    """Trigger builds of jenkins jobs
 
-    while threading.active_count() > 0:
-        time.sleep(0.1)
+    Each job is built once for every parameter set, and all the builds are
+    followed by a single :class:`jbutler.lib.builds.BuildSupervisor`.
 
+    :param server: A jenkins server
+    :type server: :class:`jenkinsapi.jenkins.Jenkins`
+    :param list jobList: list of job config file paths
+    :param bool watch: print the console output of the builds until they
+                       finish
+    :param dict params: parameters to build every job with
+    :param list paramSets: parameter sets to build every job with, one
+                           build each, instead of ``params``
+    :param int maxInFlight: most builds waiting in the queue at once, 0 for
+                            no limit
+    :param int workers: number of concurrent requests
+    :param float delay: seconds between polls of the queue and the builds
+    :param str jobDir: directory holding the job configs
+    :returns: list of :class:`jbutler.lib.builds.BuildRequest`
+    """
+    if paramSets is None:
+        paramSets = [params or {}]
+    requests = []
+    for jobFile in jobList:
+        jobName = jobNameFromPath(jobDir, jobFile)
 
-def _get_job_generator(server, jobList=None):
+        if not server.has_job(jobName):
+            echo(u"warning: no such job: '%s'" % jobName, err=True)
+            continue
+        job = server.get_job(jobName)
+        if any(paramSets) and not job.has_params():
+            echo(u"warning: job '%s' does not take parameters" %
+                 jobName, err=True)
+            continue
+        requests.extend(builds.BuildRequest(job, p) for p in paramSets)
+
+    supervisor = builds.BuildSupervisor(server, maxInFlight, watch, delay,
+                                        workers)
+    return supervisor.run(requests)
+
+
+def _get_job_generator(server, jobList=None, folder_depth=0, workers=1,
+                       page_size=0):
     """Create a generator to fetch jobs from a jenkins server"""
-    jobs = server.get_jobs_info()
+    jobs = server.get_jobs_info(folder_depth, workers, page_size)
     if not jobList:
         return jobs
     jobsDict = dict((name, url) for url, name in jobs)
@@ -189,32 +535,7 @@ def _get_job_generator(server, jobList=None):
     for jobName in jobList:
         jobUrl = jobsDict.get(jobName)
         if jobUrl is None:
-            click.echo(u"warning: no such job: '%s'" % jobName,
-                       err=True)
+            echo(u"warning: no such job: '%s'" % jobName, err=True)
         else:
             ret.append((jobUrl, jobName))
     return ret
-
-
-def _watch_job(job, delay=5):
-    waited = 0
-    idx = 0
-    while True:
-        job.poll()
-        if isinstance(job, QueueItem):
-            try:
-                job = job.get_build()
-            except (NotBuiltYet, HTTPError):
-                click.echo('[%s] Waited %is for start' % (job.name, waited))
-                waited += delay
-                time.sleep(delay)
-        else:
-            console = job.get_console().split('\n')
-            output = console[idx:]
-            if output:
-                for line in output:
-                    if line:
-                        click.echo('[%s] %s\n' % (job.name, line))
-            idx = len(console) - 1
-            if not job.is_running():
-                return
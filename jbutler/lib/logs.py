@@ -0,0 +1,202 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Library for archiving build console logs
+
+Logs are downloaded through the progressiveText api, which takes the byte
+offset to start from. A download that finds the build still running is
+kept as a ``.part`` file next to a ``.offset`` file holding the offset the
+server reported and the number of bytes written locally. They are only
+saved once a response was written completely, so a download interrupted
+part way through a response is truncated back to the last saved size and
+continues from the matching offset. Once the build is complete the
+``.part`` file is renamed into place. Completed logs are never downloaded
+again.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import contextlib
+import errno
+import gzip
+import json
+import logging
+import os
+import re
+
+from .. import errors
+from ..constants import FOLDER_SEP
+from ..utils import concurrency
+
+log = logging.getLogger(__name__)
+
+LOG_EXT = '.log'
+GZIP_EXT = '.gz'
+PART_EXT = '.part'
+OFFSET_EXT = '.offset'
+CHUNK_SIZE = 64 * 1024
+
+PROGRESSIVE_TEXT = 'logText/progressiveText'
+
+# os.replace is atomic on every platform, but is not available on python 2
+_replace = getattr(os, 'replace', os.rename)
+
+_RANGE_RE = re.compile(r'^\s*(\d*)\s*(-?)\s*(\d*)\s*$')
+
+
+def parseBuildRanges(spec):
+    """Parse a comma separated list of build numbers and ranges
+
+    e.g. ``1-5,9,20-`` is builds 1 to 5, build 9 and every build from 20
+
+    :param str spec: build ranges
+    :returns: list of (first, last) tuples, where last may be None
+    :raises errors.CommandError: if ``spec`` is not valid
+    """
+    ranges = []
+    for item in spec.split(','):
+        match = _RANGE_RE.match(item)
+        if match is None or not (match.group(1) or match.group(3)):
+            raise errors.CommandError(u"Invalid build range: '%s'" % item)
+        first, dash, last = match.groups()
+        first = int(first) if first else 1
+        if not dash:
+            last = first
+        ranges.append((first, int(last) if last else None))
+    return ranges
+
+
+def _inRanges(number, ranges):
+    return any(first <= number and (last is None or number <= last)
+               for first, last in ranges)
+
+
+def logFilePath(logDir, jobName, number, compress=False):
+    """The archived log of a build
+
+    Logs of jobs in folders are stored in matching sub-directories.
+    """
+    path = os.path.join(logDir, *jobName.split(FOLDER_SEP))
+    return os.path.join(path, '%d%s' % (number, LOG_EXT + (
+        GZIP_EXT if compress else '')))
+
+
+def archiveLogs(jobs, logDir, ranges=None, compress=False, workers=1):
+    """Download the console logs of the builds of ``jobs`` to ``logDir``
+
+    :param list jobs: :class:`jenkinsapi.job.Job` objects
+    :param str logDir: directory to archive logs in
+    :param list ranges: build ranges, as from :func:`parseBuildRanges`,
+                        or None for every build
+    :param bool compress: gzip the archived logs
+    :param int workers: number of logs to download concurrently
+    :returns: list of (job name, build number, path) of every log that was
+              completed
+    """
+    def _builds(job):
+        numbers = sorted(job.get_build_dict())
+        return [(job, number) for number in numbers
+                if ranges is None or _inRanges(number, ranges)]
+
+    def _pending():
+        for builds in concurrency.imap(_builds, jobs, workers):
+            for job, number in builds:
+                path = logFilePath(logDir, job.name, number, compress)
+                if os.path.exists(path):
+                    continue
+                yield job, number, path
+
+    def _archive(item):
+        job, number, path = item
+        url = '%s/%d/%s' % (job.baseurl.rstrip('/'), number,
+                            PROGRESSIVE_TEXT)
+        if downloadLog(job.jenkins.requester, url, path, compress):
+            return job.name, number, path
+        return None
+
+    return [done for done in concurrency.imap(_archive, _pending(), workers)
+            if done is not None]
+
+
+def downloadLog(requester, url, path, compress=False):
+    """Stream the log at progressiveText ``url`` to ``path``
+
+    Continues an earlier partial download, if there is one.
+
+    :param requester: requester of the jenkins server
+    :param str url: progressiveText url of the build
+    :param str path: file to archive the log in
+    :param bool compress: gzip the file
+    :returns: True if the log is complete, False if the build is still
+              running
+    """
+    part = path + PART_EXT
+    state = path + OFFSET_EXT
+    offset, size = _readState(state)
+    if not os.path.isdir(os.path.dirname(path)):
+        try:
+            os.makedirs(os.path.dirname(path))
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
+
+    response = requester.get_stream(url, params={'start': offset})
+    with contextlib.closing(response):
+        response.raise_for_status()
+        next_offset = int(response.headers.get('X-Text-Size', offset))
+        more = response.headers.get('X-More-Data') == 'true'
+        with open(part, 'ab') as fh:
+            # drop whatever an interrupted download left behind
+            fh.truncate(size)
+            out = fh
+            if compress:
+                # every download appends a gzip member, gzip reads the
+                # members back as one stream
+                out = gzip.GzipFile(fileobj=fh, mode='ab')
+            for chunk in response.iter_content(CHUNK_SIZE):
+                out.write(chunk)
+            if out is not fh:
+                # writes the gzip trailer, leaving fh open
+                out.close()
+            size = fh.tell()
+
+    if more:
+        _writeState(state, next_offset, size)
+        log.info('Build at %s is still running', url)
+        return False
+    _replace(part, path)
+    if os.path.exists(state):
+        os.remove(state)
+    return True
+
+
+def _readState(state):
+    try:
+        with open(state) as fh:
+            data = json.load(fh)
+    except (IOError, OSError) as e:
+        if e.errno != errno.ENOENT:
+            raise
+        return 0, 0
+    return data['offset'], data['size']
+
+
+def _writeState(state, offset, size):
+    tmp = state + '.tmp'
+    with open(tmp, 'w') as fh:
+        json.dump(dict(offset=offset, size=size), fh)
+    _replace(tmp, state)
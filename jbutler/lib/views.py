@@ -0,0 +1,278 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Library for working with jenkins views
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import collections
+import logging
+
+from ..constants import VIEW_SEP
+from ..jenkinsapi.views import LIST_FIELDS, LIST_VIEW, NESTED_VIEW
+from ..utils import concurrency
+from ..utils.output import echo
+
+log = logging.getLogger(__name__)
+
+(CREATE, CONFIGURE, DELETE) = ('create', 'configure', 'delete')
+
+# fields compared when deciding whether a list view needs reconfiguring
+SYNC_FIELDS = LIST_FIELDS + ('includeRegex', 'jobs')
+
+ViewChange = collections.namedtuple('ViewChange',
+                                    'action path view_obj fields current')
+
+
+def _is_nested(view_obj):
+    return 'views' in view_obj
+
+
+def _flatten(view_objs, root_path=''):
+    """Map view paths to view dicts, parents before their children"""
+    flat = collections.OrderedDict()
+    for view_obj in view_objs:
+        path = view_obj.get('path') or VIEW_SEP.join(
+            [root_path, view_obj['name']])
+        flat[path] = view_obj
+        flat.update(_flatten(view_obj.get('views', []), path))
+    return flat
+
+
+def _under(path, roots):
+    """True if ``path`` is a descendant of any path in ``roots``"""
+    return any(path.startswith(r + VIEW_SEP) for r in roots)
+
+
+def _changed_fields(current, desired):
+    """List the fields of ``desired`` that differ from ``current``
+
+    Only list views are configured by jbutler, so nested views never
+    report changed fields. Fields missing from ``desired`` are left alone.
+    """
+    if _is_nested(desired):
+        return []
+
+    changed = []
+    for field in SYNC_FIELDS:
+        if field not in desired:
+            continue
+        old, new = current.get(field), desired[field]
+        if field == 'jobs':
+            old, new = sorted(old or []), sorted(new or [])
+        elif field == 'description':
+            old, new = old or '', new or ''
+        if old != new:
+            changed.append(field)
+    return changed
+
+
+def diff_views(current, desired, prune=False):
+    """Compute the changes needed to turn ``current`` into ``desired``
+
+    :param list current: view dicts as retrieved from the server
+    :param list desired: view dicts as read from the views config
+    :param bool prune: also delete views that are not in ``desired``
+    :returns: list of :class:`ViewChange`, in the order they must be applied
+    """
+    current = _flatten(current)
+    desired = _flatten(desired)
+
+    plan = []
+    replaced = []
+    for path, view_obj in desired.items():
+        old = None if _under(path, replaced) else current.get(path)
+        if old is None:
+            plan.append(ViewChange(CREATE, path, view_obj, (), None))
+        elif _is_nested(old) != _is_nested(view_obj):
+            # the view type can't be changed in place
+            replaced.append(path)
+            plan.append(ViewChange(DELETE, path, old, (), old))
+            plan.append(ViewChange(CREATE, path, view_obj, (), None))
+        else:
+            fields = _changed_fields(old, view_obj)
+            if fields:
+                plan.append(ViewChange(CONFIGURE, path, view_obj,
+                                       tuple(fields), old))
+
+    if prune:
+        deleted = list(replaced)
+        for path, view_obj in current.items():
+            if path in desired or _under(path, deleted):
+                continue
+            deleted.append(path)
+            plan.append(ViewChange(DELETE, path, view_obj, (), view_obj))
+    return plan
+
+
+def format_change(change):
+    """Describe a :class:`ViewChange` for display"""
+    if change.fields:
+        return u'%s %s (%s)' % (change.action, change.path,
+                                ', '.join(change.fields))
+    return u'%s %s' % (change.action, change.path)
+
+
+def _apply_change(server, change, verify=False):
+    views = server.views
+    log.info(format_change(change))
+    if change.action == DELETE:
+        views.delete(change.path, verify)
+        return
+
+    parent_path, _, name = change.path.rpartition(VIEW_SEP)
+    if parent_path:
+        parent = views.get_view_by_path(parent_path).views
+    else:
+        parent = views
+
+    if change.action == CREATE:
+        view_type = NESTED_VIEW if _is_nested(change.view_obj) else LIST_VIEW
+        view = parent.create(name, view_type, verify)
+        if view_type == LIST_VIEW:
+            parent._configureListView(view, change.view_obj, verify)
+    elif change.fields == ('jobs',):
+        # only membership changed, avoid rewriting the whole config
+        parent.update_job_membership(parent[name], change.view_obj,
+                                     change.current.get('jobs') or [],
+                                     verify)
+    else:
+        parent._configureListView(parent[name], change.view_obj, verify)
+
+
+def _top_level(path):
+    return path.lstrip(VIEW_SEP).split(VIEW_SEP, 1)[0]
+
+
+def apply_changes(server, plan, verify=False, workers=1):
+    """Send the create/configure/delete calls in ``plan`` to ``server``
+
+    Changes to different top-level views are independent of each other
+    and are applied by up to ``workers`` threads. Changes within one
+    top-level view are applied in plan order.
+
+    :param server: jenkins server
+    :type server: :class:`jbutler.jenkinsapi.jenkins.Jenkins`
+    :param list plan: list of :class:`ViewChange`
+    :param bool verify: re-poll the server after every change
+    :param int workers: number of top-level views to change concurrently
+    """
+    groups = collections.OrderedDict()
+    for change in plan:
+        groups.setdefault(_top_level(change.path), []).append(change)
+
+    def apply_group(changes):
+        for change in changes:
+            _apply_change(server, change, verify)
+
+    for _ in concurrency.imap(apply_group, groups.values(), workers):
+        pass
+
+    if plan and not verify:
+        server.poll()
+
+
+def syncViews(server, data, viewList=None, prune=False, dry_run=False,
+              verify=False, create_only=False, workers=1):
+    """Bring the views on ``server`` in line with the serialized ``data``
+
+    Only views that were added, removed, or changed are touched.
+
+    :param server: jenkins server
+    :type server: :class:`jbutler.jenkinsapi.jenkins.Jenkins`
+    :param data: serialized views, a string or file-like object
+    :param list viewList: top-level view names to sync, or None for all
+    :param bool prune: delete views on the server that are not in ``data``
+    :param bool dry_run: compute the changes without applying them
+    :param bool verify: re-poll the server after every change
+    :param bool create_only: only create views that do not exist yet
+    :param int workers: number of views to retrieve and change concurrently
+    :returns: list of :class:`ViewChange`
+    """
+    desired = [v for v in server.views._from_yaml(data)
+               if not viewList or v['name'] in viewList]
+    if viewList:
+        names = viewList
+    elif prune:
+        names = None
+    else:
+        names = [v['name'] for v in desired]
+
+    if names is None or names:
+        current = list(server.views.iter_view_dicts(names, workers=workers))
+    else:
+        current = []
+
+    plan = diff_views(current, desired, prune)
+    if create_only:
+        existing = set(c.path for c in plan if c.action == DELETE)
+        plan = [c for c in plan if c.action == CREATE]
+        plan = [c for c in plan
+                if c.path not in existing and not _under(c.path, existing)]
+    if not dry_run:
+        apply_changes(server, plan, verify, workers)
+    return plan
+
+
+def deleteViews(server, viewList, dry_run=False, verify=False, workers=1):
+    """Delete the views in ``viewList`` and all of their sub-views
+
+    :param server: jenkins server
+    :type server: :class:`jbutler.jenkinsapi.jenkins.Jenkins`
+    :param list viewList: paths of the views to delete
+    :param bool dry_run: only report which views would be deleted
+    :param bool verify: re-poll the server after every change
+    :param int workers: number of views to delete concurrently
+    :returns: list of :class:`ViewChange` for the deleted views
+    """
+    plan = []
+    for view_path in viewList:
+        if server.views.get_view_by_path(view_path) is None:
+            echo(u"warning: no such view found on server: '%s'" %
+                 view_path, err=True)
+            continue
+        if not view_path.startswith(VIEW_SEP):
+            view_path = VIEW_SEP + view_path
+        plan.append(ViewChange(DELETE, view_path, None, (), None))
+
+    if not dry_run:
+        apply_changes(server, plan, verify, workers)
+    return plan
+
+
+def removeViews(view_objs, paths):
+    """Drop the views at ``paths``, and their sub-views, from ``view_objs``
+
+    :param list view_objs: serialized view dicts
+    :param paths: view paths to remove
+    :returns: a new list of view dicts
+    """
+    paths = set(p if p.startswith(VIEW_SEP) else VIEW_SEP + p for p in paths)
+
+    def prune(objs, root_path):
+        kept = []
+        for view_obj in objs:
+            path = view_obj.get('path') or VIEW_SEP.join(
+                [root_path, view_obj['name']])
+            if path in paths:
+                continue
+            if 'views' in view_obj:
+                view_obj = dict(view_obj, views=prune(view_obj['views'], path))
+            kept.append(view_obj)
+        return kept
+    return prune(view_objs, '')
@@ -17,13 +17,17 @@
 from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
-import collections
 import re
 
+try:
+    from collections.abc import MutableMapping
+except ImportError:
+    from collections import MutableMapping
+
 MACRO_RE = re.compile(r'%\((\w+)\)s')  # regular expression to mactch macros
 
 
-class Macros(collections.MutableMapping):
+class Macros(MutableMapping):
     """Recursively map macros to values"""
     def __init__(self, *args, **kwargs):
         self._store = dict(*args, **kwargs)
@@ -18,27 +18,55 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
-import yaml
-
 from . import lxml_utils
-from ..constants import YAML_KWARGS
+from . import yaml_utils
 
 
-def readJob(filename):
-    with open(filename) as fh:
-        return lxml_utils.parse(fh)
+def readJob(filename, use_mmap=False, store=None):
+    """Read a job config
+
+    :param str filename: job file
+    :param bool use_mmap: memory map the file instead of reading it
+    :param store: pack to read the job from instead of the file
+    :type store: :class:`jbutler.utils.pack.PackStore`
+    """
+    if store is not None:
+        return lxml_utils.fromstring(
+            store.get(store.name(filename))).getroottree()
+    return lxml_utils.parse_file(filename, use_mmap)
 
 
 def readTemplate(filename):
     with open(filename) as fh:
-        return yaml.safe_load(fh)
+        return yaml_utils.load(fh)
+
+
+def writeJob(filename, data, preserve_formatting=False, store=None):
+    """Write a job config, skipping files that would not change
+
+    :param store: pack to write the job to instead of the file
+    :type store: :class:`jbutler.utils.pack.PackStore`
+    :returns: True if the file was written
+    """
+    if store is not None:
+        return store.put(store.name(filename), lxml_utils.tostring(
+            data, pretty_print=not preserve_formatting))
+    return lxml_utils.write_file(filename, data,
+                                 pretty_print=not preserve_formatting)
+
 
+def openJobStore(jobDir, kind):
+    """Open the store of ``jobDir`` for the ``job_store`` config option
 
-def writeJob(filename, data):
-    with open(filename, 'wb') as fh:
-        fh.write(lxml_utils.tostring(data))
+    :returns: a :class:`jbutler.utils.pack.PackStore` for ``pack``, or None
+              to use plain files
+    """
+    if kind != 'pack':
+        return None
+    from . import pack
+    return pack.PackStore(jobDir)
 
 
 def writeTemplate(filename, data):
     with open(filename, 'w') as fh:
-        yaml.safe_dump(data, fh, **YAML_KWARGS)
+        yaml_utils.dump(data, fh)
@@ -0,0 +1,150 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+A persistent cache of server state
+
+Entries are json values stored in a sqlite database, keyed by the server
+url, a kind and a key, and each one expires on its own. The kinds are:
+
+``poll``
+    the data of a full poll of the server, including the job and view
+    lists
+``jobs``
+    the full names and urls of every job, including jobs in folders
+``view``
+    the serialized form of a top-level view, by view name
+``config``
+    the sha1 of a job's config, by job name
+
+Any request that changes the server, such as a POST, drops the ``poll``,
+``jobs`` and ``view`` entries, and the ``config`` entry of the job it was
+sent to, so the next read fetches them again.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import json
+import sqlite3
+import threading
+import time
+
+from six.moves.urllib.parse import unquote, urlparse
+
+from ..constants import FOLDER_SEP
+
+POLL = 'poll'
+JOBS = 'jobs'
+VIEW = 'view'
+CONFIG = 'config'
+
+# kinds that describe the layout of the server, which any write may change
+LAYOUT_KINDS = (POLL, JOBS, VIEW)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    scope TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    updated REAL NOT NULL,
+    expires REAL NOT NULL,
+    PRIMARY KEY (scope, kind, key)
+)
+"""
+
+
+def job_name_from_url(url):
+    """The full name of the job a url belongs to, or None
+
+    e.g. ``http://jenkins/job/apps/job/web/config.xml`` is ``apps/web``
+    """
+    parts = urlparse(url).path.split('/')
+    names = [unquote(parts[i + 1]) for i, part in enumerate(parts[:-1])
+             if part == 'job' and parts[i + 1]]
+    return FOLDER_SEP.join(names) or None
+
+
+class Cache(object):
+    """Read and write cached server state
+
+    The connection may be shared by several threads.
+
+    :param str path: sqlite database file
+    :param str scope: url of the server the entries belong to
+    :param float ttl: default lifetime of an entry, in seconds
+    :param bool refresh: ignore entries written before the cache was
+                         opened, so everything is fetched again once
+    """
+
+    def __init__(self, path, scope, ttl=300, refresh=False):
+        self.path = path
+        self.scope = scope.rstrip('/')
+        self.ttl = ttl
+        self._since = time.time() if refresh else 0
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, timeout=30,
+                                   check_same_thread=False,
+                                   isolation_level=None)
+        with self._lock:
+            self._db.execute(SCHEMA)
+            self._db.execute('DELETE FROM entries WHERE expires <= ?',
+                             (time.time(), ))
+
+    def get(self, kind, key='', default=None):
+        """The value of a fresh entry, or ``default``"""
+        with self._lock:
+            row = self._db.execute(
+                'SELECT value FROM entries WHERE scope = ? AND kind = ? AND '
+                'key = ? AND expires > ? AND updated >= ?',
+                (self.scope, kind, key, time.time(), self._since)).fetchone()
+        if row is None:
+            return default
+        return json.loads(row[0])
+
+    def set(self, kind, key, value, ttl=None):
+        """Store ``value``, which must be json serializable, for ``ttl``
+        seconds, by default the cache's ttl"""
+        data = json.dumps(value, separators=(',', ':'))
+        now = time.time()
+        if ttl is None:
+            ttl = self.ttl
+        with self._lock:
+            self._db.execute(
+                'INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)',
+                (self.scope, kind, key, data, now, now + ttl))
+
+    def delete(self, kind, key=None):
+        """Drop the entry ``key`` of ``kind``, or every entry of ``kind``"""
+        query = 'DELETE FROM entries WHERE scope = ? AND kind = ?'
+        args = (self.scope, kind)
+        if key is not None:
+            query += ' AND key = ?'
+            args += (key, )
+        with self._lock:
+            self._db.execute(query, args)
+
+    def written(self, url):
+        """Drop the entries a change sent to ``url`` may have invalidated"""
+        for kind in LAYOUT_KINDS:
+            self.delete(kind)
+        job_name = job_name_from_url(url)
+        if job_name is not None:
+            self.delete(CONFIG, job_name)
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,87 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Helpers for running work on a pool of threads
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from multiprocessing.pool import ThreadPool
+import threading
+
+# per thread state, such as where a fleet run sends its output, which the
+# pool threads take on from the thread that hands them work
+context = threading.local()
+
+
+def imap(func, iterable, workers=1):
+    """Apply ``func`` to every item of ``iterable`` using ``workers`` threads
+
+    Results are yielded in the order of ``iterable`` as soon as they are
+    available. With a single worker everything runs in the calling thread.
+
+    :param func: callable taking one argument
+    :param iterable: items to process
+    :param int workers: maximum number of concurrent calls
+    """
+    if workers is None or workers <= 1:
+        for item in iterable:
+            yield func(item)
+        return
+
+    pool = ThreadPool(workers)
+    try:
+        for result in pool.imap(_inherit(func), iterable):
+            yield result
+    except BaseException:
+        pool.terminate()
+        raise
+    else:
+        pool.close()
+    finally:
+        pool.join()
+
+
+def spawn(func, *args, **kwargs):
+    """Start ``func(*args, **kwargs)`` on a background thread
+
+    :returns: a :class:`multiprocessing.pool.AsyncResult`, whose ``get``
+              method waits for the call and returns its result, or raises
+              its exception
+    """
+    pool = ThreadPool(1)
+    try:
+        return pool.apply_async(_inherit(func), args, kwargs)
+    finally:
+        pool.close()
+
+
+def _inherit(func):
+    """Wrap ``func`` to run with the :data:`context` of the calling thread"""
+    state = dict(vars(context))
+    if not state:
+        return func
+
+    def call(*args, **kwargs):
+        saved = dict(vars(context))
+        vars(context).update(state)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            vars(context).clear()
+            vars(context).update(saved)
+    return call
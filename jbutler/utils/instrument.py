@@ -0,0 +1,207 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Timing of http requests and local work, for the --profile option
+
+Nothing is recorded until :func:`enable` is called, so the hooks in the
+requester and the parsing helpers cost a single flag check by default.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from collections import namedtuple
+from contextlib import contextmanager
+import json
+import os
+import threading
+import time
+
+from six.moves.urllib.parse import urlparse
+
+_clock = getattr(time, 'perf_counter', time.time)
+
+# path segments whose successor is a user chosen name
+NAMED_SEGMENTS = ('job', 'view', 'computer', 'user')
+
+Event = namedtuple('Event', 'kind name start duration tid status bytes')
+SummaryRow = namedtuple('SummaryRow', 'name count p50 p95 p99 total bytes')
+
+_enabled = False
+_events = []
+_events_lock = threading.Lock()
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def enabled():
+    return _enabled
+
+
+def reset():
+    """Forget every recorded event"""
+    with _events_lock:
+        del _events[:]
+
+
+def events():
+    with _events_lock:
+        return list(_events)
+
+
+def _record(event):
+    with _events_lock:
+        _events.append(event)
+
+
+def url_template(url):
+    """Reduce a url to the endpoint it calls
+
+    Job, view and other names become ``{name}`` and numbers, such as build
+    numbers and queue ids, become ``{number}``. The host and query string
+    are dropped. For example ``http://host/job/foo/12/api/python?depth=1``
+    becomes ``/job/{name}/{number}/api/python``.
+    """
+    segments = []
+    previous = None
+    for segment in urlparse(url).path.split('/'):
+        if not segment:
+            continue
+        if previous in NAMED_SEGMENTS:
+            segments.append('{name}')
+        elif segment.isdigit():
+            segments.append('{number}')
+        else:
+            segments.append(segment)
+        previous = segment
+    return '/' + '/'.join(segments)
+
+
+def record_request(method, url, status, nbytes, start, duration):
+    """Record one http request
+
+    :param str method: http method
+    :param str url: requested url, it is stored as :func:`url_template`
+    :param int status: response status code, None if no response arrived
+    :param int nbytes: size of the response body
+    :param float start: clock time the request was sent
+    :param float duration: seconds until the response arrived
+    """
+    if _enabled:
+        _record(Event('http', '%s %s' % (method, url_template(url)), start,
+                      duration, threading.current_thread().ident, status,
+                      nbytes))
+
+
+def record_span(name, start, duration):
+    """Record local work named ``name`` that started at clock time ``start``
+    """
+    if _enabled:
+        _record(Event('span', name, start, duration,
+                      threading.current_thread().ident, None, None))
+
+
+@contextmanager
+def span(name):
+    """Time the body of a with statement as ``name``"""
+    if not _enabled:
+        yield
+        return
+    start = _clock()
+    try:
+        yield
+    finally:
+        record_span(name, start, _clock() - start)
+
+
+def timer():
+    """Current time on the clock used for events"""
+    return _clock()
+
+
+def _percentile(durations, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    idx = max(0, int(-(-len(durations) * pct // 100)) - 1)
+    return durations[idx]
+
+
+def summary(event_list=None):
+    """Aggregate events by name
+
+    :returns: list of :class:`SummaryRow`, requests first, each group
+              ordered by total time spent, with latencies in seconds
+    """
+    if event_list is None:
+        event_list = events()
+    groups = {}
+    for event in event_list:
+        groups.setdefault((event.kind, event.name), []).append(event)
+
+    rows = []
+    for (kind, name), group in groups.items():
+        durations = sorted(e.duration for e in group)
+        nbytes = None
+        if kind == 'http':
+            nbytes = sum(e.bytes or 0 for e in group)
+        rows.append((kind != 'http', -sum(durations), SummaryRow(
+            name, len(group), _percentile(durations, 50),
+            _percentile(durations, 95), _percentile(durations, 99),
+            sum(durations), nbytes)))
+    return [row for _, _, row in sorted(rows)]
+
+
+def format_summary(rows):
+    """Format summary rows as a plain text table"""
+    width = max([len('ENDPOINT')] + [len(r.name) for r in rows])
+    fmt = u'{0:<%d}  {1:>6}  {2:>9}  {3:>9}  {4:>9}  {5:>10}  {6:>10}' % width
+    lines = [fmt.format('ENDPOINT', 'COUNT', 'P50 MS', 'P95 MS', 'P99 MS',
+                        'TOTAL MS', 'BYTES')]
+    for row in rows:
+        lines.append(fmt.format(
+            row.name, row.count, '%.1f' % (row.p50 * 1000),
+            '%.1f' % (row.p95 * 1000), '%.1f' % (row.p99 * 1000),
+            '%.1f' % (row.total * 1000),
+            '-' if row.bytes is None else row.bytes))
+    return u'\n'.join(lines)
+
+
+def write_trace(fp, event_list=None):
+    """Write events in the chrome trace event format
+
+    The file can be loaded in chrome://tracing, perfetto or speedscope.
+    """
+    if event_list is None:
+        event_list = events()
+    origin = min([e.start for e in event_list] or [0])
+    pid = os.getpid()
+    trace = []
+    for event in event_list:
+        args = {}
+        if event.kind == 'http':
+            args = dict(status=event.status, bytes=event.bytes)
+        trace.append(dict(name=event.name, cat=event.kind, ph='X', pid=pid,
+                          tid=event.tid, args=args,
+                          ts=int((event.start - origin) * 1e6),
+                          dur=int(event.duration * 1e6)))
+    json.dump(dict(traceEvents=trace, displayTimeUnit='ms'), fp)
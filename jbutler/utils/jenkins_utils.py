@@ -20,19 +20,39 @@ from __future__ import division
 from __future__ import print_function
 import getpass
 
+import requests
+
 from ..jenkinsapi.jenkins import Jenkins
 from ..jenkinsapi.requester import Requester
 
+requests.packages.urllib3.disable_warnings()
+
 
-def server_factory(cfg):
+def server_factory(cfg, lazy=False):
     """Generate a jenkins server object
 
     :param cfg: a config object
-    :type cfg: ButlerConfig
+    :type cfg: :class:`jbutler.lib.cfg.JbutlerConfig`
+    :param bool lazy: do not poll the server until its data is needed
     """
-    if cfg.username and not cfg.password:
-        cfg.password = getpass.getpass()
-    requester = Requester(cfg.username, cfg.password, cfg.ssl_verify)
-    server = Jenkins(cfg.server, cfg.username, cfg.password,
-                     requester=requester)
+    password = cfg.password
+    if cfg.username and not password:
+        password = getpass.getpass()
+    cache = None
+    if cfg.cache:
+        from .cache import Cache
+        cache = Cache(cfg.cache, cfg.server, cfg.cache_ttl, cfg.cache_refresh)
+    requester = Requester(
+        cfg.username, password, cfg.ssl_verify,
+        timeout=(cfg.connect_timeout, cfg.read_timeout),
+        retry_backoff=cfg.retry_backoff,
+        pool_size=max(cfg.pool_size, cfg.max_workers),
+        requests_per_second=cfg.requests_per_second,
+        cassette=cfg.cassette or None,
+        cassette_mode=cfg.cassette_mode,
+        cassette_latency=cfg.cassette_latency,
+        cache=cache,
+    )
+    server = Jenkins(cfg.server, cfg.username, password,
+                     requester=requester, lazy=lazy, cache=cache)
     return server
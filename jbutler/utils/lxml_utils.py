@@ -18,22 +18,140 @@ from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
 
+import binascii
+import errno
+import mmap
+import os
+import shutil
+import threading
+
 from lxml import etree
 
-parser = etree.XMLParser(encoding='utf-8', recover=True)
+from . import instrument
+
+# os.replace is atomic on every platform, but is not available on python 2
+_replace = getattr(os, 'replace', os.rename)
+
+# flags of new temporary files, binary matters on windows only
+_TEMP_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_EXCL
+_TEMP_FLAGS |= getattr(os, 'O_BINARY', 0)
+
+# lxml parsers must not be shared between threads, so each thread gets its
+# own
+_local = threading.local()
+
+
+def get_parser():
+    """The xml parser for the current thread"""
+    parser = getattr(_local, 'parser', None)
+    if parser is None:
+        parser = _local.parser = etree.XMLParser(encoding='utf-8',
+                                                 recover=True)
+    return parser
 
 
 def fromstring(s):
     """Ensure we properly encode strings before handing them to lxml"""
     if isinstance(s, str):
         s = s.encode('utf-8')
-    return etree.fromstring(s, parser)
+    with instrument.span('xml.parse'):
+        return etree.fromstring(s, get_parser())
 
 
 def parse(fh):
-    return etree.parse(fh, parser)
+    with instrument.span('xml.parse'):
+        return etree.parse(fh, get_parser())
+
+
+def parse_file(filename, use_mmap=False):
+    """Parse an xml file without decoding it in python first
+
+    :param str filename: file to parse
+    :param bool use_mmap: map the file into memory instead of reading it
+    :returns: the parsed :class:`lxml.etree._ElementTree`
+    """
+    if not use_mmap:
+        return parse(filename)
+
+    with open(filename, 'rb') as fh:
+        if not os.fstat(fh.fileno()).st_size:
+            # empty files cannot be mapped
+            return parse(fh)
+        data = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            with instrument.span('xml.parse'):
+                try:
+                    root = etree.fromstring(data, get_parser())
+                except (TypeError, ValueError):
+                    # older lxml only parses bytes, and rejects other
+                    # buffers with either error depending on its version
+                    root = etree.fromstring(data[:], get_parser())
+        finally:
+            data.close()
+    return root.getroottree()
+
+
+def tostring(obj, pretty_print=True):
+    """Serialize an xml document
+
+    :param bool pretty_print: re-indent the document, otherwise its
+        whitespace is written exactly as it was parsed
+    """
+    with instrument.span('xml.serialize'):
+        data = etree.tostring(obj, xml_declaration=True, encoding='UTF-8',
+                              pretty_print=pretty_print)
+    if not pretty_print and not data.endswith(b'\n'):
+        data += b'\n'
+    return data
+
+
+def write_file(filename, obj, pretty_print=True):
+    """Write an xml document, unless the file already holds the same bytes
+
+    :returns: True if the file was written
+    """
+    data = tostring(obj, pretty_print)
+    try:
+        if os.path.getsize(filename) == len(data):
+            with open(filename, 'rb') as fh:
+                if fh.read() == data:
+                    return False
+    except OSError:
+        pass
+
+    _atomic_write(filename, data)
+    return True
+
+
+def _atomic_write(filename, data):
+    """Write ``data`` to a temporary file and rename it over ``filename``,
+    so readers never see a partly written file"""
+    dirname, basename = os.path.split(os.path.abspath(filename))
+    fd, tmp_name = _create_temp(dirname, basename)
+    try:
+        with os.fdopen(fd, 'wb') as fh:
+            fh.write(data)
+        if os.path.exists(filename):
+            shutil.copymode(filename, tmp_name)
+        _replace(tmp_name, filename)
+    except BaseException:
+        os.unlink(tmp_name)
+        raise
+
+
+def _create_temp(dirname, basename):
+    """Create a new temporary file next to ``basename``
 
+    Unlike :func:`tempfile.mkstemp`, the file is created with the mode
+    open() would give it, as the kernel applies the umask.
 
-def tostring(obj):
-    return etree.tostring(obj, xml_declaration=True, encoding='UTF-8',
-                          pretty_print=True)
+    :returns: (fd, path) of the new file
+    """
+    while True:
+        tmp_name = os.path.join(dirname, '.%s.%s' % (
+            basename, binascii.hexlify(os.urandom(4)).decode('ascii')))
+        try:
+            return os.open(tmp_name, _TEMP_FLAGS, 0o666), tmp_name
+        except OSError as e:
+            if e.errno != errno.EEXIST:
+                raise
@@ -0,0 +1,52 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Command output that can be captured per thread
+
+The commands ``--fleet`` runs print with :func:`echo` instead of
+:func:`click.echo`. Inside :func:`capture`, whatever :func:`echo` prints
+from the calling thread, or from the pool threads it hands work to, goes to
+the given streams; everywhere else it goes to the terminal.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import contextlib
+
+import click
+
+from . import concurrency
+
+
+def echo(message=None, nl=True, err=False):
+    """Print ``message`` like :func:`click.echo`, to the streams of the
+    :func:`capture` the thread runs in, if any"""
+    streams = getattr(concurrency.context, 'output', None)
+    if streams is None:
+        click.echo(message, nl=nl, err=err)
+    else:
+        click.echo(message, file=streams[1 if err else 0], nl=nl)
+
+
+@contextlib.contextmanager
+def capture(out, err):
+    """Send what :func:`echo` prints in this thread to ``out`` and ``err``"""
+    concurrency.context.output = (out, err)
+    try:
+        yield
+    finally:
+        del concurrency.context.output
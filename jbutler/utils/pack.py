@@ -0,0 +1,220 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+A content-addressed pack of job configs
+
+A pack is two files in the job directory. ``jobs.pack`` holds every
+distinct config once, zlib compressed, one after another. ``jobs.idx`` is
+a json index mapping each job name to the sha1 of its config, and each
+sha1 to the config's offset and length in the pack. The index is loaded
+once and the pack is memory mapped, so reading a job by name is a dict
+lookup and a slice.
+
+Job names are paths relative to the job directory without the ``.xml``
+extension, using ``/`` between folders, e.g. ``apps/web``.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import hashlib
+import json
+import mmap
+import os
+import shutil
+import tempfile
+import threading
+import zlib
+
+from ..constants import FOLDER_SEP
+
+PACK_FILE = 'jobs.pack'
+INDEX_FILE = 'jobs.idx'
+INDEX_VERSION = 1
+JOB_EXT = '.xml'
+
+# os.replace is atomic on every platform, but is not available on python 2
+_replace = getattr(os, 'replace', os.rename)
+
+
+def exists(directory):
+    """Whether ``directory`` holds a pack"""
+    return os.path.exists(os.path.join(directory, INDEX_FILE))
+
+
+class PackStore(object):
+    """Read and write job configs in a pack
+
+    Changes to the index are kept in memory until :meth:`save` or
+    :meth:`close` is called. Use the store as a context manager to save it
+    on exit.
+
+    :param str directory: job directory holding the pack
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.pack_path = os.path.join(directory, PACK_FILE)
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self._lock = threading.Lock()
+        self._map = None
+        self._dirty = False
+        self._names = {}
+        self._blobs = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as fh:
+                index = json.load(fh)
+            if index.get('version') != INDEX_VERSION:
+                raise ValueError(u"Unsupported pack index version in '%s'" %
+                                 self.index_path)
+            self._names = index['names']
+            self._blobs = dict((k, tuple(v))
+                               for k, v in index['blobs'].items())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __contains__(self, name):
+        return name in self._names
+
+    def __len__(self):
+        return len(self._names)
+
+    def names(self):
+        """Sorted names of the jobs in the pack"""
+        return sorted(self._names)
+
+    def name(self, filename):
+        """The job name of a file in the job directory"""
+        path = os.path.relpath(filename, self.directory)
+        if path.endswith(JOB_EXT):
+            path = path[:-len(JOB_EXT)]
+        return path.replace(os.sep, FOLDER_SEP)
+
+    def get(self, name):
+        """The config of job ``name``, as bytes
+
+        :raises KeyError: if the job is not in the pack
+        """
+        with self._lock:
+            offset, length = self._blobs[self._names[name]]
+            if self._map is None:
+                with open(self.pack_path, 'rb') as fh:
+                    self._map = mmap.mmap(fh.fileno(), 0,
+                                          access=mmap.ACCESS_READ)
+            data = self._map[offset:offset + length]
+        return zlib.decompress(data)
+
+    def put(self, name, data):
+        """Store ``data`` as the config of job ``name``
+
+        Configs already in the pack are not stored again.
+
+        :returns: True if the job's config changed
+        """
+        digest = hashlib.sha1(data).hexdigest()
+        with self._lock:
+            if self._names.get(name) == digest:
+                return False
+            if digest not in self._blobs:
+                compressed = zlib.compress(data)
+                with open(self.pack_path, 'ab') as fh:
+                    fh.seek(0, os.SEEK_END)
+                    offset = fh.tell()
+                    fh.write(compressed)
+                self._blobs[digest] = (offset, len(compressed))
+                self._close_map()
+            self._names[name] = digest
+            self._dirty = True
+        return True
+
+    def delete(self, name):
+        """Remove job ``name`` from the index
+
+        Its config stays in the pack until the pack is rebuilt.
+        """
+        with self._lock:
+            del self._names[name]
+            self._dirty = True
+
+    def save(self):
+        """Write the index, if it changed"""
+        with self._lock:
+            if not self._dirty:
+                return
+            index = dict(version=INDEX_VERSION, names=self._names,
+                         blobs=self._blobs)
+            fd, tmp_name = tempfile.mkstemp(prefix='.' + INDEX_FILE + '.',
+                                            dir=self.directory)
+            try:
+                with os.fdopen(fd, 'w') as fh:
+                    json.dump(index, fh, sort_keys=True)
+                if os.path.exists(self.index_path):
+                    shutil.copymode(self.index_path, tmp_name)
+                _replace(tmp_name, self.index_path)
+            except BaseException:
+                os.unlink(tmp_name)
+                raise
+            self._dirty = False
+
+    def close(self):
+        self.save()
+        with self._lock:
+            self._close_map()
+
+    def _close_map(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def import_files(self, directory=None):
+        """Add every ``*.xml`` file under ``directory`` to the pack
+
+        :param str directory: plain job directory, defaults to the pack's
+        :returns: number of jobs added or changed
+        """
+        directory = directory or self.directory
+        changed = 0
+        for root, dirs, files in os.walk(directory):
+            dirs.sort()
+            for filename in sorted(files):
+                if not filename.endswith(JOB_EXT):
+                    continue
+                path = os.path.join(root, filename)
+                name = os.path.relpath(path, directory)[:-len(JOB_EXT)]
+                with open(path, 'rb') as fh:
+                    changed += self.put(name.replace(os.sep, FOLDER_SEP),
+                                        fh.read())
+        return changed
+
+    def export_files(self, directory=None):
+        """Write every job in the pack to a plain ``*.xml`` file
+
+        :param str directory: destination, defaults to the pack's directory
+        :returns: number of files written
+        """
+        directory = directory or self.directory
+        for name in self.names():
+            path = os.path.join(directory, *name.split(FOLDER_SEP)) + JOB_EXT
+            parent = os.path.dirname(path)
+            if not os.path.isdir(parent):
+                os.makedirs(parent)
+            with open(path, 'wb') as fh:
+                fh.write(self.get(name))
+        return len(self._names)
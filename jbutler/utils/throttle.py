@@ -0,0 +1,146 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Process wide request throttling
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from collections import namedtuple
+import threading
+import time
+
+READ = 'read'
+WRITE = 'write'
+
+_clock = getattr(time, 'monotonic', time.time)
+
+BucketStats = namedtuple('BucketStats', 'host kind requests waited')
+
+
+class TokenBucket(object):
+    """A thread-safe token bucket
+
+    Every call to :meth:`acquire` takes one token, blocking until one is
+    available. Tokens are reserved under the lock and the caller sleeps
+    outside it, so waiting threads are served in the order they arrived.
+
+    :param float rate: tokens added per second, 0 for no limit
+    :param float burst: maximum number of tokens that can accumulate
+    """
+
+    def __init__(self, rate, burst=1, clock=_clock, sleep=time.sleep):
+        self.rate = rate
+        self.burst = burst
+        self.requests = 0
+        self.waited = 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._tokens = burst
+        self._last = clock()
+
+    def acquire(self):
+        """Take a token
+
+        :returns: seconds spent waiting for it
+        """
+        with self._lock:
+            self.requests += 1
+            if not self.rate:
+                return 0.0
+            self._refill()
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+            self.waited += wait
+
+        if wait:
+            self._sleep(wait)
+        return wait
+
+    def set_rate(self, rate):
+        """Change the rate, keeping the tokens earned at the old one"""
+        with self._lock:
+            if self.rate:
+                self._refill()
+            else:
+                self._last = self._clock()
+            self.rate = rate
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.burst,
+                           self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+
+_buckets = {}
+_stats = {}
+_buckets_lock = threading.Lock()
+
+
+def get_bucket(host, rate):
+    """Get the bucket shared by every request sent to ``host``
+
+    :param str host: network location of the server
+    :param float rate: requests per second, 0 for no limit
+    :rtype: :class:`TokenBucket`
+    """
+    with _buckets_lock:
+        bucket = _buckets.get(host)
+        if bucket is None:
+            bucket = _buckets[host] = TokenBucket(rate)
+        elif bucket.rate != rate:
+            bucket.set_rate(rate)
+        return bucket
+
+
+def acquire(host, kind, rate):
+    """Wait for a token to send a request of ``kind`` to ``host``
+
+    Reads and writes draw from the same bucket, so together they stay
+    within ``rate``, but are counted separately by :func:`stats`.
+
+    :param str host: network location of the server
+    :param str kind: :data:`READ` or :data:`WRITE`
+    :param float rate: requests per second, 0 for no limit
+    :returns: seconds spent waiting
+    """
+    wait = get_bucket(host, rate).acquire()
+    with _buckets_lock:
+        stat = _stats.setdefault((host, kind), [0, 0.0])
+        stat[0] += 1
+        stat[1] += wait
+    return wait
+
+
+def stats():
+    """Get request and wait totals for every host and kind of request
+
+    :returns: list of :class:`BucketStats` sorted by host and kind
+    """
+    with _buckets_lock:
+        items = sorted(_stats.items())
+    return [BucketStats(host, kind, requests, waited)
+            for (host, kind), (requests, waited) in items]
+
+
+def reset():
+    """Forget all buckets"""
+    with _buckets_lock:
+        _buckets.clear()
+        _stats.clear()
@@ -0,0 +1,196 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Watch a job directory for changed job config files
+
+On linux, with the optional inotify_simple package installed, changes are
+reported by the kernel. Everywhere else the directory is polled. Either
+way, :func:`batches` groups bursts of changes into sets of file names.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import errno
+import os
+import time
+
+try:
+    import inotify_simple
+except ImportError:
+    inotify_simple = None
+
+JOB_EXT = '.xml'
+
+
+def _is_job(filename):
+    return filename.endswith(JOB_EXT) and not filename.startswith('.')
+
+
+def walk(directory):
+    """Yield every job config file under ``directory``"""
+    for dirpath, dirnames, filenames in os.walk(directory):
+        dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+        for filename in filenames:
+            if _is_job(filename):
+                yield os.path.join(dirpath, filename)
+
+
+class PollingWatcher(object):
+    """Find changed job files by comparing the size and mtime of every file
+    under ``directory`` every ``interval`` seconds
+
+    :param str directory: directory to watch
+    :param float interval: seconds between scans
+    """
+
+    def __init__(self, directory, interval=1.0):
+        self.directory = directory
+        self.interval = interval
+        self._stats = self._scan()
+
+    def _scan(self):
+        stats = {}
+        for filename in walk(self.directory):
+            try:
+                st = os.stat(filename)
+            except OSError as e:
+                # deleted between listing and stat
+                if e.errno != errno.ENOENT:
+                    raise
+                continue
+            stats[filename] = (st.st_mtime, st.st_size)
+        return stats
+
+    def read(self, timeout=None):
+        """Wait up to ``timeout`` seconds, forever if None, for changes
+
+        :returns: set of created or modified job files
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            stats = self._scan()
+            changed = set(filename for filename, stat in stats.items()
+                          if self._stats.get(filename) != stat)
+            self._stats = stats
+            if changed:
+                return changed
+            if deadline is None:
+                delay = self.interval
+            else:
+                delay = min(self.interval, deadline - time.time())
+                if delay <= 0:
+                    return changed
+            time.sleep(delay)
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher(object):
+    """Find changed job files using inotify
+
+    Every directory under ``directory`` is watched, including directories
+    created later. Files count as changed when they are closed after
+    writing, or moved into place, as most editors save files.
+
+    :param str directory: directory to watch
+    """
+
+    def __init__(self, directory):
+        flags = inotify_simple.flags
+        self.directory = directory
+        self._flags = flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE
+        self._inotify = inotify_simple.INotify()
+        self._dirs = {}
+        for dirpath, dirnames, _ in os.walk(directory):
+            dirnames[:] = [d for d in dirnames if not d.startswith('.')]
+            self._add(dirpath)
+
+    def _add(self, directory):
+        wd = self._inotify.add_watch(directory, self._flags)
+        self._dirs[wd] = directory
+
+    def read(self, timeout=None):
+        """Wait up to ``timeout`` seconds, forever if None, for changes
+
+        :returns: set of created or modified job files
+        """
+        flags = inotify_simple.flags
+        changed = set()
+        events = self._inotify.read(
+            timeout=None if timeout is None else int(timeout * 1000))
+        for event in events:
+            directory = self._dirs.get(event.wd)
+            if directory is None or not event.name:
+                continue
+            path = os.path.join(directory, event.name)
+            if event.mask & flags.ISDIR:
+                if event.mask & (flags.CREATE | flags.MOVED_TO) and \
+                        not event.name.startswith('.'):
+                    self._add(path)
+                    # files written before the watch was added
+                    changed.update(walk(path))
+            elif event.mask & (flags.CLOSE_WRITE | flags.MOVED_TO) and \
+                    _is_job(event.name):
+                changed.add(path)
+        return changed
+
+    def close(self):
+        self._inotify.close()
+
+
+def watcher(directory, poll=False, interval=1.0):
+    """Watch ``directory`` with inotify when available, else by polling
+
+    :param str directory: directory to watch
+    :param bool poll: always poll the directory
+    :param float interval: seconds between scans when polling
+    """
+    if not poll and inotify_simple is not None:
+        try:
+            return InotifyWatcher(directory)
+        except OSError:
+            # out of watches, or not supported by the file system
+            pass
+    return PollingWatcher(directory, interval)
+
+
+def batches(watch, debounce=0.5, max_delay=10.0):
+    """Yield sets of changed files, one per burst of changes
+
+    A burst ends once no file has changed for ``debounce`` seconds, or
+    ``max_delay`` seconds after it started. A file changed several times
+    in a burst is only reported once.
+
+    :param watch: a watcher, as returned by :func:`watcher`
+    :param float debounce: seconds without changes that end a burst
+    :param float max_delay: longest time to hold on to a change
+    """
+    while True:
+        changed = set(watch.read())
+        if not changed:
+            continue
+        deadline = time.time() + max_delay
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            more = watch.read(min(debounce, remaining))
+            if not more:
+                break
+            changed.update(more)
+        yield changed
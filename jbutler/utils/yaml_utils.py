@@ -0,0 +1,70 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import yaml
+
+from ..constants import YAML_KWARGS
+from . import instrument
+
+try:
+    # prefer the libyaml bindings, they are several times faster
+    from yaml import CSafeLoader as SafeLoader
+    from yaml import CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader
+    from yaml import SafeDumper
+
+
+def load(stream):
+    """Load a single yaml document from a string or file"""
+    with instrument.span('yaml.load'):
+        return yaml.load(stream, Loader=SafeLoader)
+
+
+def load_all(stream):
+    """Lazily load every yaml document in a string or file"""
+    documents = yaml.load_all(stream, Loader=SafeLoader)
+    while True:
+        start = instrument.timer()
+        try:
+            document = next(documents)
+        except StopIteration:
+            return
+        instrument.record_span('yaml.load', start, instrument.timer() - start)
+        yield document
+
+
+def dump(data, stream=None):
+    """Dump ``data`` as a single yaml document
+
+    Returns the document as a string if ``stream`` is None.
+    """
+    with instrument.span('yaml.dump'):
+        return yaml.dump(data, stream, Dumper=SafeDumper, **YAML_KWARGS)
+
+
+def dump_all(documents, stream=None):
+    """Dump an iterable of objects as a multi-document yaml stream
+
+    Each document is written to ``stream`` as soon as it is produced by
+    ``documents``, so a generator can be serialized in constant memory.
+    """
+    return yaml.dump_all(documents, stream, Dumper=SafeDumper,
+                         explicit_start=True, **YAML_KWARGS)
@@ -0,0 +1,592 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+An in-process stand-in for a jenkins master
+
+Implements the parts of the remote api jbutler uses, keeping jobs, views,
+queue items and builds in memory. Every request can be delayed by a fixed
+latency and fail at a given rate, to see how the client behaves against a
+slow or flaky master.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+from collections import defaultdict
+import json
+import random
+import re
+import threading
+import time
+
+from six.moves import BaseHTTPServer
+from six.moves import socketserver
+from six.moves.urllib.parse import parse_qs, quote, unquote, urlparse
+
+from jbutler.utils.instrument import url_template
+
+LIST_VIEW = 'hudson.model.ListView'
+NESTED_VIEW = 'hudson.plugins.nested_view.NestedView'
+
+# form fields of a list view that are not job names
+VIEW_FIELDS = ('filterQueue', 'filterExecutors', 'recurse', '_.recurse',
+               'useincluderegex', 'Submit', 'core:apply')
+
+DEFAULT_CONFIG = """\
+<?xml version='1.0' encoding='UTF-8'?>
+<project>
+  <disabled>false</disabled>
+</project>
+"""
+
+FORM_TEMPLATE = """\
+<html><body><form>
+<textarea name="description">%(description)s</textarea>
+<input name="filterQueue" type="checkbox"%(filterQueue)s/>
+<input name="filterExecutors" type="checkbox"%(filterExecutors)s/>
+%(fields)s
+</form></body></html>
+"""
+
+LIST_FIELDS_TEMPLATE = """\
+<select name="statusFilter"><option value="%(statusFilter)s" \
+selected="true">status</option></select>
+<input name="_.recurse" type="checkbox"%(recurse)s/>
+<input name="includeRegex" value="%(includeRegex)s"/>
+"""
+
+NESTED_FIELDS_TEMPLATE = """\
+<select name="defaultView"><option selected="true">%(defaultView)s\
+</option></select>
+"""
+
+
+# key of the {start,end} range of a list in a parsed tree
+RANGE = '{}'
+
+
+def parse_tree(tree):
+    """Parse a ``tree`` query parameter into nested dicts of field names
+
+    ``jobs[name,url]{0,10},views[name]`` becomes
+    ``{'jobs': {'name': None, 'url': None, RANGE: (0, 10)},
+    'views': {'name': None}}``
+    """
+    def parse(idx):
+        fields = {}
+        name = last = ''
+        while idx < len(tree):
+            char = tree[idx]
+            if char == '[':
+                fields[name], idx = parse(idx + 1)
+                last, name = name, ''
+                continue
+            if char in ',]':
+                if name:
+                    fields[name] = None
+                    last = name
+                name = ''
+                if char == ']':
+                    return fields, idx + 1
+            elif char == '{':
+                end = tree.index('}', idx)
+                if name:
+                    fields[name] = None
+                    last, name = name, ''
+                if fields.get(last) is None:
+                    fields[last] = {}
+                fields[last][RANGE] = parse_range(tree[idx + 1:end])
+                idx = end
+            else:
+                name += char
+            idx += 1
+        if name:
+            fields[name] = None
+        return fields, idx
+    return parse(0)[0]
+
+
+def parse_range(spec):
+    """Parse the ``M,N``, ``M,``, ``,N`` or ``N`` of a ``{...}`` range"""
+    if ',' not in spec:
+        return int(spec), int(spec) + 1
+    start, end = spec.split(',', 1)
+    return int(start or 0), int(end) if end else None
+
+
+def apply_tree(data, fields):
+    """Keep only the ``fields`` of ``data``, as jenkins does for ``tree``"""
+    if fields is None:
+        return data
+    if isinstance(data, list):
+        if RANGE in fields:
+            data = data[slice(*fields[RANGE])]
+        return [apply_tree(item, fields) for item in data]
+    if isinstance(data, dict):
+        return dict((k, apply_tree(data[k], sub))
+                    for k, sub in fields.items() if k in data)
+    return data
+
+
+class Response(object):
+    def __init__(self, status=200, body=b'', content_type='text/plain',
+                 headers=None):
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+        self.status = status
+        self.body = body
+        self.headers = dict(headers or {})
+        self.headers.setdefault('Content-Type',
+                                content_type + ';charset=utf-8')
+
+
+class FakeJenkins(object):
+    """A jenkins master that lives in this process
+
+    Use it as a context manager, or call :meth:`start` and :meth:`stop`.
+
+    :param float latency: seconds every request is delayed
+    :param float error_rate: fraction of requests that fail
+    :param int error_status: http status of injected failures
+    :param int seed: seed for the error injection
+    :param float queue_delay: seconds a triggered build waits in the queue
+    :param float build_duration: seconds a build runs
+    """
+
+    def __init__(self, latency=0, error_rate=0, error_status=503, seed=0,
+                 queue_delay=0, build_duration=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.queue_delay = queue_delay
+        self.build_duration = build_duration
+        self.jobs = {}
+        self.views = {}
+        self.queue = {}
+        self.hits = defaultdict(int)
+        self.errors = 0
+        # most queue items waiting for their build at once
+        self.max_queued = 0
+        # most requests being handled at once
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self.url = None
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._next_queue_id = 1
+        self._httpd = None
+        self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def start(self):
+        self._httpd = _Server(('127.0.0.1', 0), _Handler)
+        self._httpd.jenkins = self
+        self.url = 'http://127.0.0.1:%d' % self._httpd.server_address[1]
+        self._thread = threading.Thread(target=self._httpd.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._thread.join()
+            self._httpd = None
+
+    # state
+
+    def add_job(self, name, config=DEFAULT_CONFIG):
+        with self._lock:
+            self.jobs[name] = dict(config=config, builds=[], next_build=1)
+
+    def add_build(self, name, result='SUCCESS'):
+        """Start a build of job ``name``, which runs for build_duration and
+        then finishes with ``result``"""
+        with self._lock:
+            job = self.jobs[name]
+            number = job['next_build']
+            job['next_build'] += 1
+            job['builds'].append(dict(number=number, started=time.time(),
+                                      log=[], result=result))
+            return number
+
+    def add_view(self, path, jobs=(), nested=False, **options):
+        """Add a view, ``path`` is a list of view names from the root"""
+        with self._lock:
+            view = dict(nested=nested, jobs=set(jobs), description='',
+                        filterQueue=False, filterExecutors=False,
+                        statusFilter='', recurse=False, includeRegex='')
+            view.update(options)
+            self.views[tuple(path)] = view
+
+    def job_url(self, name):
+        return '%s/job/%s/' % (self.url, quote(name))
+
+    def view_url(self, path):
+        return self.url + ''.join('/view/%s' % quote(n) for n in path) + '/'
+
+    def is_disabled(self, name):
+        return '<disabled>true</disabled>' in self.jobs[name]['config']
+
+    # request handling
+
+    def handle(self, method, url, body):
+        """Dispatch a request
+
+        :returns: a :class:`Response`
+        """
+        with self._lock:
+            self.hits[(method, url_template(url))] += 1
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            return self._handle(method, url, body)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _handle(self, method, url, body):
+        parsed = urlparse(url)
+        if self.latency:
+            time.sleep(self.latency)
+        with self._lock:
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.errors += 1
+                return Response(self.error_status, 'injected failure')
+
+        query = dict((k, v[-1]) for k, v in parse_qs(parsed.query).items())
+        segments = [unquote(s) for s in parsed.path.split('/') if s]
+        view_path = []
+        while len(segments) > 1 and segments[0] == 'view':
+            view_path.append(segments[1])
+            segments = segments[2:]
+        job = build = None
+        if len(segments) > 1 and segments[0] == 'job':
+            job = segments[1]
+            segments = segments[2:]
+            if segments and segments[0].isdigit():
+                build = int(segments[0])
+                segments = segments[1:]
+        action = '/'.join(segments)
+
+        with self._lock:
+            if build is not None:
+                return self._build(method, job, build, action, query)
+            if job is not None:
+                return self._job(method, job, action, query, body)
+            if view_path:
+                return self._view(method, tuple(view_path), action, query,
+                                  body)
+            return self._root(method, action, query, body)
+
+    def _api(self, data, action, query):
+        fields = None
+        if 'tree' in query:
+            fields = parse_tree(query['tree'])
+        data = apply_tree(data, fields)
+        if action.endswith('json'):
+            return Response(body=json.dumps(data),
+                            content_type='application/json')
+        return Response(body=repr(data))
+
+    def _build_row(self, build):
+        building = time.time() - build['started'] < self.build_duration
+        return dict(number=build['number'], building=building,
+                    result=None if building else build.get('result',
+                                                           'SUCCESS'),
+                    duration=0 if building else int(
+                        self.build_duration * 1000),
+                    timestamp=int(build['started'] * 1000))
+
+    def _job_row(self, name):
+        color = 'disabled' if self.is_disabled(name) else 'blue'
+        builds = self.jobs[name]['builds']
+        last = self._build_row(builds[-1]) if builds else None
+        return dict(name=name, url=self.job_url(name), color=color,
+                    lastBuild=last)
+
+    def _view_rows(self, parent):
+        rows = []
+        for path in sorted(self.views):
+            if path[:-1] == parent:
+                rows.append(dict(name=path[-1], url=self.view_url(path)))
+        return rows
+
+    def _root(self, method, action, query, body):
+        if action in ('api/python', 'api/json') and method == 'GET':
+            views = [dict(name='all', url=self.url + '/')]
+            views.extend(self._view_rows(()))
+            data = dict(nodeDescription='the master jenkins node',
+                        description=None, url=self.url + '/',
+                        jobs=[self._job_row(n) for n in sorted(self.jobs)],
+                        views=views,
+                        primaryView=dict(name='all', url=self.url + '/'))
+            return self._api(data, action, query)
+        if action.startswith('crumbIssuer/api') and method == 'GET':
+            return self._api(dict(crumb='fake-crumb',
+                                  crumbRequestField='Jenkins-Crumb'),
+                             action, query)
+        if action == 'configure' and method == 'GET':
+            return Response(body=FORM_TEMPLATE % dict(
+                description='', filterQueue='', filterExecutors='',
+                fields=NESTED_FIELDS_TEMPLATE % dict(defaultView='all')),
+                content_type='text/html')
+        if action == 'createItem' and method == 'POST':
+            name = query.get('name')
+            if not name or name in self.jobs:
+                return Response(400, 'A job already exists with the name')
+            self.add_job(name, body.decode('utf-8'))
+            return Response()
+        if action == 'createView' and method == 'POST':
+            return self._create_view((), body)
+        match = re.match(r'queue/item/(\d+)/api/(python|json)$', action)
+        if match and method == 'GET':
+            return self._queue_item(int(match.group(1)), action, query)
+        return Response(404, 'not found')
+
+    def _job(self, method, name, action, query, body):
+        job = self.jobs.get(name)
+        if job is None:
+            return Response(404, 'no such job')
+        if action in ('api/python', 'api/json') and method == 'GET':
+            builds = [dict(number=b['number'],
+                           url='%s%d/' % (self.job_url(name), b['number']))
+                      for b in reversed(job['builds'])]
+            last = builds[0] if builds else None
+            first = builds[-1] if builds else None
+            properties = []
+            if 'parameterDefinitions' in job['config']:
+                properties.append(dict(parameterDefinitions=[]))
+            data = dict(name=name, url=self.job_url(name),
+                        color=self._job_row(name)['color'],
+                        buildable=not self.is_disabled(name),
+                        builds=builds, firstBuild=first,
+                        lastBuild=last, lastCompletedBuild=last,
+                        lastFailedBuild=None, lastStableBuild=last,
+                        lastSuccessfulBuild=last,
+                        nextBuildNumber=job['next_build'],
+                        inQueue=any(q['job'] == name and 'build' not in q
+                                    for q in self.queue.values()),
+                        actions=[], property=properties, description='',
+                        healthReport=[], upstreamProjects=[],
+                        downstreamProjects=[])
+            return self._api(data, action, query)
+        if action == 'config.xml':
+            if method == 'GET':
+                return Response(body=job['config'],
+                                content_type='application/xml')
+            job['config'] = body.decode('utf-8')
+            return Response()
+        if method != 'POST':
+            return Response(405, 'method not allowed')
+        if action == 'doDelete':
+            del self.jobs[name]
+            for view in self.views.values():
+                view['jobs'].discard(name)
+            return Response()
+        if action in ('enable', 'disable'):
+            disabled = 'true' if action == 'disable' else 'false'
+            job['config'] = re.sub(r'<disabled>\w+</disabled>',
+                                   '<disabled>%s</disabled>' % disabled,
+                                   job['config'])
+            return Response()
+        if action in ('build', 'buildWithParameters'):
+            queue_id = self._next_queue_id
+            self._next_queue_id += 1
+            params = dict((key, values[0]) for key, values in
+                          parse_qs(body.decode('utf-8')).items()
+                          if key != 'json')
+            self.queue[queue_id] = dict(job=name, queued=time.time(),
+                                        params=params)
+            self.max_queued = max(self.max_queued, sum(
+                1 for item in self.queue.values() if 'build' not in item))
+            return Response(201, headers={
+                'Location': '%s/queue/item/%d/' % (self.url, queue_id)})
+        return Response(404, 'not found')
+
+    def _queue_item(self, queue_id, action, query):
+        item = self.queue.get(queue_id)
+        if item is None:
+            return Response(404, 'no such queue item')
+        name = item['job']
+        data = dict(id=queue_id, actions=[],
+                    task=dict(name=name, url=self.job_url(name)),
+                    why='Waiting for next available executor')
+        if 'build' not in item and (
+                time.time() - item['queued'] >= self.queue_delay):
+            job = self.jobs[name]
+            number = job['next_build']
+            job['next_build'] += 1
+            job['builds'].append(dict(number=number, started=time.time(),
+                                      log=[], params=item['params']))
+            item['build'] = number
+        if 'build' in item:
+            data['executable'] = dict(
+                number=item['build'],
+                url='%s%d/' % (self.job_url(name), item['build']))
+            del data['why']
+        return self._api(data, action, query)
+
+    def _get_build(self, name, number):
+        for build in self.jobs.get(name, {}).get('builds', []):
+            if build['number'] == number:
+                return build
+
+    def _build(self, method, name, number, action, query):
+        build = self._get_build(name, number)
+        if build is None:
+            return Response(404, 'no such build')
+        row = self._build_row(build)
+        building = row['building']
+        log = ['Started by user fake', 'Building %s #%d' % (name, number)]
+        if not building:
+            log.append('Finished: %s' % row['result'])
+        text = ''.join(line + '\n' for line in log)
+
+        if action in ('api/python', 'api/json') and method == 'GET':
+            data = dict(row, url='%s%d/' % (self.job_url(name), number),
+                        fullDisplayName='%s #%d' % (name, number),
+                        actions=[], artifacts=[], culprits=[],
+                        changeSet=dict(items=[], kind=None))
+            return self._api(data, action, query)
+        if action == 'consoleText' and method == 'GET':
+            return Response(body=text)
+        if action == 'logText/progressiveText' and method == 'GET':
+            start = int(query.get('start', 0))
+            data = text.encode('utf-8')
+            headers = {'X-Text-Size': str(len(data))}
+            if building:
+                headers['X-More-Data'] = 'true'
+            return Response(body=data[start:], headers=headers)
+        return Response(404, 'not found')
+
+    def _view(self, method, path, action, query, body):
+        view = self.views.get(path)
+        if view is None:
+            return Response(404, 'no such view')
+        if action in ('api/python', 'api/json') and method == 'GET':
+            data = dict(name=path[-1], url=self.view_url(path),
+                        description=view['description'], property=[])
+            if view['nested']:
+                data['views'] = self._view_rows(path)
+            else:
+                # like Jenkins, list the jobs matching the regex as well as
+                # the explicit members
+                regex = view['includeRegex']
+                names = set(n for n in self.jobs if regex and re.match(
+                    regex + '$', n)) | (view['jobs'] & set(self.jobs))
+                data['jobs'] = [self._job_row(n) for n in sorted(names)]
+            return self._api(data, action, query)
+        if action == 'configure' and method == 'GET':
+            checked = dict((k, ' checked="true"' if view[k] else '')
+                           for k in ('filterQueue', 'filterExecutors',
+                                     'recurse'))
+            if view['nested']:
+                fields = NESTED_FIELDS_TEMPLATE % dict(defaultView='')
+            else:
+                fields = LIST_FIELDS_TEMPLATE % dict(
+                    statusFilter=view['statusFilter'],
+                    recurse=checked['recurse'],
+                    includeRegex=view['includeRegex'])
+            return Response(body=FORM_TEMPLATE % dict(
+                description=view['description'],
+                filterQueue=checked['filterQueue'],
+                filterExecutors=checked['filterExecutors'],
+                fields=fields), content_type='text/html')
+        if method != 'POST':
+            return Response(405, 'method not allowed')
+        if action == 'createView':
+            if not view['nested']:
+                return Response(400, 'not a nested view')
+            return self._create_view(path, body)
+        if action == 'configSubmit':
+            form = dict((k, v[-1]) for k, v in
+                        parse_qs(body.decode('utf-8'),
+                                 keep_blank_values=True).items())
+            view.update(
+                description=form.get('description', form.get('', '')),
+                filterQueue=form.get('filterQueue') == 'on',
+                filterExecutors=form.get('filterExecutors') == 'on',
+                statusFilter=form.get('statusFilter', ''),
+                recurse=form.get('recurse') == 'on',
+                includeRegex=form.get('includeRegex', ''),
+                jobs=set(k for k, v in form.items()
+                         if v == 'on' and k not in VIEW_FIELDS))
+            return Response()
+        if action in ('addJobToView', 'removeJobFromView'):
+            name = query.get('name')
+            if name not in self.jobs:
+                return Response(404, 'no such job')
+            if action == 'addJobToView':
+                view['jobs'].add(name)
+            else:
+                view['jobs'].discard(name)
+            return Response()
+        if action == 'doDelete':
+            for other in list(self.views):
+                if other[:len(path)] == path:
+                    del self.views[other]
+            return Response()
+        return Response(404, 'not found')
+
+    def _create_view(self, parent, body):
+        form = dict((k, v[-1]) for k, v in
+                    parse_qs(body.decode('utf-8')).items())
+        name = form.get('name')
+        if not name or parent + (name,) in self.views:
+            return Response(400, 'A view already exists with the name')
+        self.add_view(parent + (name,),
+                      nested=form.get('mode') == NESTED_VIEW)
+        return Response()
+
+
+class _Server(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # send headers and body in one write, so keep-alive connections do not
+    # stall on delayed acks
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def _dispatch(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        response = self.server.jenkins.handle(method, self.path, body)
+        self.send_response(response.status)
+        for key, value in response.headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(response.body)))
+        self.end_headers()
+        self.wfile.write(response.body)
+
+    def do_GET(self):
+        self._dispatch('GET')
+
+    def do_POST(self):
+        self._dispatch('POST')
+
+    def log_message(self, *args):
+        pass
@@ -0,0 +1,246 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""
+Throughput of the bulk job and view operations against a fake master
+
+Batch sizes are taken from JBUTLER_PERF_SIZES (default ``10,100``), add
+1000 to run the large batches. Results are printed and, when
+JBUTLER_PERF_RESULTS names a file, written to it as json.
+"""
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import io
+import json
+import os
+import time
+
+from jbutler.lib import cfg
+from jbutler.lib import jobs as libjobs
+from jbutler.lib import views as libviews
+from jbutler.utils import jenkins_utils
+
+from .. import base
+from .fake_jenkins import FakeJenkins
+
+SIZES = [int(s) for s in
+         os.environ.get('JBUTLER_PERF_SIZES', '10,100').split(',') if s]
+LATENCY = float(os.environ.get('JBUTLER_PERF_LATENCY', '0.002'))
+WORKERS = int(os.environ.get('JBUTLER_PERF_WORKERS', '8'))
+RESULTS_FILE = os.environ.get('JBUTLER_PERF_RESULTS')
+
+JOB_CONFIG = u"""\
+<?xml version='1.0' encoding='UTF-8'?>
+<project>
+  <description>%s</description>
+  <disabled>false</disabled>
+</project>
+"""
+
+PARAM_JOB_CONFIG = u"""\
+<?xml version='1.0' encoding='UTF-8'?>
+<project>
+  <properties>
+    <hudson.model.ParametersDefinitionProperty>
+      <parameterDefinitions/>
+    </hudson.model.ParametersDefinitionProperty>
+  </properties>
+  <disabled>false</disabled>
+</project>
+"""
+
+
+def job_file(name, description=''):
+    """An in-memory job config file, as click.File would open it"""
+    fh = io.StringIO(JOB_CONFIG % description)
+    fh.name = os.path.join('jobs', name + '.xml')
+    return fh
+
+
+def job_name(idx):
+    return 'job-%04d' % idx
+
+
+class ThroughputTest(base.JbutlerTestCase):
+    """Measure jobs per second of the bulk operations"""
+    results = []
+
+    @classmethod
+    def tearDownClass(cls):
+        for result in cls.results:
+            print('%(operation)-16s %(size)5d jobs  %(workers)2d workers  '
+                  '%(seconds)7.3fs  %(rate)8.1f jobs/s' % result)
+        if RESULTS_FILE:
+            with open(RESULTS_FILE, 'w') as fh:
+                json.dump(cls.results, fh, indent=2, sort_keys=True)
+        super(ThroughputTest, cls).tearDownClass()
+
+    def server(self, fake, workers=WORKERS, **options):
+        config = cfg.JbutlerConfigParser()
+        config.set('server', fake.url)
+        config.set('max_workers', workers)
+        for key, value in options.items():
+            config.set(key, value)
+        return jenkins_utils.server_factory(config.snapshot())
+
+    def fake(self, size=0, **kwargs):
+        kwargs.setdefault('latency', LATENCY)
+        fake = FakeJenkins(**kwargs).start()
+        self.addCleanup(fake.stop)
+        for idx in range(size):
+            fake.add_job(job_name(idx), JOB_CONFIG % '')
+        return fake
+
+    def measure(self, operation, size, workers, func):
+        start = time.time()
+        result = func()
+        seconds = time.time() - start
+        self.results.append(dict(operation=operation, size=size,
+                                 workers=workers, seconds=seconds,
+                                 rate=size / seconds if seconds else 0))
+        return result
+
+    def test_create(self):
+        for size in SIZES:
+            fake = self.fake()
+            server = self.server(fake)
+            files = [job_file(job_name(i)) for i in range(size)]
+            created = self.measure(
+                'jobs create', size, WORKERS,
+                lambda: libjobs.createJobs(server, files, workers=WORKERS))
+            self.assertEqual(size, len(created))
+            self.assertEqual(size, len(fake.jobs))
+
+    def test_update(self):
+        for size in SIZES:
+            fake = self.fake(size)
+            server = self.server(fake)
+            files = [job_file(job_name(i), 'updated') for i in range(size)]
+            updated = self.measure(
+                'jobs update', size, WORKERS,
+                lambda: libjobs.updateJobs(server, files, workers=WORKERS))
+            self.assertEqual(size, len(updated))
+            for job in fake.jobs.values():
+                self.assertIn('updated', job['config'])
+
+    def test_retrieve(self):
+        for size in SIZES:
+            fake = self.fake(size)
+            server = self.server(fake)
+
+            def retrieve():
+                jobs = libjobs.retrieveJobs(server, [], workers=WORKERS)
+                return [job.get_config() for job in jobs]
+            configs = self.measure('jobs retrieve', size, WORKERS, retrieve)
+            self.assertEqual(size, len(configs))
+
+    def test_retrieve_paged(self):
+        for size in SIZES:
+            fake = self.fake(size)
+            server = self.server(fake, page_size=25)
+            jobs = self.measure(
+                'jobs retrieve paged', size, WORKERS,
+                lambda: libjobs.retrieveJobs(server, [], workers=WORKERS,
+                                             page_size=25))
+            self.assertEqual(sorted(fake.jobs), sorted(j.name for j in jobs))
+
+    def test_status(self):
+        for size in SIZES:
+            fake = self.fake(size)
+            for idx in range(0, size, 2):
+                fake.add_build(job_name(idx), 'FAILURE')
+            config = cfg.JbutlerConfigParser()
+            config.set('server', fake.url)
+            server = jenkins_utils.server_factory(config.snapshot(),
+                                                  lazy=True)
+            rows = self.measure(
+                'jobs status', size, 1,
+                lambda: libjobs.jobStatus(server, results=['FAILURE']))
+            self.assertEqual((size + 1) // 2, len(rows))
+            # a single request, however many jobs there are
+            self.assertEqual(1, sum(fake.hits.values()))
+
+    def test_build_sweep(self):
+        for size in SIZES:
+            fake = self.fake(queue_delay=0.01, build_duration=0.01)
+            fake.add_job('sweep', PARAM_JOB_CONFIG)
+            server = self.server(fake)
+            paramSets = [{'N': str(n)} for n in range(size)]
+            done = self.measure(
+                'jobs build sweep', size, WORKERS,
+                lambda: libjobs.buildJobs(
+                    server, ['sweep.xml'], paramSets=paramSets,
+                    maxInFlight=WORKERS, workers=WORKERS, delay=0.01))
+            self.assertEqual(['SUCCESS'] * size, [r.result for r in done])
+            self.assertEqual(size, len(fake.jobs['sweep']['builds']))
+            # the supervisor never leaves more than the cap in the queue
+            self.assertLessEqual(fake.max_queued, WORKERS)
+
+    def test_disable(self):
+        for size in SIZES:
+            fake = self.fake(size)
+            server = self.server(fake)
+            files = [job_name(i) + '.xml' for i in range(size)]
+            disabled = self.measure(
+                'jobs disable', size, 1,
+                lambda: libjobs.disableJobs(server, files))
+            self.assertEqual(size, len(disabled))
+            self.assertTrue(all(fake.is_disabled(n) for n in fake.jobs))
+
+    def test_views_sync(self):
+        for size in SIZES:
+            fake = self.fake(size)
+            server = self.server(fake)
+            # one list view per ten jobs, under a single nested view
+            views = [dict(name='group-%d' % i, path='/all-jobs/group-%d' % i,
+                          jobs=[job_name(j) for j in range(i, size, 10)])
+                     for i in range(min(size, 10))]
+            data = json.dumps([dict(name='all-jobs', path='/all-jobs',
+                                    views=views)])
+            plan = self.measure(
+                'views update', size, WORKERS,
+                lambda: libviews.syncViews(server, data, workers=WORKERS))
+            self.assertEqual(len(views) + 1, len(plan))
+            members = set()
+            for path, view in fake.views.items():
+                members.update(view['jobs'])
+            self.assertEqual(set(fake.jobs), members)
+
+    def test_update_scales_with_workers(self):
+        size = 40
+        fake = self.fake(size, latency=0.01)
+        files = [job_file(job_name(i)) for i in range(size)]
+
+        in_flight = {}
+        for workers in (1, WORKERS):
+            server = self.server(fake)
+            for fh in files:
+                fh.seek(0)
+            fake.max_in_flight = 0
+            libjobs.updateJobs(server, files, workers=workers)
+            in_flight[workers] = fake.max_in_flight
+        self.assertEqual(1, in_flight[1])
+        self.assertGreater(in_flight[WORKERS], 1)
+        self.assertLessEqual(in_flight[WORKERS], WORKERS)
+
+    def test_retrieve_with_injected_errors(self):
+        size = SIZES[0]
+        fake = self.fake(size, error_rate=0.1, seed=1)
+        server = self.server(fake, workers=1, retry_backoff=0.001)
+        jobs = libjobs.retrieveJobs(server, [], workers=1)
+        self.assertEqual(size, len([job.get_config() for job in jobs]))
+        self.assertGreater(fake.errors, 0)
@@ -17,9 +17,14 @@
 from __future__ import print_function
 from __future__ import division
 from __future__ import absolute_import
+import json
 import os
 
 from click import exceptions as cexc
+from jbutler import errors
+from jbutler.lib import views as libviews
+from jbutler.utils import instrument
+import jenkinsapi
 
 from . import base
 from .base import mock
@@ -31,24 +36,60 @@ class ConfigCommandTest(base.JbutlerCommandTestCase):
     def test_successful_config_show(self):
         result = self.run_command('config', exit_code=0)
         expected = ('[jbutler]\n'
+                    'cache = \n'
+                    'cache_refresh = false\n'
+                    'cache_ttl = 300.0\n'
+                    'cassette = \n'
+                    'cassette_latency = 0.0\n'
+                    'cassette_mode = replay\n'
+                    'connect_timeout = 10.0\n'
+                    'folder_depth = 2\n'
+                    'job_store = files\n'
                     'jobdir = jobs\n'
+                    'max_in_flight = 0\n'
+                    'max_workers = 1\n'
+                    'page_size = 0\n'
                     'password = <obscured>\n'
+                    'pool_size = 10\n'
+                    'preserve_formatting = false\n'
+                    'read_timeout = 120.0\n'
+                    'requests_per_second = 0.0\n'
+                    'retry_backoff = 0.0\n'
                     'server = http://jenkins.example.com\n'
                     'ssl_verify = true\n'
                     'templatedir = templates\n'
                     'username = test\n'
+                    'xml_mmap = false\n'
                     )
         self.assertEqual(expected, result.output)
 
     def test_successful_config_show_exposed_password(self):
         result = self.run_command('config --show-password', exit_code=0)
         expected = ('[jbutler]\n'
+                    'cache = \n'
+                    'cache_refresh = false\n'
+                    'cache_ttl = 300.0\n'
+                    'cassette = \n'
+                    'cassette_latency = 0.0\n'
+                    'cassette_mode = replay\n'
+                    'connect_timeout = 10.0\n'
+                    'folder_depth = 2\n'
+                    'job_store = files\n'
                     'jobdir = jobs\n'
+                    'max_in_flight = 0\n'
+                    'max_workers = 1\n'
+                    'page_size = 0\n'
                     'password = secret\n'
+                    'pool_size = 10\n'
+                    'preserve_formatting = false\n'
+                    'read_timeout = 120.0\n'
+                    'requests_per_second = 0.0\n'
+                    'retry_backoff = 0.0\n'
                     'server = http://jenkins.example.com\n'
                     'ssl_verify = true\n'
                     'templatedir = templates\n'
                     'username = test\n'
+                    'xml_mmap = false\n'
                     )
         self.assertEqual(expected, result.output)
 
@@ -58,15 +99,37 @@ class ConfigCommandTest(base.JbutlerCommandTestCase):
         args = '--config-file=./jbutlerrc_alt config'
         result = self.run_command(args, exit_code=0)
         expected = ('[jbutler]\n'
+                    'cache = \n'
+                    'cache_refresh = false\n'
+                    'cache_ttl = 300.0\n'
+                    'cassette = \n'
+                    'cassette_latency = 0.0\n'
+                    'cassette_mode = replay\n'
+                    'connect_timeout = 10.0\n'
+                    'folder_depth = 2\n'
+                    'job_store = files\n'
                     'jobdir = jobs\n'
+                    'max_in_flight = 0\n'
+                    'max_workers = 1\n'
+                    'page_size = 0\n'
                     'password = <obscured>\n'
+                    'pool_size = 10\n'
+                    'preserve_formatting = false\n'
+                    'read_timeout = 120.0\n'
+                    'requests_per_second = 0.0\n'
+                    'retry_backoff = 0.0\n'
                     'server = http://jenkins.example.com\n'
                     'ssl_verify = true\n'
                     'templatedir = other/path\n'
                     'username = test\n'
+                    'xml_mmap = false\n'
                     )
         self.assertEqual(expected, result.output)
 
+    def test_refresh(self):
+        result = self.run_command('--refresh config', exit_code=0)
+        self.assertIn('cache_refresh = true\n', result.output)
+
 
 class JobsCreateCommandTest(base.JbutlerCommandTestCase):
     """Test the jbutler jobs command and sub-commands"""
@@ -167,6 +230,39 @@ class JobsRetrieveCommandTest(base.JbutlerCommandTestCase):
         with open(self.work_dir + '/jobs/foo.xml') as fh:
             self.assertEqual(fh.read(), base.FOO_JOB)
 
+    def test_folder_job_retrieval(self):
+        web = mock.MagicMock(spec=jenkinsapi.job.Job)
+        web.name = 'apps/web'
+        web.get_config.return_value = base.BAR_JOB
+        self.jobs['apps/web'] = web
+        self.Jenkins.return_value.get_jobs_info.return_value = iter([
+            ('foourl', 'foo'),
+            ('weburl', 'apps/web'),
+        ])
+
+        result = self.run_command('jobs retrieve', exit_code=0)
+        self.assertEqual('', result.output)
+        self.Jenkins.return_value.get_jobs_info.assert_called_once_with(
+            2, 1, 0)
+        with open(self.work_dir + '/jobs/apps/web.xml') as fh:
+            self.assertEqual(base.BAR_JOB, fh.read())
+        self.assertTrue(os.path.exists(self.work_dir + '/jobs/foo.xml'))
+
+    def test_job_retrieval_to_pack(self):
+        with open('jbutlerrc', 'a') as fh:
+            fh.write('job_store = pack\n')
+        result = self.run_command('jobs retrieve --jobs 2', exit_code=0)
+        self.assertEqual('', result.output)
+        self.assertFalse(os.path.exists(self.work_dir + '/jobs/foo.xml'))
+
+        result = self.run_command('jobs unpack', exit_code=0)
+        self.assertEqual('Unpacked 3 jobs\n', result.output)
+        with open(self.work_dir + '/jobs/baz.xml') as fh:
+            self.assertEqual(base.BAZ_JOB, fh.read())
+
+        result = self.run_command('jobs pack', exit_code=0)
+        self.assertEqual('Packed 3 jobs, 0 changed\n', result.output)
+
     def test_successful_job_retrieval_with_missing_item(self):
         # server only has the foo job
         self.Jenkins.return_value.get_jobs_info.return_value = iter([
@@ -270,6 +366,27 @@ class JobsDisableCommandTest(base.JbutlerCommandTestCase):
                       open(self.work_dir + '/jobs/foo.xml').read())
         self.jobs['foo'].disable.assert_called_once_with()
 
+    def test_disable_force_parallel(self):
+        result = self.run_command(
+            'jobs disable --force --jobs 3 jobs/foo.xml jobs/bar.xml '
+            'jobs/baz.xml', exit_code=0)
+        self.assertEqual('', result.output)
+        for name in ('foo', 'bar', 'baz'):
+            self.assertIn('<disabled>true</disabled>',
+                          open(self.work_dir + '/jobs/%s.xml' % name).read())
+            self.jobs[name].disable.assert_called_once_with()
+
+    def test_disable_force_missing_job(self):
+        self.mkfile('jobs/spam.xml', contents=base.BAR_JOB)
+
+        result = self.run_command(
+            'jobs disable --force jobs/foo.xml jobs/spam.xml', exit_code=0)
+        self.assertEqual("warning: no such job: 'spam'\n", result.output)
+        self.assertIn('<disabled>true</disabled>',
+                      open(self.work_dir + '/jobs/foo.xml').read())
+        self.assertEqual(base.BAR_JOB,
+                         open(self.work_dir + '/jobs/spam.xml').read())
+
 
 class JobsEnableCommandTest(base.JbutlerCommandTestCase):
     """Test the jbutler jobs command and sub-commands"""
@@ -323,6 +440,20 @@ class JobsDeleteCommandTest(base.JbutlerCommandTestCase):
             self.Jenkins.return_value.delete_job.call_args_list,
         )
 
+    def test_delete_force_folder_job(self):
+        self.mkdirs('jobs/apps')
+        self.mkfile('jobs/apps/web.xml', contents=base.BAR_JOB)
+        self.jobs['apps/web'] = mock.MagicMock()
+
+        result = self.run_command('jobs delete --force jobs/apps/web.xml',
+                                  exit_code=0)
+        self.assertEqual('', result.output)
+        self.assertFalse(os.path.exists(self.work_dir + '/jobs/apps/web.xml'))
+        self.assertEqual(
+            [mock.call('apps/web')],
+            self.Jenkins.return_value.delete_job.call_args_list,
+        )
+
     def test_delete_missing_job(self):
         self.mkfile('jobs/spam.xml', contents=base.BAR_JOB)
 
@@ -376,3 +507,231 @@ class JobsUpdateCommandTest(base.JbutlerCommandTestCase):
         self.assertEqual('', result.output)
         self.jobs['foo'].update_config.assert_called_once_with(base.FOO_JOB)
         self.jobs['bar'].update_config.assert_called_once_with(base.BAR_JOB)
+
+
+class JobsWatchCommandTest(base.JbutlerCommandTestCase):
+    """Test the jbutler jobs watch sub-command"""
+
+    def test_watch(self):
+        foo = os.path.join(self.work_dir, 'jobs', 'foo.xml')
+        bar = os.path.join(self.work_dir, 'jobs', 'bar.xml')
+
+        def batches(watcher, debounce):
+            self.assertEqual(0.25, debounce)
+            with open(foo, 'w') as fh:
+                fh.write(base.BAR_JOB)
+            yield set([foo, bar])
+            raise KeyboardInterrupt
+
+        with mock.patch('jbutler.utils.watch.batches', batches):
+            result = self.run_command(
+                'jobs watch --poll --debounce 0.25 --jobs 2', exit_code=0)
+        self.assertEqual("Watching 'jobs'\nUpdated job: foo\n",
+                         result.output)
+        self.jobs['foo'].update_config.assert_called_once_with(base.BAR_JOB)
+        self.jobs['bar'].update_config.assert_not_called()
+
+
+class JobsLogsCommandTest(base.JbutlerCommandTestCase):
+    """Test the jbutler jobs logs sub-command"""
+
+    def test_logs(self):
+        with mock.patch('jbutler.lib.logs.archiveLogs') as archiveLogs:
+            archiveLogs.return_value = [('foo', 2, 'archive/foo/2.log.gz')]
+            result = self.run_command(
+                'jobs logs --builds 1-3 --gzip -o archive --jobs 2 foo',
+                exit_code=0)
+        self.assertEqual('Archived 1 logs\n', result.output)
+        archiveLogs.assert_called_once_with(
+            [self.jobs['foo']], 'archive', [(1, 3)], True, 2)
+
+    def test_logs_bad_range(self):
+        with self.assertRaises(errors.CommandError):
+            self.run_command('jobs logs --builds 3-a foo')
+
+
+class JobsBuildCommandTest(base.JbutlerCommandTestCase):
+    """Test the jbutler jobs build sub-command"""
+
+    def test_build(self):
+        with mock.patch('jbutler.lib.jobs.buildJobs') as buildJobs:
+            self.run_command('jobs build jobs/foo.xml', exit_code=0)
+        buildJobs.assert_called_once_with(
+            self.Jenkins.return_value, ('jobs/foo.xml',), True,
+            paramSets=None, maxInFlight=0, delay=5.0, workers=1,
+            jobDir='jobs')
+
+    def test_build_params_file(self):
+        self.mkfile('sweep.csv', contents='OS,ARCH\nlinux,x86\nwin,x86\n')
+        with mock.patch('jbutler.lib.jobs.buildJobs') as buildJobs:
+            self.run_command(
+                'jobs build --params-file sweep.csv --max-in-flight 4 '
+                '--interval 1 --no-watch --jobs 2 jobs/foo.xml jobs/bar.xml',
+                exit_code=0)
+        buildJobs.assert_called_once_with(
+            self.Jenkins.return_value, ('jobs/foo.xml', 'jobs/bar.xml'),
+            False, paramSets=[{'OS': 'linux', 'ARCH': 'x86'},
+                              {'OS': 'win', 'ARCH': 'x86'}],
+            maxInFlight=4, delay=1.0, workers=2, jobDir='jobs')
+
+    def test_build_empty_params_file(self):
+        self.mkfile('sweep.yml', contents='[]\n')
+        with self.assertRaises(errors.CommandError):
+            self.run_command('jobs build --params-file sweep.yml '
+                             'jobs/foo.xml')
+
+
+class JobsStatusCommandTest(base.JbutlerCommandTestCase):
+    """Test the jbutler jobs status sub-command"""
+
+    def setUp(self):
+        super(JobsStatusCommandTest, self).setUp()
+        self.Jenkins.return_value.get_jobs_status = mock.MagicMock(
+            return_value=iter([
+                ('foo', {'color': 'red', 'lastBuild': {
+                    'number': 3, 'result': 'FAILURE', 'building': False,
+                    'duration': 2000, 'timestamp': 0}}),
+                ('bar', {'color': 'notbuilt', 'lastBuild': None}),
+            ]))
+
+    def test_status(self):
+        result = self.run_command('jobs status', exit_code=0)
+        self.assertEqual(
+            'NAME  BUILD  RESULT     DURATION  STARTED\n'
+            'bar   -      NOT_BUILT  -         -\n'
+            'foo   #3     FAILURE    2.0s      -\n', result.output)
+        self.Jenkins.return_value.get_jobs_status.assert_called_once_with(
+            2, 1, 0)
+        self.assertTrue(self.Jenkins.call_args[1]['lazy'])
+
+    def test_status_json(self):
+        result = self.run_command(
+            'jobs status --format json --result failure', exit_code=0)
+        self.assertEqual([dict(name='foo', color='red', number=3,
+                               result='FAILURE', duration=2000,
+                               timestamp=0)], json.loads(result.output))
+
+
+class ViewsCommandTest(base.JbutlerCommandTestCase):
+    """Test the jbutler views command and sub-commands"""
+
+    def setUp(self):
+        super(ViewsCommandTest, self).setUp()
+        self.mkfile('views.yml', contents=VIEWS_YML)
+
+        libviews_patcher = mock.patch('jbutler.commands.views.libviews',
+                                      wraps=libviews)
+        self.libviews = libviews_patcher.start()
+        self.addCleanup(libviews_patcher.stop)
+        self.libviews.syncViews = mock.MagicMock(return_value=[
+            libviews.ViewChange('create', '/foo', {}, (), None),
+        ])
+
+    def test_create(self):
+        result = self.run_command('views create --jobs 4', exit_code=0)
+        self.assertEqual('', result.output)
+        self.libviews.syncViews.assert_called_once_with(
+            self.Jenkins.return_value, mock.ANY, (), dry_run=False,
+            verify=False, create_only=True, workers=4)
+
+    def test_update_dry_run(self):
+        result = self.run_command('views update --dry-run --prune foo',
+                                  exit_code=0)
+        self.assertEqual('create /foo\n', result.output)
+        self.libviews.syncViews.assert_called_once_with(
+            self.Jenkins.return_value, mock.ANY, ('foo',), prune=True,
+            dry_run=True, verify=False, workers=1)
+
+    def test_update_missing_config(self):
+        os.remove('views.yml')
+        with self.assertRaises(errors.CommandError):
+            self.run_command('views update')
+
+    def test_delete_force(self):
+        self.libviews.deleteViews = mock.MagicMock(return_value=[
+            libviews.ViewChange('delete', '/bar/baz', None, (), None),
+        ])
+        result = self.run_command('views delete --force /bar/baz',
+                                  exit_code=0)
+        self.assertEqual('', result.output)
+        with open('views.yml') as fh:
+            self.assertEqual(
+                '- name: foo\n'
+                '  path: /foo\n'
+                '- name: bar\n'
+                '  path: /bar\n'
+                '  views: []\n',
+                fh.read())
+
+
+class ProfileCommandTest(base.JbutlerCommandTestCase):
+    """Test the jbutler --profile options"""
+
+    def setUp(self):
+        super(ProfileCommandTest, self).setUp()
+        self.addCleanup(instrument.reset)
+        self.addCleanup(instrument.disable)
+
+    def test_profile(self):
+        result = self.run_command('--profile config', exit_code=0)
+        self.assertIn('ENDPOINT', result.output)
+        self.assertIn('total', result.output)
+        self.assertFalse(instrument.enabled())
+
+    def test_profile_trace(self):
+        self.run_command('--profile-trace trace.json jobs retrieve foo',
+                         exit_code=0)
+        with open('trace.json') as fh:
+            trace = json.load(fh)
+        names = [e['name'] for e in trace['traceEvents']]
+        self.assertIn('total', names)
+
+
+class FleetCommandTest(base.JbutlerCommandTestCase):
+    """Test the jbutler --fleet option"""
+
+    def setUp(self):
+        super(FleetCommandTest, self).setUp()
+        with open('jbutlerrc', 'a') as fh:
+            fh.write('[server:east]\n'
+                     'server = http://east.example.com\n'
+                     '[server:west]\n'
+                     'server = http://west.example.com\n')
+        self.Jenkins.return_value.get_jobs_status = mock.MagicMock(
+            side_effect=lambda *args: iter([('foo', {'color': 'blue'})]))
+
+    def test_fleet(self):
+        result = self.run_command('--fleet jobs status', exit_code=0)
+        self.assertEqual(['http://east.example.com',
+                          'http://west.example.com'],
+                         sorted(c[0][0] for c in self.Jenkins.call_args_list))
+        self.assertEqual(
+            '== east (http://east.example.com) ==\n'
+            'NAME  BUILD  RESULT     DURATION  STARTED\n'
+            'foo   -      NOT_BUILT  -         -\n'
+            '== west (http://west.example.com) ==\n'
+            'NAME  BUILD  RESULT     DURATION  STARTED\n'
+            'foo   -      NOT_BUILT  -         -\n'
+            '2 of 2 masters succeeded\n', result.output)
+
+    def test_fleet_other_commands(self):
+        with self.assertRaises(cexc.UsageError):
+            self.run_command('--fleet config')
+
+    def test_no_server(self):
+        with open('jbutlerrc', 'w') as fh:
+            fh.write('[server:east]\n'
+                     'server = http://east.example.com\n')
+        with self.assertRaises(cexc.UsageError):
+            self.run_command('jobs status')
+
+
+VIEWS_YML = """\
+- name: foo
+  path: /foo
+- name: bar
+  path: /bar
+  views:
+  - name: baz
+    path: /bar/baz
+"""
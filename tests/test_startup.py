@@ -0,0 +1,75 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from __future__ import print_function
+from __future__ import division
+from __future__ import absolute_import
+import os
+import subprocess
+import sys
+
+from . import base
+from .base import unittest
+
+# import time budget, in seconds, for commands that never talk to a server
+STARTUP_BUDGET = float(os.environ.get('JBUTLER_STARTUP_BUDGET', '0.15'))
+
+HEAVY_MODULES = ('jenkinsapi', 'lxml', 'requests', 'yaml')
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@unittest.skipIf(sys.version_info < (3, 7), '-X importtime requires 3.7+')
+class StartupTest(base.JbutlerTestCase):
+    """Guard the import cost of the jbutler command line"""
+
+    def import_times(self, args):
+        """Run jbutler under -X importtime
+
+        :returns: list of (module, depth, cumulative seconds) for every
+                  module imported after the jbutler package
+        """
+        env = dict(os.environ)
+        env['PYTHONPATH'] = os.pathsep.join(
+            [ROOT_DIR, env.get('PYTHONPATH', '')])
+        rc_file = self.mkfile('jbutlerrc', contents=base.JBUTLER_RC)
+        cmd = [sys.executable, '-X', 'importtime', '-m', 'jbutler',
+               '--skip-default-config', '--config-file', rc_file]
+        proc = subprocess.Popen(cmd + args, env=env, stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE,
+                                universal_newlines=True)
+        _, err = proc.communicate()
+        self.assertEqual(0, proc.returncode, err)
+
+        times = []
+        for line in err.splitlines():
+            if not line.startswith('import time:') or '[us]' in line:
+                continue
+            _, cumulative, name = line.split('|')
+            module = name.strip()
+            depth = (len(name) - len(name.lstrip()) - 1) // 2
+            if module == 'jbutler' or times:
+                times.append((module, depth, int(cumulative) / 1e6))
+        return times
+
+    def test_config_skips_heavy_imports(self):
+        times = self.import_times(['config'])
+        imported = set(m.split('.')[0] for m, _, _ in times)
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, imported)
+
+        total = sum(t for _, depth, t in times if depth == 0)
+        self.assertLess(total, STARTUP_BUDGET)
@@ -93,8 +93,10 @@ class BranchTestCase(base.JbutlerTestCase):
 
         branch.branch_jobs(templateList, from_macros, to_macros, self.job_dir)
         branch.utils.readTemplate.assert_called_with('template')
-        branch.utils.readJob.assert_called_with('/jobs/foo.xml')
-        branch.utils.writeJob.assert_called_with('/jobs/bar.xml', 'newJob')
+        branch.utils.readJob.assert_called_with('/jobs/foo.xml', False,
+                                                None)
+        branch.utils.writeJob.assert_called_with('/jobs/bar.xml', 'newJob',
+                                                 False, None)
         branch.warnings.warn.assert_not_called()
 
     @mock.patch('jbutler.lib.branch._update_job_data')
@@ -119,8 +121,10 @@ class BranchTestCase(base.JbutlerTestCase):
 
         branch.branch_jobs(templateList, from_macros, to_macros, self.job_dir)
         branch.utils.readTemplate.assert_called_with('template')
-        branch.utils.readJob.assert_called_with('/jobs/foo.xml')
-        branch.utils.writeJob.assert_called_with('/jobs/bar.xml', 'newJob')
+        branch.utils.readJob.assert_called_with('/jobs/foo.xml', False,
+                                                None)
+        branch.utils.writeJob.assert_called_with('/jobs/bar.xml', 'newJob',
+                                                 False, None)
         branch.warnings.warn.assert_called_with(
             'Support for macros stored in templates is deprecated.',
             DeprecationWarning,
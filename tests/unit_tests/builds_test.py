@@ -0,0 +1,140 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import io
+
+from jbutler import errors
+from jbutler.lib import builds
+from jbutler.lib import cfg
+from jbutler.lib import jobs
+from jbutler.utils import jenkins_utils
+
+from .. import base
+from ..base import mock
+from ..perf.fake_jenkins import FakeJenkins
+
+PARAM_CONFIG = u"""\
+<?xml version='1.0' encoding='UTF-8'?>
+<project>
+  <properties>
+    <hudson.model.ParametersDefinitionProperty>
+      <parameterDefinitions/>
+    </hudson.model.ParametersDefinitionProperty>
+  </properties>
+  <disabled>false</disabled>
+</project>
+"""
+
+
+def params_file(name, contents):
+    fh = io.StringIO(contents)
+    fh.name = name
+    return fh
+
+
+class ReadParamSetsTest(base.JbutlerTestCase):
+    """Test reading matrices of build parameters"""
+
+    def test_csv(self):
+        fh = params_file('sweep.csv', u'OS,ARCH\nlinux,x86\n,\nwin,\n')
+        self.assertEqual([{'OS': 'linux', 'ARCH': 'x86'},
+                          {'OS': 'win', 'ARCH': ''}],
+                         builds.readParamSets(fh))
+
+        fh = params_file('sweep.csv', u'OS\nlinux,x86\n')
+        self.assertRaises(errors.CommandError, builds.readParamSets, fh)
+
+    def test_yaml_list(self):
+        fh = params_file('sweep.yml',
+                         u'- {OS: linux, DEBUG: true, N: 2}\n- {OS: win}\n')
+        self.assertEqual([{'OS': 'linux', 'DEBUG': 'true', 'N': '2'},
+                          {'OS': 'win'}],
+                         builds.readParamSets(fh))
+
+    def test_yaml_matrix(self):
+        fh = params_file('sweep.yml', u'OS: [linux, win]\nARCH: [x86, arm]\n'
+                                      u'TAG: nightly\n')
+        self.assertEqual([
+            {'ARCH': 'x86', 'OS': 'linux', 'TAG': 'nightly'},
+            {'ARCH': 'x86', 'OS': 'win', 'TAG': 'nightly'},
+            {'ARCH': 'arm', 'OS': 'linux', 'TAG': 'nightly'},
+            {'ARCH': 'arm', 'OS': 'win', 'TAG': 'nightly'},
+        ], builds.readParamSets(fh))
+
+    def test_yaml_invalid(self):
+        for contents in (u'linux\n', u'- linux\n'):
+            self.assertRaises(errors.CommandError, builds.readParamSets,
+                              params_file('sweep.yml', contents))
+
+
+class BuildSupervisorTest(base.JbutlerTestCase):
+    """Test building jobs against a fake server"""
+
+    def fake(self, **kwargs):
+        fake = FakeJenkins(**kwargs).start()
+        self.addCleanup(fake.stop)
+        fake.add_job('foo', PARAM_CONFIG)
+        fake.add_job('bar')
+        return fake
+
+    def server(self, fake):
+        config = cfg.JbutlerConfigParser()
+        config.set('server', fake.url)
+        return jenkins_utils.server_factory(config.snapshot())
+
+    def setUp(self):
+        super(BuildSupervisorTest, self).setUp()
+        echo_patcher = mock.patch('jbutler.lib.builds.echo')
+        self.echo = echo_patcher.start()
+        self.addCleanup(echo_patcher.stop)
+
+    def test_sweep(self):
+        fake = self.fake(queue_delay=0.05, build_duration=0.05)
+        paramSets = [{'N': str(n)} for n in range(10)]
+        done = jobs.buildJobs(self.server(fake), ['jobs/foo.xml'],
+                              paramSets=paramSets, maxInFlight=3, workers=4,
+                              delay=0.01)
+
+        self.assertEqual(10, len(done))
+        self.assertEqual(['SUCCESS'] * 10, [r.result for r in done])
+        self.assertEqual(list(range(1, 11)),
+                         sorted(r.number for r in done))
+        self.assertEqual(sorted(p['N'] for p in paramSets),
+                         sorted(b['params']['N']
+                                for b in fake.jobs['foo']['builds']))
+        self.assertLessEqual(fake.max_queued, 3)
+        self.echo.assert_any_call(u'[foo #1] Finished: SUCCESS')
+
+    def test_no_watch(self):
+        fake = self.fake()
+        done = jobs.buildJobs(self.server(fake), ['bar.xml'], watch=False,
+                              delay=0)
+        self.assertEqual([(1, None, builds.DONE)],
+                         [(r.number, r.result, r.state) for r in done])
+        self.echo.assert_called_once_with(
+            u'[bar #1] Started without parameters')
+
+    def test_cancelled(self):
+        request = builds.BuildRequest(mock.MagicMock())
+        request.job.name = 'foo'
+        request.job.invoke.return_value._data = dict(cancelled=True)
+        supervisor = builds.BuildSupervisor(mock.MagicMock(), delay=0)
+        supervisor.run([request])
+        self.assertEqual(builds.CANCELLED, request.result)
+        self.assertEqual(builds.DONE, request.state)
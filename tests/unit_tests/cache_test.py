@@ -0,0 +1,158 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import io
+import os
+
+from jbutler.lib import cfg
+from jbutler.lib import jobs
+from jbutler.utils import cache
+from jbutler.utils import jenkins_utils
+
+from .. import base
+from ..perf.fake_jenkins import FakeJenkins
+
+URL = 'http://jenkins.example.com'
+
+JOB_CONFIG = u"""\
+<?xml version='1.0' encoding='UTF-8'?>
+<project>
+  <description>%s</description>
+</project>
+"""
+
+
+class CacheTestCase(base.JbutlerTestCase):
+    """Test the cache of server state"""
+
+    def setUp(self):
+        super(CacheTestCase, self).setUp()
+        self.path = os.path.join(self.work_dir, 'cache.db')
+
+    def test_get_set(self):
+        store = cache.Cache(self.path, URL + '/')
+        self.addCleanup(store.close)
+        self.assertIsNone(store.get(cache.POLL))
+        store.set(cache.POLL, '', {'jobs': []})
+        store.set(cache.CONFIG, 'foo', 'abc', ttl=0)
+        self.assertEqual({'jobs': []}, store.get(cache.POLL))
+        self.assertEqual('gone', store.get(cache.CONFIG, 'foo', 'gone'))
+
+        other = cache.Cache(self.path, 'http://other.example.com')
+        self.addCleanup(other.close)
+        self.assertIsNone(other.get(cache.POLL))
+
+        again = cache.Cache(self.path, URL)
+        self.addCleanup(again.close)
+        self.assertEqual({'jobs': []}, again.get(cache.POLL))
+
+        refreshed = cache.Cache(self.path, URL, refresh=True)
+        self.addCleanup(refreshed.close)
+        self.assertIsNone(refreshed.get(cache.POLL))
+        refreshed.set(cache.POLL, '', {'jobs': [1]})
+        self.assertEqual({'jobs': [1]}, refreshed.get(cache.POLL))
+
+    def test_written(self):
+        store = cache.Cache(self.path, URL)
+        self.addCleanup(store.close)
+        store.set(cache.POLL, '', {})
+        store.set(cache.VIEW, 'foo', None)
+        store.set(cache.CONFIG, 'apps/web', 'abc')
+        store.set(cache.CONFIG, 'top', 'def')
+
+        store.written(URL + '/job/apps/job/web/config.xml')
+        self.assertEqual('missing', store.get(cache.POLL, '', 'missing'))
+        self.assertEqual('missing', store.get(cache.VIEW, 'foo', 'missing'))
+        self.assertIsNone(store.get(cache.CONFIG, 'apps/web'))
+        self.assertEqual('def', store.get(cache.CONFIG, 'top'))
+
+    def test_job_name_from_url(self):
+        self.assertEqual('apps/my job', cache.job_name_from_url(
+            URL + '/job/apps/job/my%20job/config.xml'))
+        self.assertEqual('top', cache.job_name_from_url(URL + '/job/top/'))
+        self.assertIsNone(cache.job_name_from_url(URL + '/createItem'))
+
+
+class CachedServerTestCase(base.JbutlerTestCase):
+    """Test answering commands from the cache"""
+
+    def setUp(self):
+        super(CachedServerTestCase, self).setUp()
+        self.fake = FakeJenkins().start()
+        self.addCleanup(self.fake.stop)
+        for name in ('foo', 'bar'):
+            self.fake.add_job(name, JOB_CONFIG % name)
+        self.fake.add_view(('group', ), jobs=['foo'])
+
+    def server(self, **options):
+        config = cfg.JbutlerConfigParser()
+        config.set('server', self.fake.url)
+        config.set('cache', os.path.join(self.work_dir, 'cache.db'))
+        for key, value in options.items():
+            config.set(key, value)
+        server = jenkins_utils.server_factory(config.snapshot())
+        self.addCleanup(server.cache.close)
+        return server
+
+    def requests(self, method=None):
+        return sum(count for (m, _), count in self.fake.hits.items()
+                   if method is None or m == method)
+
+    def job_file(self, name, description):
+        fh = io.StringIO(JOB_CONFIG % description)
+        fh.name = os.path.join('jobs', name + '.xml')
+        return fh
+
+    def test_retrieve_then_update(self):
+        server = self.server()
+        configs = dict(jobs.retrieveConfigs(
+            server, jobs.retrieveJobs(server, [])))
+        self.assertEqual(['bar', 'foo'], sorted(configs))
+        views = list(server.views.iter_view_dicts())
+
+        # a later run lists nothing, and still pushes every job, as the
+        # server may have changed since the cache was written
+        self.fake.jobs['foo']['config'] = JOB_CONFIG % 'edited on server'
+        start = self.requests()
+        server = self.server()
+        self.assertEqual(['bar', 'foo'], sorted(
+            name for _, name in server.get_jobs_info()))
+        self.assertEqual(views, list(server.views.iter_view_dicts()))
+        self.assertEqual(start, self.requests())
+
+        updated = jobs.updateJobs(server, [self.job_file('foo', 'foo'),
+                                           self.job_file('bar', 'changed')])
+        self.assertEqual(['foo', 'bar'], [job.name for job in updated])
+        self.assertEqual(2, self.requests('POST'))
+        self.assertIn('changed', self.fake.jobs['bar']['config'])
+        self.assertEqual(JOB_CONFIG % 'foo', self.fake.jobs['foo']['config'])
+
+        # the push dropped the listing, so it is fetched again
+        start = self.requests()
+        server.poll()
+        self.assertEqual(start + 1, self.requests())
+        self.assertIsNotNone(server.cache.get(cache.CONFIG, 'bar'))
+
+    def test_refresh(self):
+        self.server()
+        start = self.requests()
+        self.server()
+        self.assertEqual(start, self.requests())
+        self.server(cache_refresh=True)
+        self.assertEqual(start + 1, self.requests())
@@ -0,0 +1,133 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from requests.adapters import BaseAdapter
+from requests.exceptions import ConnectionError
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+import requests
+
+from jbutler.jenkinsapi import cassette
+from jbutler.jenkinsapi.requester import Requester
+
+from .. import base
+from ..base import mock
+
+URL = 'http://jenkins.example.com'
+
+
+class FakeServer(BaseAdapter):
+    """Answers every request with a counter, so replays can be told apart"""
+
+    def __init__(self):
+        super(FakeServer, self).__init__()
+        self.calls = 0
+
+    def send(self, request, **kwargs):
+        self.calls += 1
+        response = Response()
+        response.status_code = 200
+        response.reason = 'OK'
+        response.headers = CaseInsensitiveDict({
+            'Content-Type': 'text/plain; charset=utf-8',
+            'Set-Cookie': 'JSESSIONID=secret',
+        })
+        response._content = ('%s %s %d' % (
+            request.method, request.url, self.calls)).encode('utf-8')
+        response.url = request.url
+        response.request = request
+        return response
+
+    def close(self):
+        pass
+
+
+class CassetteTestCase(base.JbutlerTestCase):
+    """Test recording and replaying http traffic"""
+
+    def session(self, adapter):
+        session = requests.Session()
+        session.mount('http://', adapter)
+        return session
+
+    def record(self, path):
+        server = FakeServer()
+        recorder = cassette.CassetteAdapter(path, cassette.RECORD, server)
+        session = self.session(recorder)
+        session.get(URL + '/api/python')
+        session.get(URL + '/api/python')
+        session.post(URL + '/job/foo/config.xml', data=b'<project/>')
+        session.post(URL + '/job/bar/config.xml', data=b'<project/>')
+        session.close()
+        return server
+
+    def test_record_replay(self):
+        path = self.mkfile('jenkins.cassette')
+        server = self.record(path)
+        self.assertEqual(4, server.calls)
+
+        sleep = mock.MagicMock()
+        player = cassette.CassetteAdapter(path, latency=0.05, sleep=sleep)
+        session = self.session(player)
+        responses = [session.get(URL + '/api/python').text for _ in range(3)]
+        self.assertEqual(['GET %s/api/python 1' % URL,
+                          'GET %s/api/python 2' % URL,
+                          'GET %s/api/python 2' % URL], responses)
+
+        response = session.post(URL + '/job/bar/config.xml',
+                                data=b'<project/>')
+        self.assertEqual('POST %s/job/bar/config.xml 4' % URL, response.text)
+        self.assertEqual('utf-8', response.encoding)
+        self.assertNotIn('Set-Cookie', response.headers)
+        self.assertEqual([mock.call(0.05)] * 4, sleep.call_args_list)
+
+    def test_replay_stream(self):
+        path = self.mkfile('jenkins.cassette')
+        self.record(path)
+        session = self.session(cassette.CassetteAdapter(path))
+        response = session.get(URL + '/api/python', stream=True)
+        chunks = list(response.iter_content(4))
+        self.assertEqual(('GET %s/api/python 1' % URL).encode('utf-8'),
+                         b''.join(chunks))
+        self.assertEqual(4, len(chunks[0]))
+
+        response = session.get(URL + '/api/python', stream=True)
+        self.assertEqual(('GET %s/api/python 2' % URL).encode('utf-8'),
+                         response.raw.read())
+
+    def test_replay_missing(self):
+        path = self.mkfile('jenkins.cassette')
+        self.record(path)
+        session = self.session(cassette.CassetteAdapter(path))
+        with self.assertRaises(ConnectionError):
+            session.post(URL + '/job/foo/config.xml', data=b'<changed/>')
+        with self.assertRaises(ConnectionError):
+            session.get(URL + '/job/foo/api/python')
+
+    def test_bad_mode(self):
+        with self.assertRaises(ValueError):
+            cassette.CassetteAdapter('jenkins.cassette', 'rewind')
+
+    def test_requester(self):
+        path = self.mkfile('jenkins.cassette')
+        self.record(path)
+        requester = Requester('user', 'pass', cassette=path)
+        response = requester.get_url(URL + '/api/python')
+        self.assertEqual('GET %s/api/python 1' % URL, response.text)
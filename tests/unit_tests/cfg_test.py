@@ -37,3 +37,94 @@ class CfgTestCase(base.JbutlerTestCase):
         with self.assertRaises(cfg.MissingRequiredOptionError) as cm:
             config.read(['noserver'])
             self.assertIn("'server'", str(cm.exception))
+
+    def test_performance_options(self):
+        contents = base.JBUTLER_RC + 'max_workers = 4\nread_timeout = 30\n'
+        rc = self.mkfile('jbutlerrc', contents=contents)
+        config = cfg.get_config([rc], requests_per_second='2.5')
+        self.assertEqual(4, config.max_workers)
+        self.assertEqual(30.0, config.read_timeout)
+        self.assertEqual(2.5, config.requests_per_second)
+        self.assertEqual(10.0, config.connect_timeout)
+        self.assertEqual(10, config.pool_size)
+
+    def test_invalid_values(self):
+        config = cfg.JbutlerConfigParser()
+        config.set('ssl_verify', False)
+        self.assertIs(False, config.ssl_verify)
+        with self.assertRaises(TypeError):
+            config.set('max_workers', 'many')
+        with self.assertRaises(ValueError):
+            config.set('max_workers', '0')
+        with self.assertRaises(ValueError):
+            config.set('read_timeout', -1.0)
+
+        contents = base.JBUTLER_RC + 'pool_size = lots\n'
+        rc = self.mkfile('jbutlerrc', contents=contents)
+        with self.assertRaises(TypeError):
+            config.read([rc])
+
+    def test_snapshot(self):
+        contents = base.JBUTLER_RC + 'ssl_verify = false\n'
+        rc = self.mkfile('jbutlerrc', contents=contents)
+        config = cfg.JbutlerConfigParser()
+        config.read([rc])
+        snapshot = config.snapshot()
+        self.assertEqual('http://jenkins.example.com', snapshot.server)
+        self.assertIs(False, snapshot.ssl_verify)
+        self.assertEqual('jobs', snapshot.jobdir)
+        with self.assertRaises(AttributeError):
+            snapshot.jobdir = 'other'
+
+        other = snapshot.replace(jobdir='other')
+        self.assertEqual('other', other.jobdir)
+        self.assertEqual('jobs', snapshot.jobdir)
+
+    def test_load_config_cache(self):
+        rc = self.mkfile('jbutlerrc', contents=base.JBUTLER_RC)
+        first = cfg.load_config([rc, 'missing'])
+        self.assertIs(first, cfg.load_config([rc, 'missing']))
+        self.assertEqual('jobs', first.jobdir)
+
+        with open(rc, 'a') as fh:
+            fh.write('jobdir = other\n')
+        second = cfg.load_config([rc, 'missing'])
+        self.assertIsNot(first, second)
+        self.assertEqual('other', second.jobdir)
+
+    def test_fleet(self):
+        rc = self.mkfile('jbutlerrc', contents=(
+            '[jbutler]\n'
+            'max_workers = 4\n'
+            '[server:east]\n'
+            'server = http://east.example.com\n'
+            'requests_per_second = 5\n'
+            '[server:west]\n'
+            'server = http://west.example.com\n'
+            'jobdir = west\n'))
+        config = cfg.get_config([rc])
+        self.assertEqual(['east', 'west'], config.masters())
+        self.assertIsNone(config.snapshot().server)
+
+        fleet = cfg.load_fleet([rc], requests_per_second='1')
+        self.assertEqual(['east', 'west'], [name for name, _ in fleet])
+        east, west = [c for _, c in fleet]
+        self.assertEqual('http://east.example.com', east.server)
+        self.assertEqual(4, west.max_workers)
+        self.assertEqual('west', west.jobdir)
+        self.assertEqual('jobs', east.jobdir)
+        # the command line overrides the master sections
+        self.assertEqual(1.0, east.requests_per_second)
+
+    def test_fleet_missing_server(self):
+        rc = self.mkfile('jbutlerrc', contents=(
+            '[server:east]\n'
+            'server = http://east.example.com\n'
+            '[server:west]\n'
+            'jobdir = west\n'))
+        with self.assertRaises(cfg.MissingRequiredOptionError):
+            cfg.get_config([rc])
+
+        rc = self.mkfile('badrc', contents=base.JBUTLER_RC + '[east]\n')
+        with self.assertRaises(cfg.InvalidSectionError):
+            cfg.get_config([rc])
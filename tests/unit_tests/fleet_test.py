@@ -0,0 +1,116 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import sys
+
+from click.testing import CliRunner
+
+from jbutler import errors
+from jbutler.commands.base import jbutler
+from jbutler.lib import cfg
+from jbutler.lib import fleet
+from jbutler.utils import concurrency
+from jbutler.utils import output
+
+from .. import base
+from ..perf.fake_jenkins import FakeJenkins
+
+
+class FleetTestCase(base.JbutlerTestCase):
+    """Test running commands against several masters"""
+
+    def fake(self, *names):
+        fake = FakeJenkins().start()
+        self.addCleanup(fake.stop)
+        for name in names:
+            fake.add_job(name)
+        return fake
+
+    def test_run_captures_output(self):
+        stdout = sys.stdout
+
+        def func(config):
+            self.assertIs(stdout, sys.stdout)
+            output.echo(u'start %s' % config.server)
+            for line in concurrency.imap(lambda n: u'%s %d' % (
+                    config.server, n), range(3), 3):
+                output.echo(line, err=True)
+            if config.server == 'east':
+                raise errors.CommandError(u'east is down')
+
+        runs = fleet.Fleet([
+            ('east', cfg.JbutlerConfig(server='east')),
+            ('west', cfg.JbutlerConfig(server='west')),
+        ]).run(func)
+        self.assertEqual(['east', 'west'], [run.name for run in runs])
+        self.assertEqual(u'start west\n', runs[1].out.getvalue())
+        self.assertEqual(u'west 0\nwest 1\nwest 2\n',
+                         runs[1].err.getvalue())
+        self.assertEqual(u'east is down', str(runs[0].error))
+        self.assertIsNone(runs[1].error)
+
+        with self.assertRaises(errors.CommandError):
+            fleet.report(runs)
+
+    def test_no_masters(self):
+        self.assertRaises(errors.CommandError, fleet.Fleet, [])
+
+    def test_fleet_command(self):
+        east = self.fake('foo', 'bar')
+        west = self.fake('foo')
+        east.add_build('foo', 'FAILURE')
+        west.add_build('foo', 'FAILURE')
+        self.mkfile('jbutlerrc', contents=(
+            '[jbutler]\n'
+            'max_workers = 2\n'
+            '[server:east]\n'
+            'server = %s\n'
+            '[server:west]\n'
+            'server = %s\n'
+            'requests_per_second = 50\n' % (east.url, west.url)))
+
+        result = CliRunner().invoke(jbutler, [
+            '--skip-default-config', '--config-file', 'jbutlerrc',
+            '--fleet', 'jobs', 'status', '--format', 'json', '--result',
+            'FAILURE'], standalone_mode=False)
+        self.assertIsNone(result.exception, result.output)
+        east_output, west_output = result.output.split(
+            u'== west (%s) ==\n' % west.url)
+        self.assertTrue(east_output.startswith(
+            u'== east (%s) ==\n' % east.url))
+        self.assertIn(u'"name": "foo"', east_output)
+        self.assertTrue(west_output.endswith(u'2 of 2 masters succeeded\n'))
+        self.assertIn(u'"name": "foo"', west_output)
+        self.assertEqual(1, sum(east.hits.values()))
+        self.assertEqual(1, sum(west.hits.values()))
+
+    def test_local_commands_refused(self):
+        self.mkfile('jbutlerrc', contents=(
+            '[server:east]\n'
+            'server = http://east.example.com\n'
+            '[server:west]\n'
+            'server = http://west.example.com\n'))
+        for args in (['jobs', 'retrieve'], ['views', 'retrieve']):
+            result = CliRunner().invoke(jbutler, [
+                '--skip-default-config', '--config-file', 'jbutlerrc',
+                '--fleet'] + args)
+            self.assertEqual(2, result.exit_code, result.output)
+            self.assertIn(u'--fleet cannot run "%s"' % ' '.join(args),
+                          result.output)
@@ -0,0 +1,113 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import json
+
+from six import StringIO
+
+from jbutler.jenkinsapi.requester import Requester
+from jbutler.utils import instrument
+from jbutler.utils import yaml_utils
+
+from .. import base
+from ..base import mock
+
+
+class InstrumentTestCase(base.JbutlerTestCase):
+    """Test request and span recording"""
+
+    def setUp(self):
+        super(InstrumentTestCase, self).setUp()
+        instrument.reset()
+        instrument.enable()
+        self.addCleanup(instrument.reset)
+        self.addCleanup(instrument.disable)
+
+    def test_url_template(self):
+        self.assertEqual(
+            '/job/{name}/{number}/api/python',
+            instrument.url_template(
+                'http://jenkins.example.com/job/foo/12/api/python?depth=1'))
+        self.assertEqual(
+            '/view/{name}/job/{name}/config.xml',
+            instrument.url_template(
+                'https://jenkins.example.com/view/all/job/bar/config.xml'))
+        self.assertEqual('/', instrument.url_template('http://jenkins/'))
+
+    def test_disabled(self):
+        instrument.disable()
+        with instrument.span('nothing'):
+            pass
+        instrument.record_request('GET', 'http://jenkins/', 200, 0, 0, 1)
+        self.assertEqual([], instrument.events())
+
+    def test_requester(self):
+        requester = Requester('user', 'pass')
+        requester.session = mock.MagicMock()
+        response = requester.session.request.return_value
+        response.status_code = 200
+        response.content = b'<project/>'
+        requester.get_url('http://jenkins.example.com/job/foo/config.xml')
+
+        event, = instrument.events()
+        self.assertEqual('http', event.kind)
+        self.assertEqual('GET /job/{name}/config.xml', event.name)
+        self.assertEqual(200, event.status)
+        self.assertEqual(10, event.bytes)
+
+    def test_spans(self):
+        self.assertEqual({'a': 1}, yaml_utils.load('a: 1\n'))
+        self.assertEqual([1, 2], list(yaml_utils.load_all('--- 1\n--- 2\n')))
+        names = [e.name for e in instrument.events()]
+        self.assertEqual(['yaml.load'] * 3, names)
+
+    def test_summary(self):
+        for i in range(1, 101):
+            instrument.record_request('GET', 'http://jenkins/job/j%d/' % i,
+                                      200, 10, 0, i / 1000)
+        instrument.record_span('xml.parse', 0, 0.5)
+
+        requests, parse = instrument.summary()
+        self.assertEqual('GET /job/{name}', requests.name)
+        self.assertEqual(100, requests.count)
+        self.assertEqual(0.05, requests.p50)
+        self.assertEqual(0.095, requests.p95)
+        self.assertEqual(0.099, requests.p99)
+        self.assertEqual(1000, requests.bytes)
+        self.assertEqual('xml.parse', parse.name)
+        self.assertIsNone(parse.bytes)
+
+        table = instrument.format_summary([requests, parse]).splitlines()
+        self.assertEqual(3, len(table))
+        self.assertTrue(table[0].startswith('ENDPOINT'))
+        self.assertIn('GET /job/{name}', table[1])
+
+    def test_write_trace(self):
+        instrument.record_request('POST', 'http://jenkins/job/foo/build',
+                                  201, 0, 10.0, 0.25)
+        instrument.record_span('xml.parse', 10.5, 0.001)
+        fh = StringIO()
+        instrument.write_trace(fh)
+        trace = json.loads(fh.getvalue())['traceEvents']
+        self.assertEqual(['POST /job/{name}/build', 'xml.parse'],
+                         [e['name'] for e in trace])
+        self.assertEqual([0, 500000], [e['ts'] for e in trace])
+        self.assertEqual([250000, 1000], [e['dur'] for e in trace])
+        self.assertEqual('X', trace[0]['ph'])
+        self.assertEqual({'status': 201, 'bytes': 0}, trace[0]['args'])
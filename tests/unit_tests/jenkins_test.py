@@ -0,0 +1,253 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import copy
+import os
+
+from jenkinsapi.jenkinsbase import JenkinsBase
+from requests import HTTPError
+
+from jbutler.jenkinsapi import jenkins
+from jbutler.jenkinsapi.job import Job
+from jbutler.lib import jobs
+
+from .. import base
+from ..base import mock
+
+URL = 'http://jenkins.example.com'
+
+
+def job(name, url):
+    return {'name': name, 'url': url, 'color': 'blue'}
+
+
+def folder(name, url, children=None):
+    info = {'name': name, 'url': url}
+    if children is not None:
+        info['jobs'] = children
+    return info
+
+
+class FolderJobsTestCase(base.JbutlerTestCase):
+    """Test listing jobs in folders"""
+
+    def setUp(self):
+        super(FolderJobsTestCase, self).setUp()
+        self.server = jenkins.Jenkins(URL, requester=mock.MagicMock(),
+                                      lazy=True)
+        self.listings = {
+            URL + '/api/python': [
+                job('top', URL + '/job/top/'),
+                folder('apps', URL + '/job/apps/', [
+                    job('web', URL + '/job/apps/job/web/'),
+                    folder('libs', URL + '/job/apps/job/libs/'),
+                ]),
+            ],
+            URL + '/job/apps/job/libs/api/python': [
+                job('core', URL + '/job/apps/job/libs/job/core/'),
+            ],
+        }
+
+        get_data_patcher = mock.patch.object(self.server, 'get_data')
+        self.get_data = get_data_patcher.start()
+        self.addCleanup(get_data_patcher.stop)
+        self.get_data.side_effect = (
+            lambda url, tree: {'jobs': self.listings.get(url, [])})
+
+    def test_jobs_tree(self):
+        self.assertEqual('jobs[name,url,color]', jenkins._jobs_tree(0))
+        self.assertEqual('jobs[name,url,color,jobs[name,url,color]]',
+                         jenkins._jobs_tree(1))
+
+    def test_get_jobs_info(self):
+        infos = list(self.server.get_jobs_info(folder_depth=1, workers=2))
+        self.assertEqual([
+            (URL + '/job/top/', 'top'),
+            (URL + '/job/apps/job/web/', 'apps/web'),
+            (URL + '/job/apps/job/libs/job/core/', 'apps/libs/core'),
+        ], infos)
+        self.assertEqual([
+            mock.call(URL + '/api/python', tree=jenkins._jobs_tree(1)),
+            mock.call(URL + '/job/apps/job/libs/api/python',
+                      tree=jenkins._jobs_tree(1)),
+        ], self.get_data.call_args_list)
+
+    def test_get_jobs_info_paged(self):
+        top = [job('job%d' % i, URL + '/job/job%d/' % i) for i in range(5)]
+
+        def get_data(url, tree):
+            start, end = tree.rsplit('{', 1)[1].rstrip('}').split(',')
+            return {'jobs': top[int(start):int(end)]}
+        self.get_data.side_effect = get_data
+
+        infos = list(self.server.get_jobs_info(page_size=2))
+        self.assertEqual(['job%d' % i for i in range(5)],
+                         [name for _, name in infos])
+        self.assertEqual(
+            [mock.call(URL + '/api/python',
+                       tree='jobs[name,url,color]{%d,%d}' % (i, i + 2))
+             for i in (0, 2, 4)],
+            self.get_data.call_args_list)
+
+    def test_get_jobs_status(self):
+        last = {'number': 3, 'result': 'FAILURE', 'building': False,
+                'duration': 1500, 'timestamp': 0}
+        self.listings[URL + '/api/python'] = [
+            dict(job('top', URL + '/job/top/'), lastBuild=last),
+            folder('apps', URL + '/job/apps/', [
+                dict(job('web', URL + '/job/apps/job/web/'), lastBuild=None),
+            ]),
+        ]
+        status = dict(self.server.get_jobs_status(folder_depth=1))
+        self.assertEqual(['apps/web', 'top'], sorted(status))
+        self.assertEqual(last, status['top']['lastBuild'])
+        self.get_data.assert_called_once_with(
+            URL + '/api/python',
+            tree=jenkins._jobs_tree(1, jenkins.STATUS_FIELDS))
+
+    def test_job_url(self):
+        self.assertEqual(URL + '/job/apps/job/my%20libs/job/core',
+                         self.server.job_url('apps/my libs/core'))
+
+    def test_folder_job(self):
+        with mock.patch.object(jenkins, 'Job') as Job:
+            self.assertEqual(Job.return_value,
+                             self.server.get_job('apps/web'))
+        Job.assert_called_once_with(URL + '/job/apps/job/web', 'apps/web',
+                                    self.server)
+
+        self.assertTrue(self.server.has_job('apps/web'))
+        response = mock.MagicMock(status_code=404)
+        self.get_data.side_effect = HTTPError(response=response)
+        self.assertFalse(self.server.has_job('apps/missing'))
+
+    def test_job_file_path(self):
+        self.assertEqual(os.path.join('jobs', 'apps', 'libs', 'core.xml'),
+                         jobs.jobFilePath('jobs', 'apps/libs/core'))
+        self.assertEqual(os.path.join('jobs', 'top.xml'),
+                         jobs.jobFilePath('jobs', 'top'))
+
+
+class JsonDataTestCase(base.JbutlerTestCase):
+    """Test that jbutler's own api objects fetch json"""
+
+    def setUp(self):
+        super(JsonDataTestCase, self).setUp()
+        self.listings = {
+            URL + '/api/json': {'jobs': [
+                job('top', URL + '/job/top/'),
+                folder('apps', URL + '/job/apps/', [
+                    job('web', URL + '/job/apps/job/web/'),
+                ]),
+            ]},
+            URL + '/job/apps/api/json': {'jobs': [
+                job('web', URL + '/job/apps/job/web/'),
+            ]},
+        }
+        self.requester = mock.MagicMock()
+        self.requester.get_url.side_effect = self.get_url
+        self.server = jenkins.Jenkins(URL, requester=self.requester,
+                                      lazy=True)
+
+    def get_url(self, url, params=None):
+        response = mock.MagicMock(status_code=200)
+        response.json.return_value = copy.deepcopy(self.listings[url])
+        return response
+
+    def test_get_data(self):
+        self.assertEqual(self.listings[URL + '/api/json'],
+                         self.server.get_data(URL + '/api/python',
+                                              tree='jobs[name]'))
+        self.requester.get_url.assert_called_once_with(
+            URL + '/api/json', {'tree': 'jobs[name]'})
+
+        # jenkinsapi's own objects are left alone
+        self.assertEqual('jenkinsapi.jenkinsbase',
+                         JenkinsBase.get_data.__module__)
+
+    def test_list_jobs_one_request(self):
+        # poll() would replace the folder by its jobs, with bare names
+        self.assertIn('web', [info['name'] for info in
+                              self.server.poll(tree='jobs[name,url,color]')
+                              ['jobs']])
+        self.requester.get_url.reset_mock()
+
+        infos = list(self.server.get_jobs_info(folder_depth=1))
+        self.assertEqual([(URL + '/job/top/', 'top'),
+                          (URL + '/job/apps/job/web/', 'apps/web')], infos)
+        self.requester.get_url.assert_called_once_with(
+            URL + '/api/json', {'tree': jenkins._jobs_tree(1)})
+
+    def test_jobs_status_folders(self):
+        last = {'number': 4, 'result': 'SUCCESS', 'building': False,
+                'duration': 1000, 'timestamp': 0}
+        self.listings[URL + '/api/json'] = {'jobs': [
+            dict(job('top', URL + '/job/top/'), lastBuild=None),
+            folder('apps', URL + '/job/apps/', [
+                dict(job('web', URL + '/job/apps/job/web/'), lastBuild=last),
+            ]),
+        ]}
+        rows = jobs.jobStatus(self.server, folder_depth=1)
+        self.assertEqual([
+            dict(name='apps/web', color='blue', number=4, result='SUCCESS',
+                 duration=1000, timestamp=0),
+            dict(name='top', color='blue', number=None, result='NOT_BUILT',
+                 duration=None, timestamp=None),
+        ], rows)
+        self.requester.get_url.assert_called_once_with(
+            URL + '/api/json',
+            {'tree': jenkins._jobs_tree(1, jenkins.STATUS_FIELDS)})
+
+    def test_top_level_job(self):
+        with mock.patch.object(Job, 'poll'):
+            top = self.server.get_job('top')
+        self.assertIsInstance(top, Job)
+        self.assertEqual(URL + '/job/top', top.baseurl)
+        self.assertRaises(jenkins.UnknownJob, self.server.get_job, 'missing')
+
+
+class FolderWriteTestCase(base.JbutlerTestCase):
+    """Test changing jobs in folders"""
+
+    def setUp(self):
+        super(FolderWriteTestCase, self).setUp()
+        self.requester = mock.MagicMock()
+        self.server = jenkins.Jenkins(URL, requester=self.requester,
+                                      lazy=True)
+        for name in ('has_job', 'get_job', 'poll'):
+            patcher = mock.patch.object(self.server, name)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_create_job(self):
+        self.server.create_job('apps/my libs/core', '<project/>')
+        self.requester.post_xml_and_confirm_status.assert_called_once_with(
+            URL + '/job/apps/job/my%20libs/createItem', data='<project/>',
+            params={'name': 'core'})
+        self.server.get_job.assert_called_once_with('apps/my libs/core')
+
+    def test_update_job(self):
+        self.server.update_job('apps/web', '<project/>')
+        self.requester.post_xml_and_confirm_status.assert_called_once_with(
+            URL + '/job/apps/job/web/config.xml', data='<project/>')
+
+    def test_delete_job(self):
+        self.server.delete_job('apps/web')
+        self.requester.post_and_confirm_status.assert_called_once_with(
+            URL + '/job/apps/job/web/doDelete', data='')
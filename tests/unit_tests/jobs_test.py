@@ -17,7 +17,7 @@
 from __future__ import absolute_import
 from __future__ import division
 from __future__ import print_function
-from threading import Thread
+import io
 import os
 
 from jbutler.jenkinsapi import jenkins
@@ -41,9 +41,9 @@ class DeleteJobsTestCase(base.JbutlerTestCase):
         self.addCleanup(Jenkins_patcher.stop)
         self.Jenkins = Jenkins_patcher.start()
 
-        click_patcher = mock.patch('jbutler.lib.jobs.click')
-        self.addCleanup(click_patcher.stop)
-        self.click = click_patcher.start()
+        echo_patcher = mock.patch('jbutler.lib.jobs.echo')
+        self.addCleanup(echo_patcher.stop)
+        self.echo = echo_patcher.start()
 
     def test_delete_jobs(self):
         self.Jenkins.return_value.has_job.return_value = True
@@ -82,8 +82,8 @@ class DeleteJobsTestCase(base.JbutlerTestCase):
         self.assertEqual([mock.call('foo'), mock.call('bar')],
                          self.Jenkins.return_value.has_job.call_args_list)
         self.Jenkins.return_value.delete_job.assert_called_once_with('foo')
-        self.click.echo.assert_called_once_with('warning: no such job: '
-                                                "'bar'", err=True)
+        self.echo.assert_called_once_with("warning: no such job: 'bar'",
+                                          err=True)
 
 
 class UpdateJobsTests(base.JbutlerTestCase):
@@ -97,9 +97,9 @@ class UpdateJobsTests(base.JbutlerTestCase):
         self.Jenkins = Jenkins_patcher.start()
         self.Jenkins.return_value = mock.MagicMock(spec=jenkins.Jenkins)
 
-        click_patcher = mock.patch('jbutler.lib.jobs.click')
-        self.addCleanup(click_patcher.stop)
-        self.click = click_patcher.start()
+        echo_patcher = mock.patch('jbutler.lib.jobs.echo')
+        self.addCleanup(echo_patcher.stop)
+        self.echo = echo_patcher.start()
 
     def test_update_job(self):
         _foo = mock.MagicMock(spec=jenkinsapi.job.Job)
@@ -124,7 +124,7 @@ class UpdateJobsTests(base.JbutlerTestCase):
         self.assertListEqual([mock.call('foo')],
                              self.Jenkins.return_value.has_job.call_args_list)
         _foo.update_config.assert_called_once_with('A foo job')
-        self.assertListEqual([], self.click.echo.call_args_list)
+        self.assertListEqual([], self.echo.call_args_list)
 
     def test_update_job_multiple(self):
         _foo = mock.MagicMock(spec=jenkinsapi.job.Job)
@@ -157,7 +157,7 @@ class UpdateJobsTests(base.JbutlerTestCase):
                              self.Jenkins.return_value.has_job.call_args_list)
         _foo.update_config.assert_called_once_with('A foo job')
         _bar.update_config.assert_called_once_with('A bar job')
-        self.assertListEqual([], self.click.echo.call_args_list)
+        self.assertListEqual([], self.echo.call_args_list)
 
     def test_update_job_missing_job(self):
         _foo = mock.MagicMock(spec=jenkinsapi.job.Job)
@@ -186,8 +186,270 @@ class UpdateJobsTests(base.JbutlerTestCase):
             [mock.call('foo'), mock.call('bar')],
             self.Jenkins.return_value.has_job.call_args_list)
         _foo.update_config.assert_called_once_with('A foo job')
-        self.click.echo.assert_called_once_with("warning: no such job: 'bar'",
-                                                err=True)
+        self.echo.assert_called_once_with("warning: no such job: 'bar'",
+                                          err=True)
+
+
+TRIGGER_JOB = """\
+<?xml version='1.0' encoding='UTF-8'?>
+<project>
+  <triggers>
+    <jenkins.triggers.ReverseBuildTrigger>
+      <upstreamProjects>%s</upstreamProjects>
+    </jenkins.triggers.ReverseBuildTrigger>
+  </triggers>
+  <builders>
+    <hudson.plugins.copyartifact.CopyArtifact>
+      <project>%s</project>
+    </hudson.plugins.copyartifact.CopyArtifact>
+  </builders>
+  <publishers>
+    <hudson.tasks.BuildTrigger>
+      <childProjects>%s</childProjects>
+    </hudson.tasks.BuildTrigger>
+  </publishers>
+</project>
+"""
+
+
+class CreateJobsTests(base.JbutlerTestCase):
+    """Tests for dependency ordered job creation"""
+
+    def setUp(self):
+        super(CreateJobsTests, self).setUp()
+        echo_patcher = mock.patch('jbutler.lib.jobs.echo')
+        self.echo = echo_patcher.start()
+        self.addCleanup(echo_patcher.stop)
+
+    def job_file(self, name, upstream='', copy_from='', children=''):
+        fh = io.StringIO(TRIGGER_JOB % (upstream, copy_from, children))
+        fh.name = os.path.join('jobs', name + '.xml')
+        return fh
+
+    def test_job_dependencies(self):
+        config = TRIGGER_JOB % ('a, b', 'c', 'd,e')
+        self.assertEqual(set('abcde'), jobs.jobDependencies(config))
+        self.assertEqual(set(), jobs.jobDependencies('<project/>'))
+
+    def test_dependency_waves(self):
+        waves = jobs.dependencyWaves([
+            ('app', set(['lib', 'missing'])),
+            ('lib', set(['base'])),
+            ('tools', set()),
+            ('base', set(['base'])),
+        ])
+        self.assertEqual([['tools', 'base'], ['lib'], ['app']], waves)
+
+    def test_dependency_cycle(self):
+        waves = jobs.dependencyWaves([
+            ('a', set(['b'])), ('b', set(['a'])), ('c', set())])
+        self.assertEqual([['c'], ['a', 'b']], waves)
+        self.echo.assert_called_once_with(
+            'warning: dependency cycle between jobs: a, b', err=True)
+
+    def test_create_jobs(self):
+        server = mock.MagicMock(spec=jenkins.Jenkins)
+        server.has_job.return_value = False
+        server.create_job.side_effect = lambda name, config: name
+
+        created = jobs.createJobs(server, [
+            self.job_file('deploy', upstream='build'),
+            self.job_file('build', children='test', copy_from='tools'),
+            self.job_file('test'),
+            self.job_file('tools'),
+        ], workers=2)
+        self.assertEqual(['test', 'tools', 'build', 'deploy'], created)
+
+
+PIPELINE_JOB = """\
+<?xml version='1.0' encoding='UTF-8'?>
+<flow-definition plugin="workflow-job@2.0">
+  <disabled>%s</disabled>
+</flow-definition>
+"""
+
+
+class ToggleJobsTests(base.JbutlerTestCase):
+    """Tests for jobs enable and disable"""
+
+    def setUp(self):
+        super(ToggleJobsTests, self).setUp()
+        self.mkdirs('jobs')
+        self.job_files = [
+            self.mkfile('jobs/foo.xml', PIPELINE_JOB % 'false'),
+            self.mkfile('jobs/bar.xml', PIPELINE_JOB % 'true'),
+            self.mkfile('jobs/baz.xml', '<project/>'),
+        ]
+
+        echo_patcher = mock.patch('jbutler.lib.jobs.echo')
+        self.echo = echo_patcher.start()
+        self.addCleanup(echo_patcher.stop)
+
+    def test_disable_jobs(self):
+        server = mock.MagicMock(spec=jenkins.Jenkins)
+        server.has_job.side_effect = lambda name: name != 'baz'
+        job_objs = {'foo': mock.MagicMock(), 'bar': mock.MagicMock()}
+        job_objs['foo'].is_enabled.return_value = True
+        job_objs['bar'].is_enabled.return_value = False
+        server.get_job.side_effect = job_objs.get
+
+        disabled = jobs.disableJobs(server, self.job_files, workers=2)
+        self.assertEqual(self.job_files[:1], disabled)
+        job_objs['foo'].disable.assert_called_once_with()
+        job_objs['bar'].disable.assert_not_called()
+        self.echo.assert_called_once_with(
+            "warning: no such job: 'baz'", err=True)
+
+    def test_set_local_disabled(self):
+        foo, bar, baz = self.job_files
+        os.utime(bar, (0, 0))
+
+        changed = jobs.setLocalDisabled(self.job_files, True, workers=2,
+                                        preserve_formatting=True)
+        self.assertEqual([foo], changed)
+        for path in (foo, bar):
+            with open(path) as fh:
+                self.assertEqual(PIPELINE_JOB % 'true', fh.read())
+        self.assertEqual(0, os.stat(bar).st_mtime)
+        self.echo.assert_called_once_with(
+            "Warning: job config does not have a 'disabled' property: "
+            "'%s'" % baz, err=True)
+
+        self.assertEqual([foo, bar],
+                         jobs.setLocalDisabled(self.job_files, False))
+        self.assertEqual([], [f for f in os.listdir(self.work_dir + '/jobs')
+                              if f.startswith('.')])
+
+
+class JobStatusTests(base.JbutlerTestCase):
+    """Tests for the last build status of jobs"""
+
+    def setUp(self):
+        super(JobStatusTests, self).setUp()
+        echo_patcher = mock.patch('jbutler.lib.jobs.echo')
+        self.echo = echo_patcher.start()
+        self.addCleanup(echo_patcher.stop)
+
+        def build(number, result, building=False):
+            return {'number': number, 'result': result, 'building': building,
+                    'duration': 61500, 'timestamp': 1500000000000}
+
+        self.server = mock.MagicMock(spec=jenkins.Jenkins)
+        self.server.get_jobs_status.side_effect = lambda *args: iter([
+            ('foo', {'color': 'red', 'lastBuild': build(7, 'FAILURE')}),
+            ('bar', {'color': 'blue_anime',
+                     'lastBuild': build(2, None, True)}),
+            ('apps/web', {'color': 'notbuilt', 'lastBuild': None}),
+        ])
+
+    def test_job_status(self):
+        rows = jobs.jobStatus(self.server, folder_depth=2, workers=4)
+        self.server.get_jobs_status.assert_called_once_with(2, 4, 0)
+        self.assertEqual(['apps/web', 'bar', 'foo'],
+                         [row['name'] for row in rows])
+        self.assertEqual(['NOT_BUILT', 'BUILDING', 'FAILURE'],
+                         [row['result'] for row in rows])
+        self.assertEqual(dict(name='foo', color='red', number=7,
+                              result='FAILURE', duration=61500,
+                              timestamp=1500000000000), rows[2])
+
+    def test_job_status_filters(self):
+        rows = jobs.jobStatus(self.server, ['foo', 'bar', 'spam'],
+                              results=['failure', 'not_built'])
+        self.assertEqual(['foo'], [row['name'] for row in rows])
+        self.echo.assert_called_once_with(
+            "warning: no such job: 'spam'", err=True)
+
+        rows = jobs.jobStatus(self.server, jobFilter='apps/')
+        self.assertEqual(['apps/web'], [row['name'] for row in rows])
+
+    def test_format_status(self):
+        rows = jobs.jobStatus(self.server)
+        self.assertEqual(
+            'NAME      BUILD  RESULT     DURATION  STARTED\n'
+            'apps/web  -      NOT_BUILT  -         -\n'
+            'bar       #2     BUILDING   -         2017-07-14 02:40:00\n'
+            'foo       #7     FAILURE    61.5s     2017-07-14 02:40:00',
+            jobs.formatStatus(rows))
+
+
+class PushChangedJobsTests(base.JbutlerTestCase):
+    """Tests for pushing the jobs changed under the watch command"""
+
+    def setUp(self):
+        super(PushChangedJobsTests, self).setUp()
+        self.job_dir = self.mkdirs('jobs/apps')
+        self.job_dir = os.path.dirname(self.job_dir)
+        self.foo = self.mkfile('jobs/foo.xml', '<project/>')
+        self.web = self.mkfile('jobs/apps/web.xml', '<project/>')
+
+        echo_patcher = mock.patch('jbutler.lib.jobs.echo')
+        self.echo = echo_patcher.start()
+        self.addCleanup(echo_patcher.stop)
+
+    def test_job_name_from_path(self):
+        self.assertEqual('apps/web',
+                         jobs.jobNameFromPath(self.job_dir, self.web))
+        self.assertEqual(self.web,
+                         jobs.jobFilePath(self.job_dir, 'apps/web'))
+        self.assertEqual('web', jobs.jobNameFromPath(None, self.web))
+        self.assertEqual('web', jobs.jobNameFromPath(
+            os.path.join(self.job_dir, 'apps', 'other'), self.web))
+
+    def test_folder_job_names(self):
+        server = mock.MagicMock(spec=jenkins.Jenkins)
+        server.has_job.return_value = True
+        job = server.get_job.return_value
+        job.is_enabled.return_value = True
+
+        with open(self.web) as fh:
+            jobs.updateJobs(server, [fh], jobDir=self.job_dir)
+        server.get_job.assert_called_once_with('apps/web')
+        jobs.disableJobs(server, [self.web], jobDir=self.job_dir)
+        server.has_job.assert_called_with('apps/web')
+        job.disable.assert_called_once_with()
+        self.assertEqual(['apps/web'], jobs.deleteJobs(
+            server, [self.web], jobDir=self.job_dir))
+        server.delete_job.assert_called_once_with('apps/web')
+
+        server.has_job.return_value = False
+        with open(self.web) as fh:
+            jobs.createJobs(server, [fh], jobDir=self.job_dir)
+        server.create_job.assert_called_once_with('apps/web', '<project/>')
+
+    def test_push_changed_jobs(self):
+        server = mock.MagicMock(spec=jenkins.Jenkins)
+        server.has_job.side_effect = lambda name: name != 'spam'
+        job_objs = {'foo': mock.MagicMock(), 'apps/web': mock.MagicMock()}
+        server.get_job.side_effect = job_objs.get
+        spam = self.mkfile('jobs/spam.xml', '<project/>')
+        gone = os.path.join(self.job_dir, 'gone.xml')
+
+        digests = jobs.jobDigests([self.foo, self.web, spam, gone])
+        self.assertEqual(set([self.foo, self.web, spam]), set(digests))
+
+        # saved without changes
+        self.assertEqual([], jobs.pushChangedJobs(
+            server, self.job_dir, [self.foo, self.web], digests))
+        server.has_job.assert_not_called()
+
+        with open(self.web, 'w') as fh:
+            fh.write('<project><description/></project>')
+        with open(spam, 'w') as fh:
+            fh.write('<matrix-project/>')
+        pushed = jobs.pushChangedJobs(server, self.job_dir,
+                                      [self.foo, self.web, spam, gone],
+                                      digests, workers=2)
+        self.assertEqual(['apps/web'], pushed)
+        job_objs['apps/web'].update_config.assert_called_once_with(
+            '<project><description/></project>')
+        job_objs['foo'].update_config.assert_not_called()
+        self.echo.assert_called_once_with(
+            "warning: no such job: 'spam'", err=True)
+
+        # only pushed once
+        self.assertEqual([], jobs.pushChangedJobs(
+            server, self.job_dir, [self.web], digests))
 
 
 class BuildJobsTests(base.JbutlerTestCase):
@@ -199,18 +461,24 @@ class BuildJobsTests(base.JbutlerTestCase):
         self.addCleanup(Jenkins_patcher.stop)
         self.Jenkins.return_value = mock.MagicMock(spec=jenkins.Jenkins)
 
-        click_patcher = mock.patch('jbutler.lib.jobs.click')
-        self.click = click_patcher.start()
-        self.addCleanup(click_patcher.stop)
-
-        threading_patcher = mock.patch('jbutler.lib.jobs.threading')
-        self.threading = threading_patcher.start()
-        self.addCleanup(threading_patcher.stop)
-        self.threading.Thread = mock.MagicMock(spec=Thread)
+        echo_patcher = mock.patch('jbutler.lib.jobs.echo')
+        self.echo = echo_patcher.start()
+        self.addCleanup(echo_patcher.stop)
 
     def test_build_missing_job(self):
         self.Jenkins.return_value.has_job.return_value = False
-        self.threading.active_count.return_value = 0
 
-        jobs.buildJobs(self.Jenkins(), ['foo'])
-        self.assertEqual(self.threading.Thread.call_args_list, [])
+        self.assertEqual([], jobs.buildJobs(self.Jenkins(), ['foo']))
+        self.assertFalse(self.Jenkins.return_value.get_job.called)
+        self.echo.assert_called_once_with(
+            u"warning: no such job: 'foo'", err=True)
+
+    def test_build_without_parameters(self):
+        job = self.Jenkins.return_value.get_job.return_value
+        job.has_params.return_value = False
+
+        self.assertEqual([], jobs.buildJobs(self.Jenkins(), ['foo.xml'],
+                                            paramSets=[{'OS': 'linux'}]))
+        self.assertFalse(job.invoke.called)
+        self.echo.assert_called_once_with(
+            u"warning: job 'foo' does not take parameters", err=True)
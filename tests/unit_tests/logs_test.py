@@ -0,0 +1,188 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import gzip
+import json
+import os
+import time
+
+from jbutler import errors
+from jbutler.lib import cfg
+from jbutler.lib import jobs
+from jbutler.lib import logs
+from jbutler.utils import jenkins_utils
+
+from .. import base
+from ..base import mock
+from ..perf.fake_jenkins import FakeJenkins
+
+PROGRESSIVE_TEXT = ('GET', '/job/{name}/{number}/logText/progressiveText')
+
+
+def log_text(name, number):
+    return ('Started by user fake\nBuilding %s #%d\nFinished: SUCCESS\n' %
+            (name, number))
+
+
+class ParseTestCase(base.JbutlerTestCase):
+    """Test build ranges and log paths"""
+
+    def test_parse_build_ranges(self):
+        self.assertEqual([(1, 5), (9, 9), (20, None), (1, 3)],
+                         logs.parseBuildRanges('1-5, 9,20-,-3'))
+        for spec in ('', 'a', '1-2-3', '-'):
+            self.assertRaises(errors.CommandError,
+                              logs.parseBuildRanges, spec)
+
+    def test_log_file_path(self):
+        self.assertEqual(os.path.join('logs', 'apps', 'web', '12.log.gz'),
+                         logs.logFilePath('logs', 'apps/web', 12, True))
+        self.assertEqual(os.path.join('logs', 'foo', '3.log'),
+                         logs.logFilePath('logs', 'foo', 3))
+
+
+class ArchiveLogsTestCase(base.JbutlerTestCase):
+    """Test archiving console logs from a server"""
+
+    def fake(self, **kwargs):
+        fake = FakeJenkins(**kwargs).start()
+        self.addCleanup(fake.stop)
+        for name in ('foo', 'bar'):
+            fake.add_job(name)
+        return fake
+
+    def archive(self, fake, names=('foo', 'bar'), **kwargs):
+        config = cfg.JbutlerConfigParser()
+        config.set('server', fake.url)
+        server = jenkins_utils.server_factory(config.snapshot())
+        found = jobs.retrieveJobs(server, list(names))
+        return logs.archiveLogs(found, self.log_dir, **kwargs)
+
+    def read(self, name, number, compress=False):
+        path = logs.logFilePath(self.log_dir, name, number, compress)
+        with (gzip.open if compress else open)(path, 'rb') as fh:
+            return fh.read().decode('utf-8')
+
+    def setUp(self):
+        super(ArchiveLogsTestCase, self).setUp()
+        self.log_dir = os.path.join(self.work_dir, 'logs')
+
+    def test_archive(self):
+        fake = self.fake()
+        for name in ('foo', 'foo', 'foo', 'bar'):
+            fake.add_build(name)
+
+        archived = self.archive(fake, ranges=[(2, None)], workers=4)
+        self.assertEqual([('foo', 2), ('foo', 3)],
+                         sorted((n, b) for n, b, _ in archived))
+        self.assertEqual(log_text('foo', 3), self.read('foo', 3))
+        self.assertFalse(os.path.exists(
+            logs.logFilePath(self.log_dir, 'foo', 1)))
+
+        # completed logs are not downloaded again
+        fake.hits.clear()
+        archived = self.archive(fake, workers=4)
+        self.assertEqual([('bar', 1), ('foo', 1)],
+                         sorted((n, b) for n, b, _ in archived))
+        self.assertEqual(2, fake.hits[PROGRESSIVE_TEXT])
+
+    def test_resume_running_build(self):
+        for compress in (False, True):
+            fake = self.fake(build_duration=0.5)
+            fake.add_build('foo')
+            self.log_dir = os.path.join(self.work_dir, 'logs-%s' % compress)
+            path = logs.logFilePath(self.log_dir, 'foo', 1, compress)
+
+            self.assertEqual([], self.archive(fake, ['foo'],
+                                              compress=compress))
+            self.assertFalse(os.path.exists(path))
+            with open(path + logs.OFFSET_EXT) as fh:
+                state = json.load(fh)
+            self.assertEqual(len(log_text('foo', 1)) - 18, state['offset'])
+
+            time.sleep(0.5)
+            self.assertEqual([('foo', 1, path)],
+                             self.archive(fake, ['foo'], compress=compress))
+            self.assertEqual(log_text('foo', 1), self.read('foo', 1, compress))
+            self.assertEqual(['1.log' + ('.gz' if compress else '')],
+                             os.listdir(os.path.dirname(path)))
+
+    def test_resume_interrupted_download(self):
+        fake = self.fake()
+        fake.add_build('foo')
+        path = logs.logFilePath(self.log_dir, 'foo', 1)
+        os.makedirs(os.path.dirname(path))
+        # the first line made it, and part of the second
+        with open(path + logs.PART_EXT, 'w') as fh:
+            fh.write('Started by user fake\nBuil')
+        with open(path + logs.OFFSET_EXT, 'w') as fh:
+            json.dump(dict(offset=21, size=21), fh)
+
+        self.assertEqual([('foo', 1, path)], self.archive(fake, ['foo']))
+        self.assertEqual(log_text('foo', 1), self.read('foo', 1))
+
+
+class DownloadLogTestCase(base.JbutlerTestCase):
+    """Test resuming a download that was interrupted mid-stream"""
+
+    URL = 'http://jenkins.example.com/job/foo/1/' + logs.PROGRESSIVE_TEXT
+
+    def response(self, chunks, text_size, more=False, interrupt=False):
+        def iter_content(size):
+            for chunk in chunks:
+                yield chunk
+            if interrupt:
+                raise KeyboardInterrupt
+
+        response = mock.MagicMock()
+        response.headers = {'X-Text-Size': str(text_size)}
+        if more:
+            response.headers['X-More-Data'] = 'true'
+        response.iter_content.side_effect = iter_content
+        return response
+
+    def test_resume_after_interrupt(self):
+        text = log_text('foo', 1).encode('utf-8')
+        for compress in (False, True):
+            path = logs.logFilePath(os.path.join(self.work_dir, 'logs'),
+                                    'foo', 1, compress)
+            requester = mock.MagicMock()
+            requester.get_stream.return_value = self.response(
+                [text[:21]], 21, more=True)
+            self.assertFalse(logs.downloadLog(requester, self.URL, path,
+                                              compress))
+
+            # only the offset of complete responses is saved
+            requester.get_stream.return_value = self.response(
+                [text[21:30]], len(text), interrupt=True)
+            with self.assertRaises(KeyboardInterrupt):
+                logs.downloadLog(requester, self.URL, path, compress)
+            self.assertFalse(os.path.exists(path))
+            with open(path + logs.OFFSET_EXT) as fh:
+                self.assertEqual(21, json.load(fh)['offset'])
+
+            requester.get_stream.return_value = self.response(
+                [text[21:]], len(text))
+            self.assertTrue(logs.downloadLog(requester, self.URL, path,
+                                             compress))
+            requester.get_stream.assert_called_with(
+                self.URL, params={'start': 21})
+            with (gzip.open if compress else open)(path, 'rb') as fh:
+                self.assertEqual(text, fh.read())
+            self.assertFalse(os.path.exists(path + logs.OFFSET_EXT))
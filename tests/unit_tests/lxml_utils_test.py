@@ -0,0 +1,103 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import os
+import threading
+
+from jbutler.utils import lxml_utils
+
+from .. import base
+from ..base import mock
+
+JOB = (b"<?xml version='1.0' encoding='UTF-8'?>\n"
+       b"<project>\n"
+       b"  <description>caf\xc3\xa9</description>\n"
+       b"<disabled>false</disabled>\n"
+       b"</project>\n")
+
+
+class LxmlUtilsTestCase(base.JbutlerTestCase):
+    """Test reading and writing xml files"""
+
+    def setUp(self):
+        super(LxmlUtilsTestCase, self).setUp()
+        self.path = os.path.join(self.work_dir, 'job.xml')
+        with open(self.path, 'wb') as fh:
+            fh.write(JOB)
+
+    def test_parse_file(self):
+        for use_mmap in (False, True):
+            doc = lxml_utils.parse_file(self.path, use_mmap)
+            description = doc.xpath('/project/description')[0]
+            self.assertEqual(u'caf\xe9', description.text)
+            self.assertEqual('project', doc.getroot().tag)
+
+    def test_parse_file_mmap_bytes_only(self):
+        fromstring = lxml_utils.etree.fromstring
+
+        def bytes_only(data, parser):
+            if not isinstance(data, bytes):
+                raise ValueError('can only parse strings')
+            return fromstring(data, parser)
+
+        with mock.patch.object(lxml_utils.etree, 'fromstring',
+                               side_effect=bytes_only):
+            doc = lxml_utils.parse_file(self.path, use_mmap=True)
+        self.assertEqual('project', doc.getroot().tag)
+
+    def test_tostring_preserve_formatting(self):
+        doc = lxml_utils.parse_file(self.path)
+        self.assertEqual(JOB, lxml_utils.tostring(doc, pretty_print=False))
+
+    def test_write_file_skips_identical(self):
+        doc = lxml_utils.parse_file(self.path)
+        os.utime(self.path, (0, 0))
+        self.assertFalse(lxml_utils.write_file(self.path, doc, False))
+        self.assertEqual(0, os.stat(self.path).st_mtime)
+
+        doc.xpath('/project/disabled')[0].text = 'true'
+        self.assertTrue(lxml_utils.write_file(self.path, doc, False))
+        with open(self.path, 'rb') as fh:
+            self.assertEqual(JOB.replace(b'false', b'true'), fh.read())
+
+    def test_write_file_mode(self):
+        os.chmod(self.path, 0o600)
+        doc = lxml_utils.parse_file(self.path)
+        doc.xpath('/project/disabled')[0].text = 'true'
+        self.assertTrue(lxml_utils.write_file(self.path, doc))
+        self.assertEqual(0o600, os.stat(self.path).st_mode & 0o777)
+
+        umask = os.umask(0o027)
+        try:
+            new = os.path.join(self.work_dir, 'new.xml')
+            self.assertTrue(lxml_utils.write_file(new, doc))
+        finally:
+            os.umask(umask)
+        self.assertEqual(0o640, os.stat(new).st_mode & 0o777)
+        self.assertEqual(['job.xml', 'new.xml'],
+                         sorted(os.listdir(self.work_dir)))
+
+    def test_parser_per_thread(self):
+        parsers = []
+        thread = threading.Thread(
+            target=lambda: parsers.append(lxml_utils.get_parser()))
+        thread.start()
+        thread.join()
+        self.assertIs(lxml_utils.get_parser(), lxml_utils.get_parser())
+        self.assertIsNot(lxml_utils.get_parser(), parsers[0])
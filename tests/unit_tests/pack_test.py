@@ -0,0 +1,92 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import os
+
+from jbutler import utils
+from jbutler.utils import pack
+
+from .. import base
+
+JOB = b"<?xml version='1.0' encoding='UTF-8'?>\n<project/>\n"
+OTHER_JOB = b"<?xml version='1.0' encoding='UTF-8'?>\n<matrix-project/>\n"
+
+
+class PackStoreTestCase(base.JbutlerTestCase):
+    """Test the content-addressed job pack"""
+
+    def setUp(self):
+        super(PackStoreTestCase, self).setUp()
+        self.job_dir = self.mkdirs('jobs')
+
+    def test_put_get(self):
+        with pack.PackStore(self.job_dir) as store:
+            self.assertTrue(store.put('foo', JOB))
+            self.assertFalse(store.put('foo', JOB))
+            self.assertTrue(store.put('apps/bar', JOB))
+            self.assertTrue(store.put('baz', OTHER_JOB))
+            self.assertEqual(JOB, store.get('apps/bar'))
+            self.assertRaises(KeyError, store.get, 'spam')
+
+        self.assertTrue(pack.exists(self.job_dir))
+        store = pack.PackStore(self.job_dir)
+        self.assertEqual(['apps/bar', 'baz', 'foo'], store.names())
+        self.assertEqual(OTHER_JOB, store.get('baz'))
+        # identical configs are only stored once
+        self.assertEqual(2, len(set(store._names.values())))
+        self.assertEqual(sum(length for _, length in store._blobs.values()),
+                         os.path.getsize(store.pack_path))
+
+        store.put('foo', OTHER_JOB)
+        store.delete('baz')
+        self.assertEqual(OTHER_JOB, store.get('foo'))
+        store.close()
+        self.assertEqual(['apps/bar', 'foo'],
+                         pack.PackStore(self.job_dir).names())
+
+    def test_import_export(self):
+        self.mkdirs('jobs/apps')
+        self.mkfile('jobs/foo.xml', JOB.decode('utf-8'))
+        self.mkfile('jobs/apps/bar.xml', OTHER_JOB.decode('utf-8'))
+        self.mkfile('jobs/notes.txt', 'not a job')
+
+        with pack.PackStore(self.job_dir) as store:
+            self.assertEqual(2, store.import_files())
+            self.assertEqual(0, store.import_files())
+        self.assertEqual(['apps/bar', 'foo'],
+                         pack.PackStore(self.job_dir).names())
+
+        out_dir = os.path.join(self.work_dir, 'out')
+        self.assertEqual(2, pack.PackStore(self.job_dir).export_files(out_dir))
+        with open(os.path.join(out_dir, 'apps', 'bar.xml'), 'rb') as fh:
+            self.assertEqual(OTHER_JOB, fh.read())
+
+    def test_read_write_job(self):
+        store = pack.PackStore(self.job_dir)
+        store.put('foo', JOB)
+        doc = utils.readJob(os.path.join(self.job_dir, 'foo.xml'),
+                            store=store)
+        self.assertEqual('project', doc.getroot().tag)
+
+        filename = os.path.join(self.job_dir, 'apps', 'bar.xml')
+        self.assertTrue(utils.writeJob(filename, doc, store=store))
+        self.assertFalse(utils.writeJob(filename, doc, store=store))
+        self.assertEqual(['apps/bar', 'foo'], store.names())
+        self.assertFalse(os.path.exists(filename))
+        store.close()
@@ -0,0 +1,117 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+from jbutler.jenkinsapi.requester import Requester
+from jbutler.utils import throttle
+
+from .. import base
+from ..base import mock
+
+
+class FakeClock(object):
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TokenBucketTestCase(base.JbutlerTestCase):
+    """Test the token bucket used to throttle requests"""
+
+    def setUp(self):
+        super(TokenBucketTestCase, self).setUp()
+        self.clock = FakeClock()
+
+    def test_unlimited(self):
+        bucket = throttle.TokenBucket(0, clock=self.clock,
+                                      sleep=self.clock.sleep)
+        for _ in range(5):
+            self.assertEqual(0.0, bucket.acquire())
+        self.assertEqual(5, bucket.requests)
+        self.assertEqual([], self.clock.sleeps)
+
+    def test_rate(self):
+        bucket = throttle.TokenBucket(4, clock=self.clock,
+                                      sleep=self.clock.sleep)
+        waits = [bucket.acquire() for _ in range(5)]
+        self.assertEqual([0.0, 0.25, 0.25, 0.25, 0.25], waits)
+        self.assertEqual(1.0, bucket.waited)
+
+        # tokens refill while idle, up to the burst size
+        self.clock.now += 10
+        self.assertEqual(0.0, bucket.acquire())
+        self.assertEqual(0.25, bucket.acquire())
+
+    def test_set_rate(self):
+        bucket = throttle.TokenBucket(0, clock=self.clock,
+                                      sleep=self.clock.sleep)
+        self.clock.now += 10
+        bucket.set_rate(2)
+        self.assertEqual(0.0, bucket.acquire())
+        self.assertEqual(0.5, bucket.acquire())
+
+        bucket.set_rate(4)
+        self.assertEqual(0.25, bucket.acquire())
+
+        throttle.reset()
+        self.addCleanup(throttle.reset)
+        shared = throttle.get_bucket('jenkins.example.com', 1)
+        self.assertIs(shared, throttle.get_bucket('jenkins.example.com', 5))
+        self.assertEqual(5, shared.rate)
+
+
+class RequesterThrottleTestCase(base.JbutlerTestCase):
+    """Test that the requester throttles reads and writes together"""
+
+    def setUp(self):
+        super(RequesterThrottleTestCase, self).setUp()
+        throttle.reset()
+        self.addCleanup(throttle.reset)
+
+    def test_shared_bucket(self):
+        requester = Requester('user', 'pass', requests_per_second=1000)
+        requester.session = mock.MagicMock()
+        requester.get_url('http://jenkins.example.com/api/python')
+        requester.post_url('http://jenkins.example.com/job/foo/build')
+        requester.get_url('http://jenkins.example.com/job/foo/api/json')
+
+        # buckets are shared by every requester talking to the same host
+        other = Requester('user', 'pass', requests_per_second=1000)
+        other.session = mock.MagicMock()
+        other.get_url('http://jenkins.example.com/api/python')
+
+        stats = [(s.host, s.kind, s.requests) for s in throttle.stats()]
+        self.assertEqual([('jenkins.example.com', 'read', 3),
+                          ('jenkins.example.com', 'write', 1)], stats)
+        # one bucket holds the budget of reads and writes together
+        self.assertEqual(4, throttle.get_bucket('jenkins.example.com',
+                                                1000).requests)
+
+    def test_unthrottled(self):
+        requester = Requester('user', 'pass')
+        requester.session = mock.MagicMock()
+        requester.get_url('http://jenkins.example.com/api/python')
+        self.assertEqual([], throttle.stats())
@@ -0,0 +1,259 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+
+import yaml
+
+from jbutler.jenkinsapi import views
+from jbutler.lib import cfg
+from jbutler.lib import views as libviews
+from jbutler.utils import jenkins_utils
+
+from .. import base
+from ..base import mock
+from ..perf.fake_jenkins import FakeJenkins
+
+
+class ViewsIndexTestCase(base.JbutlerTestCase):
+    """Tests for the local view index kept by Views"""
+
+    def setUp(self):
+        super(ViewsIndexTestCase, self).setUp()
+
+        self.jenkins = mock.MagicMock()
+        self.jenkins.baseurl = 'http://jenkins.example.com'
+        self.jenkins._data = {'views': [
+            {'name': 'All', 'url': 'http://jenkins.example.com/'},
+            {'name': 'foo', 'url': 'http://jenkins.example.com/view/foo/'},
+        ]}
+
+        View_patcher = mock.patch('jbutler.jenkinsapi.views.View')
+        self.View = View_patcher.start()
+        self.addCleanup(View_patcher.stop)
+
+        self.views = views.Views(self.jenkins)
+
+    def test_create_updates_index(self):
+        self.views.create('bar')
+        self.jenkins.poll.assert_not_called()
+        self.assertIn(
+            {'name': 'bar', 'url': 'http://jenkins.example.com/view/bar/'},
+            self.jenkins._data['views'])
+
+    def test_configure_does_not_poll(self):
+        view = mock.MagicMock()
+        view.name = 'foo'
+        view.baseurl = 'http://jenkins.example.com/view/foo'
+        self.views._configureListView(view, {'name': 'foo', 'jobs': ['a']})
+        self.assertEqual(
+            1, self.jenkins.requester.post_and_confirm_status.call_count)
+        self.jenkins.poll.assert_not_called()
+
+        self.views._configureListView(view, {'name': 'foo'}, verify=True)
+        self.jenkins.poll.assert_called_once_with()
+
+    def test_delete_updates_index(self):
+        self.views.delete_view_by_url('http://jenkins.example.com/view/foo')
+        self.jenkins.poll.assert_not_called()
+        self.assertEqual(['All'],
+                         [r['name'] for r in self.jenkins._data['views']])
+
+    def test_delete_verify_polls(self):
+        self.views.delete_view_by_url('http://jenkins.example.com/view/foo',
+                                      verify=True)
+        self.jenkins.poll.assert_called_once_with()
+
+    def test_deserialize_polls_once(self):
+        data = ('- name: bar\n  path: /bar\n'
+                '- name: baz\n  path: /baz\n')
+        created = self.views.deserialize(data)
+        self.assertEqual(2, len(created))
+        self.jenkins.poll.assert_called_once_with()
+
+    def test_membership_small_delta(self):
+        view = mock.MagicMock()
+        view.name = 'foo'
+        view.baseurl = 'http://jenkins.example.com/view/foo'
+        jobs = ['job-%04d' % i for i in range(100)]
+
+        self.views.update_job_membership(
+            view, {'name': 'foo', 'jobs': jobs[1:] + ['new']}, jobs)
+        post = self.jenkins.requester.post_and_confirm_status
+        self.assertEqual(
+            [mock.call(view.baseurl + '/addJobToView',
+                       params={'name': 'new'}, data=b''),
+             mock.call(view.baseurl + '/removeJobFromView',
+                       params={'name': 'job-0000'}, data=b'')],
+            post.call_args_list)
+        self.jenkins.poll.assert_not_called()
+
+    def test_membership_large_delta(self):
+        view = mock.MagicMock()
+        view.name = 'foo'
+        view.baseurl = 'http://jenkins.example.com/view/foo'
+
+        jobs = ['job-%04d' % i for i in range(10)]
+        self.views.update_job_membership(
+            view, {'name': 'foo', 'jobs': jobs}, [])
+        post = self.jenkins.requester.post_and_confirm_status
+        post.assert_called_once_with(view.baseurl + '/configSubmit',
+                                     data=mock.ANY)
+
+    def test_membership_no_delta(self):
+        view = mock.MagicMock()
+        result = self.views.update_job_membership(
+            view, {'name': 'foo', 'jobs': ['a']}, ['a'])
+        self.assertIs(view, result)
+        self.jenkins.requester.post_and_confirm_status.assert_not_called()
+
+
+class ViewsSerializationTestCase(base.JbutlerTestCase):
+    """Tests for Views yaml serialization"""
+
+    def setUp(self):
+        super(ViewsSerializationTestCase, self).setUp()
+
+        self.jenkins = mock.MagicMock()
+        self.jenkins.cache = None
+        self.jenkins._data = {'views': [
+            {'name': 'foo', 'url': 'http://jenkins.example.com/view/foo/'},
+            {'name': 'bar', 'url': 'http://jenkins.example.com/view/bar/'},
+        ]}
+
+        View_patcher = mock.patch('jbutler.jenkinsapi.views.View')
+        self.View = View_patcher.start()
+        self.addCleanup(View_patcher.stop)
+
+        def toDict(root_path=None):
+            name = self.View.call_args[0][1]
+            return {'name': name, 'path': '/' + name}
+        self.View.return_value.toDict.side_effect = toDict
+
+        self.views = views.Views(self.jenkins)
+
+    def test_serialize(self):
+        expected = '- name: foo\n  path: /foo\n- name: bar\n  path: /bar\n'
+        self.assertEqual(expected, self.views.serialize())
+
+    def test_serialize_stream(self):
+        with open('views.yml', 'w') as fh:
+            self.assertIsNone(self.views.serialize(stream=fh))
+        with open('views.yml') as fh:
+            self.assertEqual('---\nname: foo\npath: /foo\n'
+                             '---\nname: bar\npath: /bar\n', fh.read())
+
+    def test_from_yaml(self):
+        expected = [{'name': 'foo', 'path': '/foo'},
+                    {'name': 'bar', 'path': '/bar'}]
+        single = '- name: foo\n  path: /foo\n- name: bar\n  path: /bar\n'
+        self.assertEqual(expected, list(self.views._from_yaml(single)))
+
+        multi = '---\nname: foo\npath: /foo\n---\nname: bar\npath: /bar\n'
+        self.assertEqual(expected, list(self.views._from_yaml(multi)))
+
+
+class DiffViewsTestCase(base.JbutlerTestCase):
+    """Tests for the view sync engine"""
+
+    def setUp(self):
+        super(DiffViewsTestCase, self).setUp()
+        self.current = [
+            {'name': 'foo', 'path': '/foo', 'description': '',
+             'jobs': ['a', 'b']},
+            {'name': 'bar', 'path': '/bar', 'defaultView': 'All',
+             'views': [{'name': 'baz', 'path': '/bar/baz', 'jobs': []}]},
+        ]
+
+    def test_no_changes(self):
+        desired = [
+            {'name': 'foo', 'path': '/foo', 'jobs': ['b', 'a']},
+            {'name': 'bar', 'path': '/bar',
+             'views': [{'name': 'baz', 'path': '/bar/baz'}]},
+        ]
+        self.assertEqual([], libviews.diff_views(self.current, desired))
+
+    def test_changes(self):
+        desired = [
+            {'name': 'foo', 'path': '/foo', 'description': 'new',
+             'jobs': ['a']},
+            {'name': 'spam', 'path': '/spam'},
+        ]
+        plan = libviews.diff_views(self.current, desired)
+        self.assertEqual(
+            ['configure /foo (description, jobs)', 'create /spam'],
+            [libviews.format_change(c) for c in plan])
+
+        plan = libviews.diff_views(self.current, desired, prune=True)
+        self.assertEqual(
+            ['configure /foo (description, jobs)', 'create /spam',
+             'delete /bar'],
+            [libviews.format_change(c) for c in plan])
+
+    def test_type_change(self):
+        desired = [
+            {'name': 'foo', 'views': [{'name': 'spam'}]},
+        ]
+        plan = libviews.diff_views(self.current, desired)
+        self.assertEqual(
+            ['delete /foo', 'create /foo', 'create /foo/spam'],
+            [libviews.format_change(c) for c in plan])
+
+    def test_sync_dry_run(self):
+        server = mock.MagicMock()
+        server.views._from_yaml.return_value = iter([
+            {'name': 'foo', 'path': '/foo', 'jobs': ['a']},
+        ])
+        server.views.iter_view_dicts.return_value = iter(self.current[:1])
+
+        plan = libviews.syncViews(server, '', dry_run=True)
+        self.assertEqual(['configure /foo (jobs)'],
+                         [libviews.format_change(c) for c in plan])
+        server.views.iter_view_dicts.assert_called_once_with(
+            ['foo'], workers=1)
+        server.views.delete.assert_not_called()
+        server.views._configureListView.assert_not_called()
+        server.poll.assert_not_called()
+
+
+class ViewsRoundTripTestCase(base.JbutlerTestCase):
+    """Retrieve views from a fake server and sync them back"""
+
+    def setUp(self):
+        super(ViewsRoundTripTestCase, self).setUp()
+        self.fake = FakeJenkins().start()
+        self.addCleanup(self.fake.stop)
+        for name in ('app-a', 'app-b', 'lib'):
+            self.fake.add_job(name)
+        self.fake.add_view(['explicit'], jobs=['lib'])
+        self.fake.add_view(['regex'], jobs=['lib'], includeRegex='app-.*')
+
+        config = cfg.JbutlerConfigParser()
+        config.set('server', self.fake.url)
+        self.server = jenkins_utils.server_factory(config.snapshot())
+
+    def test_regex_matches_not_members(self):
+        current = dict((v['name'], v) for v in
+                       self.server.views.iter_view_dicts(None))
+        self.assertEqual(['lib'], current['explicit']['jobs'])
+        self.assertEqual('app-.*', current['regex']['includeRegex'])
+        self.assertNotIn('jobs', current['regex'])
+
+        data = yaml.safe_dump(list(current.values()))
+        self.assertEqual(
+            [], libviews.syncViews(self.server, data, dry_run=True))
@@ -0,0 +1,105 @@
+#
+# Copyright (c) SAS Institute Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+from __future__ import absolute_import
+from __future__ import division
+from __future__ import print_function
+import os
+
+from jbutler.utils import watch
+
+from .. import base
+from ..base import mock
+from ..base import unittest
+
+
+class FakeWatcher(object):
+    """Replays a list of changes, one per read"""
+
+    def __init__(self, changes):
+        self.changes = list(changes)
+        self.timeouts = []
+
+    def read(self, timeout=None):
+        self.timeouts.append(timeout)
+        return set(self.changes.pop(0)) if self.changes else set()
+
+
+class WatchTestCase(base.JbutlerTestCase):
+    """Test watching the job directory"""
+
+    def setUp(self):
+        super(WatchTestCase, self).setUp()
+        self.job_dir = self.mkdirs('jobs')
+        self.foo = self.mkfile('jobs/foo.xml', '<project/>')
+
+    def test_walk(self):
+        self.mkdirs('jobs/apps')
+        self.mkdirs('jobs/.git')
+        web = self.mkfile('jobs/apps/web.xml', '<project/>')
+        self.mkfile('jobs/.git/config.xml', 'x')
+        self.mkfile('jobs/.foo.xml.swp', 'x')
+        self.mkfile('jobs/notes.txt', 'x')
+        self.assertEqual(sorted([self.foo, web]),
+                         sorted(watch.walk(self.job_dir)))
+
+    def test_polling_watcher(self):
+        watcher = watch.PollingWatcher(self.job_dir, interval=0.01)
+        self.assertEqual(set(), watcher.read(0))
+
+        self.mkdirs('jobs/apps')
+        web = self.mkfile('jobs/apps/web.xml', '<project/>')
+        with open(self.foo, 'w') as fh:
+            fh.write('<project><description/></project>')
+        self.assertEqual(set([self.foo, web]), watcher.read(1))
+        self.assertEqual(set(), watcher.read(0.02))
+
+        os.remove(web)
+        self.assertEqual(set(), watcher.read(0.02))
+
+    def test_watcher_fallback(self):
+        with mock.patch.object(watch, 'inotify_simple', None):
+            watcher = watch.watcher(self.job_dir, interval=2)
+        self.assertIsInstance(watcher, watch.PollingWatcher)
+        self.assertEqual(2, watcher.interval)
+        self.assertIsInstance(watch.watcher(self.job_dir, poll=True),
+                              watch.PollingWatcher)
+
+    @unittest.skipIf(watch.inotify_simple is None, 'requires inotify_simple')
+    def test_inotify_watcher(self):
+        watcher = watch.watcher(self.job_dir)
+        self.addCleanup(watcher.close)
+        self.assertIsInstance(watcher, watch.InotifyWatcher)
+        self.assertEqual(set(), watcher.read(0))
+
+        self.mkdirs('jobs/apps')
+        self.assertEqual(set(), watcher.read(1))
+        web = self.mkfile('jobs/apps/web.xml', '<project/>')
+        self.mkfile('jobs/notes.txt', 'x')
+        self.assertEqual(set([web]), watcher.read(1))
+
+    def test_batches(self):
+        fake = FakeWatcher([['a.xml'], ['b.xml', 'a.xml'], [], ['c.xml']])
+        batches = watch.batches(fake, debounce=0.25)
+        self.assertEqual(set(['a.xml', 'b.xml']), next(batches))
+        self.assertEqual([None, 0.25, 0.25], fake.timeouts)
+        self.assertEqual(set(['c.xml']), next(batches))
+
+    def test_batches_max_delay(self):
+        fake = FakeWatcher([['a.xml']] * 5)
+        batches = watch.batches(fake, debounce=0.25, max_delay=0)
+        self.assertEqual(set(['a.xml']), next(batches))
+        self.assertEqual([None], fake.timeouts)